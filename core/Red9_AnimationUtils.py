@@ -76,6 +76,7 @@ from __future__ import print_function
 import maya.cmds as cmds
 import maya.mel as mel
 import maya.OpenMaya as OpenMaya
+import maya.OpenMayaAnim as OpenMayaAnim
 
 import Red9.startup.setup as r9Setup
 import Red9_CoreUtils as r9Core
@@ -91,6 +92,9 @@ import re
 import shutil
 import math
 import traceback
+import time
+import bisect
+import getpass
 
 import Red9.packages.configobj as configobj
 
@@ -104,6 +108,12 @@ def logging_is_debug():
     if log.level == 10:
         return True
 
+try:
+    import numpy
+except:
+    numpy = None
+    log.debug('unable to import numpy, animCurve range analysis falling back to pure python')
+
 # global var so that the animUI is exposed to anything as a global object
 global RED_ANIMATION_UI
 RED_ANIMATION_UI = None
@@ -544,6 +554,83 @@ def animCurveDrawStyle(style='simple', forceBuffer=True, showBufferCurves=False,
 #         self.current += self.step
 #         return self.current - self.step
 
+def animCurve_get_data(curves):
+    '''
+    read the key data for many animCurves, one keyframe query per curve with the result
+    going straight into the arrays, no per key tuples are built.
+
+    :param curves: animCurves to read
+    :return: {curve: (times, values)} in ui units, numpy arrays if numpy is available, else lists.
+        Driven key (unitless input) curves return their float inputs as the times
+    '''
+    if not isinstance(curves, list):
+        curves = [curves]
+    data = {}
+    for curve in curves:
+        if curve in data:
+            continue
+        try:
+            if cmds.nodeType(curve).startswith('animCurveU'):
+                keyList = cmds.keyframe(curve, q=True, fc=True, vc=True)
+            else:
+                keyList = cmds.keyframe(curve, q=True, tc=True, vc=True)
+        except RuntimeError:
+            continue
+        if not keyList:
+            continue
+        if numpy is not None:
+            keyList = numpy.array(keyList, dtype=numpy.float64)
+        data[curve] = (keyList[0::2], keyList[1::2])
+    return data
+
+def _animCurve_keys_static(values, value, tolerance=0.001):
+    '''
+    vectorised r9Core.floatIsEqual, mask of the values that match the given value,
+    including the gimbal compensation that floatIsEqual runs by default
+    '''
+    diff = numpy.abs(values - value)
+    mod = diff % 180.0
+    return (diff < tolerance) | (mod < tolerance) | (numpy.abs(180.0 - mod) < tolerance) | (numpy.abs(90.0 - mod) < tolerance)
+
+def _animCurve_bounds(times, values, bounds_only=False, skip_static=True, tolerance=0.001):
+    '''
+    the bounds calculation behind animCurve_get_bounds, run against key data
+    already read via animCurve_get_data
+    '''
+    bounds = [float(times[0]), float(times[-1])]
+    if bounds_only:
+        return bounds
+
+    if numpy is not None:
+        changed = numpy.flatnonzero(~_animCurve_keys_static(values, values[0], tolerance))
+        if changed.size:
+            bounds[0] = float(times[changed[0] - 1])
+            changed = numpy.flatnonzero(~_animCurve_keys_static(values, values[-1], tolerance))
+            if changed.size:
+                bounds[1] = float(times[changed[-1] + 1])
+            else:
+                # every key is within tolerance of the last, the legacy walk runs to the first key
+                bounds[1] = float(times[0])
+        else:
+            bounds[0] = bounds[1]
+    else:
+        # find the min
+        for t, v in zip(times, values):
+            if not r9Core.floatIsEqual(values[0], v, tolerance):
+                break
+            bounds[0] = t
+        # find the max
+        for t, v in reversed(zip(times, values)):
+            if not r9Core.floatIsEqual(values[-1], v, tolerance):
+                break
+            bounds[1] = t
+
+    if bounds[0] == times[-1]:
+        if skip_static:
+            return []
+        return [float(times[0]), float(times[-1])]
+    return bounds
+
 def animCurve_get_bounds(curve, bounds_only=False, skip_static=True):
     '''
     from a given anim curve find it's upper and lower bounds. By default we examine the keyValues
@@ -554,39 +641,69 @@ def animCurve_get_bounds(curve, bounds_only=False, skip_static=True):
         else we look at the changing values to find the bounds
     :param skip_static: if True we ignore static curves and return [], else we return
         the key bounds for the static keys, ignoring the keyValues
+
+    .. note::
+        to process many curves use animCurve_range_analysis which runs the vectorised
+        static and bounds tests over all the curves
     '''
-    keyList = cmds.keyframe(curve, q=True, vc=True, tc=True)
-    if not keyList:
+    data = animCurve_get_data([curve])
+    if not data:
         return False
-    keydata = zip(keyList[0::2], keyList[1::2])
-    minV = keydata[0]
-    maxV = keydata[-1]
-    bounds = [minV[0], maxV[0]]
-
-    if bounds_only:
-        return bounds
-
-    # find the min
-    for t, v in keydata:
-        if not r9Core.floatIsEqual(minV[1], v, 0.001):
-            break
-        bounds[0] = t
-    # find the max
-    for t, v in reversed(keydata):
-        if not r9Core.floatIsEqual(maxV[1], v, 0.001):
-            break
-        bounds[1] = t
-
-    if skip_static:
-        if bounds[0] == maxV[0]:
-            log.debug('curve is static : %s' % curve)
-            return []
-    else:
-        if bounds[0] == maxV[0]:
-            log.debug('curve is static : %s' % curve)
-            return [minV[0], maxV[0]]
+    times, values = data.values()[0]
+    bounds = _animCurve_bounds(times, values, bounds_only=bounds_only, skip_static=skip_static)
+    if not bounds:
+        log.debug('curve is static : %s' % curve)
     return bounds
 
+def animCurve_range_analysis(curves=None, nodes=None, tolerance=0.001):
+    '''
+    range analysis over many animCurves in one call, the key data is read via animCurve_get_data
+    and the static / animated bounds tests vectorised when numpy is available.
+
+    :param curves: animCurves to analyse
+    :param nodes: if no curves given we analyse all the safe animCurves for these nodes
+    :param tolerance: value tolerance used to detect the static keys
+    :return: dict::
+
+        {'curves': {curve: {'keys': int, 'bounds': [first, last], 'animated': [start, end] or [],
+                            'static': bool, 'density': keys per frame over the curve's bounds}},
+         'static': [static curves],
+         'bounds': (first, last) over all curves or None,
+         'animated': (start, end) over all the animated curves or None,
+         'keys': total key count,
+         'density': average keys per frame per curve over the aggregate bounds, 1.0 = fully baked}
+    '''
+    if not curves and nodes:
+        curves = r9Core.FilterNode.lsAnimCurves(nodes, safe=True, allow_ref=True)
+    results = {'curves': {}, 'static': [], 'bounds': None, 'animated': None, 'keys': 0, 'density': 0.0}
+    if not curves:
+        return results
+
+    firsts, lasts, animStarts, animEnds = [], [], [], []
+    for curve, (times, values) in animCurve_get_data(curves).items():
+        bounds = [float(times[0]), float(times[-1])]
+        animated = _animCurve_bounds(times, values, skip_static=True, tolerance=tolerance)
+        count = len(times)
+        results['curves'][curve] = {'keys': count,
+                                    'bounds': bounds,
+                                    'animated': animated,
+                                    'static': not animated,
+                                    'density': count / (bounds[1] - bounds[0] + 1.0)}
+        results['keys'] += count
+        firsts.append(bounds[0])
+        lasts.append(bounds[1])
+        if animated:
+            animStarts.append(animated[0])
+            animEnds.append(animated[1])
+        else:
+            results['static'].append(curve)
+    if firsts:
+        results['bounds'] = (min(firsts), max(lasts))
+        results['density'] = results['keys'] / ((results['bounds'][1] - results['bounds'][0] + 1.0) * len(firsts))
+    if animStarts:
+        results['animated'] = (min(animStarts), max(animEnds))
+    return results
+
 def animRangeFromNodes(nodes, setTimeline=True, decimals=-1, transforms_only=False, skip_static=True, bounds_only=True):
     '''
     return the extent of the animation range for the given objects
@@ -601,17 +718,15 @@ def animRangeFromNodes(nodes, setTimeline=True, decimals=-1, transforms_only=Fal
     '''
     minBounds = []
     maxBounds = []
-    for anim in r9Core.FilterNode.lsAnimCurves(nodes, safe=True, allow_ref=True):
-        if transforms_only and not cmds.nodeType(anim) in ['animCurveTL', 'animCurveTA']:
-            continue
-        bounds = animCurve_get_bounds(anim, bounds_only=bounds_only, skip_static=skip_static)
-
-        if bounds:
-            minBounds.append(bounds[0])
-            maxBounds.append(bounds[1])
-#         count = cmds.keyframe(anim, q=True, kc=True)
-#         minBounds.append(cmds.keyframe(anim, q=True, index=[(0, 0)], tc=True)[0])
-#         maxBounds.append(cmds.keyframe(anim, q=True, index=[(count - 1, count - 1)], tc=True)[0])
+    curves = r9Core.FilterNode.lsAnimCurves(nodes, safe=True, allow_ref=True)
+    if transforms_only and curves:
+        curves = cmds.ls(curves, type=['animCurveTL', 'animCurveTA'])
+    if curves:
+        for times, values in animCurve_get_data(curves).values():
+            bounds = _animCurve_bounds(times, values, bounds_only=bounds_only, skip_static=skip_static)
+            if bounds:
+                minBounds.append(bounds[0])
+                maxBounds.append(bounds[1])
     if not minBounds and not maxBounds:
         return
     min_rng = min(minBounds)
@@ -645,7 +760,140 @@ def timeLineRangeGet(always=True):
         playbackRange = (cmds.playbackOptions(q=True, min=True), cmds.playbackOptions(q=True, max=True))
     return playbackRange
 
-def timeLineRangeProcess(start, end, step=1, incEnds=True, nodes=[], process_animlayers=True):
+class KeyTimeIndex(object):
+    '''
+    Key time index, built once per operation. The animCurves for all the given nodes
+    are read in a single API pass and the key times stored as sorted lists per node
+    and as a global union. Smartbake style processes can then test "does this node
+    have a key at frame t" without re-querying the curves every frame.
+
+    :param nodes: nodes to index
+    :param time: optional (start, end) range, only keys within the range are indexed
+    :param process_animlayers: when True (default) we index all keys on all layers for the given nodes
+    :param perNode: if False we only build the global union, saving the per node curve lookups
+
+    >>> index = KeyTimeIndex(nodes, time=(1, 100))
+    >>> index.keyTimes()  # sorted union of all key times
+    >>> index.hasKey(node, 10)
+    '''
+    def __init__(self, nodes=None, time=(), process_animlayers=True, perNode=True):
+        self.time = tuple(time) if time else ()
+        self.process_animlayers = process_animlayers
+        self.perNode = perNode
+        self.nodeKeys = {}  # {node: [sorted key times]}
+        self.keys = []  # sorted union of all key times
+        self._nodeKeySets = {}
+        if nodes:
+            self.build(nodes)
+
+    def __contains__(self, node):
+        return node in self.nodeKeys
+
+    def _getCurves(self, nodes):
+        try:
+            if not self.process_animlayers:
+                return cmds.keyframe(nodes, q=True, name=True) or []
+            # look at all animCurve data for the given nodes
+            return r9Core.FilterNode.lsAnimCurves(nodes) or []
+        except StandardError:
+            return []
+
+    def _readCurveTimes(self, curves):
+        '''
+        read the key times for all the given curves in one pass via MFnAnimCurve,
+        in the current ui time unit and clipped to the index time range
+
+        :return: {curve: [times]}
+        '''
+        curveTimes = {}
+        selList = OpenMaya.MSelectionList()
+        mobj = OpenMaya.MObject()
+        fnCurve = OpenMayaAnim.MFnAnimCurve()
+        uiUnit = OpenMaya.MTime.uiUnit()
+        for curve in curves:
+            try:
+                selList.clear()
+                selList.add(curve)
+                selList.getDependNode(0, mobj)
+                fnCurve.setObject(mobj)
+            except RuntimeError:
+                continue
+            # setDriven / unitless input curves have no time data
+            if fnCurve.isUnitlessInput():
+                continue
+            times = [fnCurve.time(i).asUnits(uiUnit) for i in range(fnCurve.numKeys())]
+            if self.time:
+                times = [t for t in times if self.time[0] <= t <= self.time[1]]
+            curveTimes[curve] = times
+        return curveTimes
+
+    def build(self, nodes):
+        '''
+        (re)build the index for the given nodes
+        '''
+        if not isinstance(nodes, list):
+            nodes = [nodes]
+        self.nodeKeys = {}
+        self._nodeKeySets = {}
+        if not self.perNode:
+            keys = set()
+            for times in self._readCurveTimes(self._getCurves(nodes)).values():
+                keys.update(times)
+            self.keys = sorted(keys)
+            return
+
+        nodeCurves = {}
+        for node in nodes:
+            if node not in nodeCurves:
+                nodeCurves[node] = self._getCurves(node)
+        curveTimes = self._readCurveTimes(set([c for curves in nodeCurves.values() for c in curves]))
+        keys = set()
+        for node, curves in nodeCurves.items():
+            times = set()
+            for curve in curves:
+                times.update(curveTimes.get(curve, []))
+            if times:
+                self._nodeKeySets[node] = times
+                self.nodeKeys[node] = sorted(times)
+                keys.update(times)
+        self.keys = sorted(keys)
+
+    def hasKey(self, node, t):
+        '''
+        does the given node have a key at time t
+        '''
+        return t in self._nodeKeySets.get(node, ())
+
+    def keyTimes(self, nodes=None, start=None, end=None, step=1):
+        '''
+        sorted key times for the given nodes, or the global union if no nodes given
+
+        :param nodes: node or list of nodes to return the key times for
+        :param start: optional start frame to clip to
+        :param end: optional end frame to clip to
+        :param step: if negative the times are returned reversed, as timeLineRangeProcess
+        '''
+        if nodes:
+            if not isinstance(nodes, list):
+                nodes = [nodes]
+            if len(nodes) == 1:
+                keys = self.nodeKeys.get(nodes[0], [])
+            else:
+                keys = set()
+                for node in nodes:
+                    keys.update(self._nodeKeySets.get(node, ()))
+                keys = sorted(keys)
+        else:
+            keys = self.keys
+        lower = bisect.bisect_left(keys, start) if start is not None else 0
+        upper = bisect.bisect_right(keys, end) if end is not None else len(keys)
+        keys = keys[lower:upper]
+        if step < 0:
+            keys.reverse()
+        return keys
+
+
+def timeLineRangeProcess(start, end, step=1, incEnds=True, nodes=[], process_animlayers=True, keyIndex=None):
     '''
     Simple wrapper function to take a given framerange and return
     a list[] containing the actual keys required for processing.
@@ -660,6 +908,8 @@ def timeLineRangeProcess(start, end, step=1, incEnds=True, nodes=[], process_ani
     :param inEnds: when processing without nodes do we include the end frame in the return or exclude it
     :param nodes: inspect the nodes given for keyframes and use that data for the times returned
     :param process_animlayers: when True (default) we process all keys on all layers for the given nodes
+    :param keyIndex: optional KeyTimeIndex already built for the operation, used rather than
+        re-querying the curves for the given nodes. If no nodes are given we use the index's global keys
     
     .. note::
         this is the base function that the ProPack smartBake functions use to extract the key time data
@@ -667,19 +917,16 @@ def timeLineRangeProcess(start, end, step=1, incEnds=True, nodes=[], process_ani
     startFrm = start
     endFrm = end
     keys = []
-    if nodes:
-        if not process_animlayers:
-            keys = cmds.keyframe(nodes, q=True, time=(startFrm, endFrm))
+    if nodes or keyIndex is not None:
+        if keyIndex is None:
+            keys = KeyTimeIndex(nodes, time=(startFrm, endFrm), process_animlayers=process_animlayers, perNode=False).keys
         else:
-            # look at all animCurve data for the given nodes
-            curves = r9Core.FilterNode.lsAnimCurves(nodes)
-            if curves:
-                keys = cmds.keyframe(curves, q=True, time=(startFrm, endFrm))
+            keys = keyIndex.keyTimes(nodes, start=startFrm, end=endFrm)
 
         if not keys:
             log.debug('Warning :  No key times extracted from the given nodes, timeLineRange reverted to base range!')
         else:
-            rng = sorted(list(set(keys)))
+            rng = list(keys)
             if step < 0:
                 rng.reverse()
             return rng
@@ -747,6 +994,80 @@ def snap(source, destination, snapTranslates=True, snapRotates=True, snapScales=
     '''
     AnimFunctions.snap([source, destination], snapTranslates=snapTranslates, snapRotates=snapRotates, snapScales=snapScales)
 
+def setAnimCurveData(node, attr, times, values):
+    '''
+    Write a full block of key data onto a channel in a single pass rather than running
+    a setKeyframe call per key. The keys are pushed into a new animCurve in one setAttr
+    call on its keyTimeValue array, that curve is then either connected directly, or if
+    the channel is already animated / driven, pasted over the keys in the given range.
+    All calls are standard cmds so the whole operation is undoable.
+
+    :param node: node to key
+    :param attr: attribute to key
+    :param times: key times in the current ui time unit
+    :param values: matching values, in ui units, as you'd pass to setKeyframe
+    :return: the animCurve now driving the channel
+    '''
+    if not len(times) == len(values):
+        raise ValueError('setAnimCurveData : the number of times and values must match')
+    if not times:
+        return
+    plug = '%s.%s' % (node, attr)
+    # sort and de-dupe the key times, the keyTimeValue array has to be in time order
+    keys = sorted(dict(zip(times, values)).items())
+
+    attrType = cmds.getAttr(plug, type=True)
+    if attrType == 'doubleLinear':
+        curveType = 'animCurveTL'
+    elif attrType == 'doubleAngle':
+        curveType = 'animCurveTA'
+    elif attrType == 'time':
+        curveType = 'animCurveTT'
+    else:
+        curveType = 'animCurveTU'
+
+    curve = cmds.createNode(curveType, name='%s_%s' % (r9Core.nodeNameStrip(node), attr), skipSelect=True)
+    ktv = []
+    for key in keys:
+        ktv.extend(key)
+    cmds.setAttr('%s.ktv[0:%i]' % (curve, len(keys) - 1), *ktv)
+    cmds.keyTangent(curve,
+                    itt=cmds.keyTangent(q=True, g=True, itt=True)[0],
+                    ott=cmds.keyTangent(q=True, g=True, ott=True)[0])
+
+    if not cmds.listConnections(plug, s=True, d=False):
+        cmds.connectAttr('%s.output' % curve, plug, f=True)
+        return curve
+    # already animated or driven, let pasteKey manage the merge / animLayers as setKeyframe would
+    cmds.copyKey(curve)
+    cmds.pasteKey(node, attribute=attr, option='replace', time=(keys[0][0], keys[-1][0]))
+    cmds.delete(curve)
+    curves = cmds.listConnections(plug, s=True, d=False, type='animCurve')
+    if curves:
+        return curves[0]
+
+def transferAnimCurves(curves, plugs, option='replace', time=(), timeOffset=0):
+    '''
+    Transfer animCurve data directly through the TransferAnimCurves plug-in, the source
+    keys, tangents, weights and infinity are read via the API and written to the destination
+    plugs in one undoable call, without going through Maya's global key clipboard.
+
+    :param curves: source animCurves
+    :param plugs: matching destination 'node.attr' plugs
+    :param option: paste option, 'replace', 'replaceCompletely', 'merge' or 'insert'
+    :param time: optional (start, end), only transfer the keys within this range
+    :param timeOffset: offset applied to the transferred keys
+    :return: the destination plugs that couldn't be processed
+    '''
+    if not curves:
+        return []
+    if not cmds.pluginInfo('TransferAnimCurves.py', query=True, loaded=True):
+        cmds.loadPlugin('TransferAnimCurves.py')
+    kws = {'source': curves, 'destination': plugs, 'option': option, 'timeOffset': timeOffset}
+    if time:
+        kws['time'] = tuple(time)
+    return cmds.TransferAnimCurves(**kws) or []
+
 
 # def timeLineRangeSet(time):
 #    '''
@@ -867,6 +1188,8 @@ class AnimationUI(object):
         self.poseGridMode = 'thumb'  # or text
         self.poseRootMode = 'RootNode'  # or MetaRig
         self.poses = None
+        self.poseIndex = None  # r9Pose.PoseLibraryIndex, only built once an index filter is used
+        self.poseFilters = {'nodes': False, 'metaRig': False, 'author': False}  # RMB index filters
         self.poseButtonBGC = [0.27, 0.3, 0.3]
         self.poseButtonHighLight = r9Setup.red9ButtonBGC('green')
         self.poseProjectMute = False  # whether to disable the save and update funcs in Project mode
@@ -2061,21 +2384,65 @@ class AnimationUI(object):
                     self.poses.append(f.split('.pose')[0])
         return self.poses
 
-    def buildFilteredPoseList(self, searchFilter):
+    def getPoseIndex(self, create=True):
         '''
-        build the list of poses to show in the poseUI
-        TODO: hook up an order based by date in here as an option to tie into the UI
+        the PoseLibraryIndex for the current posePath, kept on the UI across list rebuilds.
+
+        :param create: if False we only return an index if one is already in memory or
+            persisted for the folder, we never build one
         '''
-        filteredPoses = self.poses
-        if searchFilter:
-            filteredPoses = []
-            filters = searchFilter.replace(' ', '').split(',')
-            for pose in self.poses:
-                for srch in filters:
-                    if srch and srch.upper() in pose.upper():
-                        if pose not in filteredPoses:
-                            filteredPoses.append(pose)
-        return filteredPoses
+        if self.poseIndex and self.poseIndex.posePath == self.posePath:
+            return self.poseIndex
+        self.poseIndex = None
+        if self.posePath and os.path.exists(self.posePath):
+            if create or r9Pose.PoseLibraryIndex.hasIndex(self.posePath):
+                self.poseIndex = r9Pose.PoseLibraryIndex(self.posePath)
+        return self.poseIndex
+
+    def buildFilteredPoseList(self, searchFilter, nodes=None, mirrorIDs=None, metaRig=None, author=None):
+        '''
+        build the list of poses to show in the poseUI. The name filter runs on the
+        cached pose list, the index filters sync and filter the PoseLibraryIndex so that
+        only new or modified pose files are ever parsed
+
+        :param searchFilter: string filter on the pose names, see r9Core.filterListByString
+        :param nodes: only show poses that contain all these node keys
+        :param mirrorIDs: only show poses that contain all these mirrorIDs
+        :param metaRig: only show poses stored from this metaRig mNodeID
+        :param author: only show poses stored by this author
+        '''
+        if not (nodes or mirrorIDs or metaRig or author):
+            return r9Core.filterListByString(self.poses or [], searchFilter, matchcase=False) or []
+        poseIndex = self.getPoseIndex()
+        if not poseIndex:
+            return []
+        poseIndex.update()
+        return poseIndex.filter(searchFilter=searchFilter,
+                                nodes=nodes,
+                                mirrorIDs=mirrorIDs,
+                                metaRig=metaRig,
+                                author=author,
+                                poses=self.poses)
+
+    def __uiCB_getPoseFilters(self):
+        '''
+        resolve the index filters toggled in the pose RMB menu against the current selection
+        '''
+        filters = {}
+        selected = cmds.ls(sl=True, l=True)
+        if self.poseFilters['nodes'] and selected:
+            filters['nodes'] = [r9Core.nodeNameStrip(node) for node in selected]
+        if self.poseFilters['metaRig'] and selected:
+            mRig = r9Meta.getConnectedMetaSystemRoot(selected)
+            if mRig:
+                filters['metaRig'] = mRig.mNodeID
+        if self.poseFilters['author']:
+            filters['author'] = getpass.getuser()
+        return filters
+
+    def __uiCB_togglePoseFilter(self, key, *args):
+        self.poseFilters[key] = not self.poseFilters[key]
+        self.__uiCB_fillPoses()
 
     def __validatePoseFunc(self, func):
         '''
@@ -2307,7 +2674,7 @@ class AnimationUI(object):
             if searchFilter:
                 cmds.scrollLayout(self.uiglPoseScroll, edit=True, sp='up')
 
-            for pose in r9Core.filterListByString(self.poses, searchFilter, matchcase=False) or []:  # self.buildFilteredPoseList(searchFilter):
+            for pose in self.buildFilteredPoseList(searchFilter, **self.__uiCB_getPoseFilters()):
                 cmds.textScrollList(self.uitslPoses, edit=True,
                                         append=pose,
                                         sc=partial(self.setPoseSelected))
@@ -2328,7 +2695,7 @@ class AnimationUI(object):
             except StandardError, error:
                 print(error)
 
-            for pose in r9Core.filterListByString(self.poses, searchFilter, matchcase=False) or []:  # self.buildFilteredPoseList(searchFilter):
+            for pose in self.buildFilteredPoseList(searchFilter, **self.__uiCB_getPoseFilters()):
                 try:
                     # :NOTE we prefix the buttons to get over the issue of non-numeric
                     # first characters which are stripped my Maya!
@@ -2400,6 +2767,13 @@ class AnimationUI(object):
         cmds.menuItem(divider=True, p=parent)
         cmds.menuItem(label=LANGUAGE_MAP._AnimationUI_.pose_rmb_add_subfolder, en=enableState, p=parent, command=partial(self.__uiPoseMakeSubFolder))
         cmds.menuItem(label=LANGUAGE_MAP._AnimationUI_.pose_rmb_refresh, en=True, p=parent, command=lambda x: self.__uiCB_fillPoses(rebuildFileList=True))
+        _submenu = cmds.menuItem('red9PoseFilterSM', l=LANGUAGE_MAP._AnimationUI_.pose_rmb_filter, sm=True, p=parent)
+        cmds.menuItem(label=LANGUAGE_MAP._AnimationUI_.pose_rmb_filter_nodes, p=_submenu, cb=self.poseFilters['nodes'],
+                      command=partial(self.__uiCB_togglePoseFilter, 'nodes'))
+        cmds.menuItem(label=LANGUAGE_MAP._AnimationUI_.pose_rmb_filter_metarig, p=_submenu, cb=self.poseFilters['metaRig'],
+                      command=partial(self.__uiCB_togglePoseFilter, 'metaRig'))
+        cmds.menuItem(label=LANGUAGE_MAP._AnimationUI_.pose_rmb_filter_author, p=_submenu, cb=self.poseFilters['author'],
+                      command=partial(self.__uiCB_togglePoseFilter, 'author'))
         cmds.menuItem(label=LANGUAGE_MAP._AnimationUI_.pose_rmb_openfile, p=parent, command=partial(self.__uiPoseOpenFile))
         cmds.menuItem(label=LANGUAGE_MAP._AnimationUI_.pose_rmb_opendir, p=parent, command=partial(self.__uiPoseOpenDir))
         cmds.menuItem(divider=True, p=parent)
@@ -2655,6 +3029,9 @@ class AnimationUI(object):
                 os.remove(self.getIconPath())
             except:
                 log.info('Failed to Delete PoseIcon')
+            poseIndex = self.getPoseIndex(create=False)
+            if poseIndex:
+                poseIndex.removePose(self.poseSelected)
             self.__uiCB_fillPoses(rebuildFileList=True)
 
     def __uiPoseRename(self, *args):
@@ -2669,8 +3046,11 @@ class AnimationUI(object):
             os.rename(self.getIconPath(), '%s.bmp' % newName.split('.pose')[0])
         except:
             log.info('Failed to Rename Pose')
-        self.__uiCB_fillPoses(rebuildFileList=True)
         pose = os.path.basename(newName.split('.pose')[0])
+        poseIndex = self.getPoseIndex(create=False)
+        if poseIndex:
+            poseIndex.renamePose(self.getPoseSelected(), pose)
+        self.__uiCB_fillPoses(rebuildFileList=True)
         self.__uiCB_selectPose(pose)
 
     def __uiPoseOpenFile(self, *args):
@@ -3184,9 +3564,8 @@ class AnimationUI(object):
 
     def __PoseBlend(self):
         '''
-        TODO: allow this ui and implementation to blend multiple poses at the same time
-        basically we'd add a new poseObject per pose and bind each one top the slider
-        but with a consistent poseCurrentCache via the _cacheCurrentNodeStates() call
+        open the PoseBlender for the pose selected in the grid. Note that the PoseBlender
+        itself takes any number of filepaths for scripted N-way blends
         '''
 
         pb = r9Pose.PoseBlender(filepaths=[self.getPosePath()],
@@ -3378,6 +3757,376 @@ class AnimationUI(object):
         self.__uiCache_storeUIElements()
 
 
+class SnapBakeEngine(object):
+    '''
+    Bulk bake engine behind AnimFunctions.snapTransform when processing a timerange.
+
+    Rather than stepping the scene time and running the SnapTransforms command plus a
+    setKeyframe for every pair on every frame, we sample the source world matrices and
+    the destination parent spaces through timed DG contexts, solve the destination
+    local transforms in memory, then write each channel's animCurve in a single pass.
+
+    The solve mirrors the SnapTransforms command, the world rotatePivot and world rotation
+    are matched and scales are matched in local space. Pairs are solved in the order given,
+    repeated for the number of iterations, as the frame by frame process does.
+
+    >>> engine = SnapBakeEngine(pairs, snapTranslates=True, snapRotates=True)
+    >>> if engine.isSupported():
+    >>>     engine.run(keytimes)
+
+    .. note::
+        the sources must be transforms that don't depend on any of the destinations, either
+        parented under them or driven by them via constraints, expressions or connections,
+        else the sampled source data would be changed by the solve itself. Likewise the
+        destinations' parent spaces can only depend on other destinations through the dag
+        hierarchy. isSupported walks the DG upstream of the sources and the destination
+        parents to catch these, snapTransform then reverts to the frame by frame process.
+    '''
+    def __init__(self, pairs, snapTranslates=True, snapRotates=True, snapScales=False, iterations=1):
+        self.pairs = list(pairs)
+        self.snapTranslates = snapTranslates
+        self.snapRotates = snapRotates
+        self.snapScales = snapScales
+        self.iterations = max(1, iterations)
+        self.keytimes = []
+        self.timings = {}
+        self._nodes = {}
+        self._dests = []
+
+    def _getNodeData(self, node):
+        '''
+        cached MDagPath / MFnTransform for the given node
+        '''
+        if node not in self._nodes:
+            selList = OpenMaya.MSelectionList()
+            selList.add(node)
+            dagPath = OpenMaya.MDagPath()
+            selList.getDagPath(0, dagPath)
+            self._nodes[node] = {'dagPath': dagPath,
+                                 'fullPath': dagPath.fullPathName(),
+                                 'fn': OpenMaya.MFnTransform(dagPath)}
+        return self._nodes[node]
+
+    def isSupported(self):
+        '''
+        can the given pairs be baked in memory? Every node has to be a transform, no source
+        can be parented under, or driven by, a destination and no destination's parent space
+        can be driven by another destination other than through the dag hierarchy itself.
+        '''
+        try:
+            for src, dest in self.pairs:
+                for node in (src, dest):
+                    if not self._getNodeData(node)['dagPath'].hasFn(OpenMaya.MFn.kTransform):
+                        return False
+        except RuntimeError:
+            return False
+        destPaths = set([self._nodes[dest]['fullPath'] for _, dest in self.pairs])
+        for src, _ in self.pairs:
+            srcPath = self._nodes[src]['fullPath']
+            for destPath in destPaths:
+                if srcPath == destPath or srcPath.startswith('%s|' % destPath):
+                    return False
+        if self._upstreamDestination([self._nodes[src]['fullPath'] for src, _ in self.pairs], destPaths):
+            return False
+        for destPath in destPaths:
+            parent = destPath.rsplit('|', 1)[0]
+            if not parent:
+                continue
+            # destinations above us in the dag are solved first and rebuild our parent space
+            ancestors = set([path for path in destPaths if destPath.startswith('%s|' % path)])
+            if self._upstreamDestination([parent], destPaths, handled=ancestors):
+                return False
+        return True
+
+    def _upstreamDestination(self, paths, destPaths, handled=None):
+        '''
+        walk the DG upstream of the worldMatrix of the given dag paths, and of the dag parents
+        of every dag node found on the way. This runs at plug level so only the connections
+        that affect the worldMatrix are followed, not message links to metaNodes etc.
+        Returns the first destination hit.
+
+        :param handled: destination paths that are already dealt with by the solve order,
+            these are skipped and not walked any further
+        '''
+        selList = OpenMaya.MSelectionList()
+        dagPath = OpenMaya.MDagPath()
+        fnDag = OpenMaya.MFnDagNode()
+        stack = list(paths)
+        visited = set()
+        while stack:
+            path = stack.pop()
+            if path in visited or (handled and path in handled):
+                continue
+            visited.add(path)
+            if path in destPaths:
+                log.debug('SnapBakeEngine : dependency on destination : %s' % path)
+                return path
+            parent = path.rsplit('|', 1)[0]
+            if parent:
+                stack.append(parent)
+            selList.clear()
+            selList.add(path)
+            selList.getDagPath(0, dagPath)
+            fnDag.setObject(dagPath)
+            dgIter = OpenMaya.MItDependencyGraph(fnDag.findPlug('worldMatrix').elementByLogicalIndex(0),
+                                                 OpenMaya.MFn.kDagNode,
+                                                 OpenMaya.MItDependencyGraph.kUpstream,
+                                                 OpenMaya.MItDependencyGraph.kDepthFirst,
+                                                 OpenMaya.MItDependencyGraph.kPlugLevel)
+            while not dgIter.isDone():
+                fnDag.setObject(dgIter.currentItem())
+                stack.append(fnDag.fullPathName())
+                dgIter.next()
+        return None
+
+    @staticmethod
+    def _isDriven(plug):
+        if plug.isDestination():
+            return True
+        return any(plug.child(i).isDestination() for i in range(plug.numChildren()))
+
+    @staticmethod
+    def _doublesAt(plug, ctx=None):
+        '''
+        child values of a double3 plug, in internal units, evaluated at the given context
+        '''
+        if ctx is None:
+            return [plug.child(i).asDouble() for i in range(3)]
+        return [plug.child(i).asDouble(ctx) for i in range(3)]
+
+    @staticmethod
+    def _matrixAt(plug, ctx):
+        return OpenMaya.MMatrix(OpenMaya.MFnMatrixData(plug.asMObject(ctx)).matrix())
+
+    @staticmethod
+    def _rotationMatrix(matrix):
+        return OpenMaya.MTransformationMatrix(matrix).asRotateMatrix()
+
+    @staticmethod
+    def _scaleMatrix(scale):
+        util = OpenMaya.MScriptUtil()
+        util.createFromList(scale, 3)
+        tm = OpenMaya.MTransformationMatrix()
+        tm.setScale(util.asDoublePtr(), OpenMaya.MSpace.kTransform)
+        return tm.asMatrix()
+
+    def _prepare(self):
+        '''
+        cache the static data for each node, pivots, orients and the parent relationships
+        between the destinations so their parent spaces can be rebuilt from the solve
+        '''
+        self._dests = []
+        destPaths = {}
+        for _, dest in self.pairs:
+            if dest not in self._dests:
+                self._dests.append(dest)
+                destPaths[self._nodes[dest]['fullPath']] = dest
+
+        for src, _ in self.pairs:
+            data = self._nodes[src]
+            data['rotatePivot'] = OpenMaya.MPoint(*self._doublesAt(data['fn'].findPlug('rotatePivot')))
+
+        for dest in self._dests:
+            data = self._nodes[dest]
+            fn = data['fn']
+            data['tm'] = OpenMaya.MTransformationMatrix(fn.transformation())
+            data['rotateAxis'] = data['tm'].rotationOrientation().asMatrix()
+            data['rotateOrder'] = fn.findPlug('rotateOrder').asInt()
+            data['rotatePivot'] = OpenMaya.MPoint(*self._doublesAt(fn.findPlug('rotatePivot')))
+            data['jointOrient'] = None
+            data['segmentScale'] = False
+            if data['dagPath'].hasFn(OpenMaya.MFn.kJoint):
+                data['jointOrient'] = OpenMaya.MEulerRotation(*self._doublesAt(fn.findPlug('jointOrient'))).asMatrix()
+                data['segmentScale'] = fn.findPlug('segmentScaleCompensate').asBool()
+
+            # nearest destination above us in the dag, its solve drives our parent space
+            data['parentDest'] = None
+            data['directParent'] = False
+            parentPath = OpenMaya.MDagPath(data['dagPath'])
+            direct = True
+            while parentPath.length() > 1:
+                parentPath.pop()
+                if parentPath.fullPathName() in destPaths:
+                    data['parentDest'] = destPaths[parentPath.fullPathName()]
+                    data['directParent'] = direct
+                    break
+                direct = False
+
+    def sample(self, keytimes, progressBar=None):
+        '''
+        sample all the animated data needed by the solve through timed DG contexts,
+        the scene time is never changed.
+
+        :param keytimes: frames to process, in the current ui time unit
+        :param progressBar: optional r9General.ProgressBarContext, checked for cancel
+        :return: False if cancelled
+        '''
+        self.keytimes = list(keytimes)
+        self._prepare()
+
+        srcPlugs = {}
+        for src, _ in self.pairs:
+            if src in srcPlugs:
+                continue
+            data = self._nodes[src]
+            fn = data['fn']
+            srcPlugs[src] = (fn.findPlug('worldMatrix').elementByLogicalIndex(0), fn.findPlug('scale'))
+            data['worldMatrix'] = []
+            data['scale'] = []
+
+        destPlugs = {}
+        for dest in self._dests:
+            data = self._nodes[dest]
+            fn = data['fn']
+            ancestorInverse = None
+            if data['parentDest']:
+                ancestorInverse = self._nodes[data['parentDest']]['fn'].findPlug('worldInverseMatrix').elementByLogicalIndex(0)
+            scalePlug = fn.findPlug('scale')
+            destPlugs[dest] = (fn.findPlug('parentMatrix').elementByLogicalIndex(0),
+                               ancestorInverse,
+                               fn.findPlug('matrix'),
+                               fn.findPlug('rotate'),
+                               fn.findPlug('translate'),
+                               scalePlug if self._isDriven(scalePlug) else None,
+                               fn.findPlug('inverseScale') if data['segmentScale'] else None)
+            data['staticScale'] = self._doublesAt(scalePlug)
+            for key in ('parentMatrix', 'local', 'rotate', 'translate', 'scale', 'inverseScale'):
+                data[key] = []
+
+        for t in self.keytimes:
+            if progressBar and progressBar.isCanceled():
+                return False
+            ctx = OpenMaya.MDGContext(OpenMaya.MTime(t, OpenMaya.MTime.uiUnit()))
+            for src, (worldPlug, scalePlug) in srcPlugs.items():
+                data = self._nodes[src]
+                data['worldMatrix'].append(self._matrixAt(worldPlug, ctx))
+                if self.snapScales:
+                    data['scale'].append(self._doublesAt(scalePlug, ctx))
+            for dest, (parentPlug, ancestorPlug, localPlug, rotatePlug, translatePlug, scalePlug, inversePlug) in destPlugs.items():
+                data = self._nodes[dest]
+                parentMatrix = self._matrixAt(parentPlug, ctx)
+                if ancestorPlug:
+                    # parent space relative to the destination above, rebuilt from its solve
+                    parentMatrix = parentMatrix * self._matrixAt(ancestorPlug, ctx)
+                data['parentMatrix'].append(parentMatrix)
+                data['local'].append(self._matrixAt(localPlug, ctx))
+                data['rotate'].append(OpenMaya.MEulerRotation(*(self._doublesAt(rotatePlug, ctx) + [data['rotateOrder']])))
+                data['translate'].append(OpenMaya.MVector(*self._doublesAt(translatePlug, ctx)))
+                data['scale'].append(self._doublesAt(scalePlug, ctx) if scalePlug else data['staticScale'])
+                data['inverseScale'].append(self._doublesAt(inversePlug, ctx) if inversePlug else None)
+            if progressBar:
+                progressBar.updateProgress()
+        return True
+
+    def _parentMatrix(self, dest, index):
+        data = self._nodes[dest]
+        if data['parentDest']:
+            return data['parentMatrix'][index] * self._worldMatrix(data['parentDest'], index)
+        return data['parentMatrix'][index]
+
+    def _worldMatrix(self, dest, index):
+        return self._nodes[dest]['local'][index] * self._parentMatrix(dest, index)
+
+    def _solvePair(self, src, dest, index):
+        '''
+        solve the destination's local transform for a single frame, using the
+        current state of any destinations above it in the dag
+        '''
+        srcData = self._nodes[src]
+        data = self._nodes[dest]
+        srcWorld = srcData['worldMatrix'][index]
+        parentMatrix = self._parentMatrix(dest, index)
+
+        if self.snapScales:
+            data['scale'][index] = srcData['scale'][index]
+        euler = data['rotate'][index]
+        if self.snapRotates:
+            # world rotation = rotateAxis * rotate * jointOrient * parent rotation
+            rotation = self._rotationMatrix(srcWorld) * self._rotationMatrix(parentMatrix).inverse()
+            if data['jointOrient'] is not None:
+                rotation = rotation * data['jointOrient'].inverse()
+            rotation = data['rotateAxis'].inverse() * rotation
+            euler = OpenMaya.MTransformationMatrix(rotation).eulerRotation()
+            euler.reorderIt(data['rotateOrder'])
+            # keep the curves continuous, closest solution to the previous frame
+            euler.setToClosestSolution(data['rotate'][index - 1] if index else data['rotate'][index])
+            data['rotate'][index] = euler
+
+        tm = OpenMaya.MTransformationMatrix(data['tm'])
+        util = OpenMaya.MScriptUtil()
+        util.createFromList(data['scale'][index], 3)
+        tm.setScale(util.asDoublePtr(), OpenMaya.MSpace.kTransform)
+        tm.rotateTo(euler)
+        tm.setTranslation(OpenMaya.MVector(), OpenMaya.MSpace.kTransform)
+        matrix = tm.asMatrix()
+        if data['jointOrient'] is not None:
+            matrix = matrix * data['jointOrient']
+        if data['segmentScale']:
+            if data['directParent']:
+                inverseScale = self._nodes[data['parentDest']]['scale'][index]
+            else:
+                inverseScale = data['inverseScale'][index]
+            matrix = matrix * self._scaleMatrix([1.0 / s if s else 1.0 for s in inverseScale])
+
+        if self.snapTranslates:
+            # translate so that our rotatePivot lands on the source's world rotatePivot
+            target = srcData['rotatePivot'] * srcWorld * parentMatrix.inverse()
+            data['translate'][index] = target - data['rotatePivot'] * matrix
+        translate = OpenMaya.MTransformationMatrix()
+        translate.setTranslation(data['translate'][index], OpenMaya.MSpace.kTransform)
+        data['local'][index] = matrix * translate.asMatrix()
+
+    def solve(self):
+        '''
+        solve all the pairs over the sampled frames, in the order given
+        '''
+        for _ in range(self.iterations):
+            for src, dest in self.pairs:
+                for index in range(len(self.keytimes)):
+                    self._solvePair(src, dest, index)
+
+    def bake(self):
+        '''
+        write the solved channels, one animCurve pass per channel
+        '''
+        for dest in self._dests:
+            data = self._nodes[dest]
+            channels = []
+            if self.snapTranslates:
+                for i, attr in enumerate(('translateX', 'translateY', 'translateZ')):
+                    channels.append((attr, [OpenMaya.MDistance.internalToUI(v[i]) for v in data['translate']]))
+            if self.snapRotates:
+                for attr, axis in (('rotateX', 'x'), ('rotateY', 'y'), ('rotateZ', 'z')):
+                    channels.append((attr, [OpenMaya.MAngle.internalToUI(getattr(e, axis)) for e in data['rotate']]))
+            if self.snapScales:
+                for i, attr in enumerate(('scaleX', 'scaleY', 'scaleZ')):
+                    channels.append((attr, [s[i] for s in data['scale']]))
+            for attr, values in channels:
+                if cmds.getAttr('%s.%s' % (dest, attr), lock=True):
+                    continue
+                setAnimCurveData(dest, attr, self.keytimes, values)
+
+    def run(self, keytimes, progressBar=None):
+        '''
+        sample, solve and bake the pairs over the given keytimes
+
+        :return: False if cancelled by the progressBar
+        '''
+        start = time.time()
+        if not self.sample(keytimes, progressBar):
+            return False
+        self.timings['sample'] = time.time() - start
+        start = time.time()
+        self.solve()
+        self.timings['solve'] = time.time() - start
+        start = time.time()
+        self.bake()
+        self.timings['bake'] = time.time() - start
+        log.info('SnapBakeEngine : %i pairs over %i frames, sample %.3fs : solve %.3fs : bake %.3fs'
+                 % (len(self.pairs), len(self.keytimes), self.timings['sample'], self.timings['solve'], self.timings['bake']))
+        return True
+
+
 # ===========================================================================
 # Main AnimFunction code class
 # ===========================================================================
@@ -3467,8 +4216,60 @@ class AnimFunctions(object):
                           mergeLayers=mergeLayers)
 
     # @r9General.Timer
+    @staticmethod
+    def _copyKeys_transfer(nodeList, time=(), pasteKey='replace', attributes=None, timeOffset=0):
+        '''
+        copyKeys backend that moves the animCurve data directly through the API via
+        transferAnimCurves, rather than a copyKey / pasteKey through the clipboard per node.
+
+        :return: [(src, dest, attributes)] still to process via the clipboard, any pairs on
+            animLayers, sources not driven directly by animCurves, pairBlends etc, or channels
+            the transfer couldn't deal with
+        '''
+        clipboard = []
+        transfer = []
+        layerMembers = set()
+        if getAnimLayersFromGivenNodes([node for pair in nodeList for node in pair]):
+            layerMembers = set(getAnimLayerMembers())
+        curves = []
+        plugs = []
+        for src, dest in nodeList:
+            if layerMembers and layerMembers.intersection(cmds.ls([src, dest], l=True)):
+                # pairs on animLayers go through the clipboard which resolves the layer curves
+                clipboard.append((src, dest, attributes))
+                continue
+            connections = cmds.listConnections(src, s=True, d=False, c=True, p=False, type='animCurve') or []
+            if not connections or cmds.listConnections(src, s=True, d=False, type='pairBlend'):
+                # keys behind a pairBlend (keyed then constrained) are only found by copyKey
+                clipboard.append((src, dest, attributes))
+                continue
+            attrs = None
+            if attributes:
+                attrs = set()
+                for attr in attributes:
+                    if cmds.attributeQuery(attr, node=src, exists=True):
+                        attrs.update([attr,
+                                      cmds.attributeQuery(attr, node=src, longName=True),
+                                      cmds.attributeQuery(attr, node=src, shortName=True)])
+            for plug, curve in zip(connections[0::2], connections[1::2]):
+                attr = plug.split('.', 1)[-1]
+                if attrs is not None and attr not in attrs:
+                    continue
+                if not cmds.objExists('%s.%s' % (dest, attr)):
+                    continue
+                curves.append(curve)
+                plugs.append('%s.%s' % (dest, attr))
+                transfer.append((src, dest, attr))
+
+        failed = set(transferAnimCurves(curves, plugs, option=pasteKey, time=time, timeOffset=timeOffset))
+        for (src, dest, attr), plug in zip(transfer, plugs):
+            if plug in failed:
+                clipboard.append((src, dest, [attr]))
+        return clipboard
+
     def copyKeys(self, nodes=None, time=(), pasteKey='replace', attributes=None,
-                 filterSettings=None, toMany=False, matchMethod=None, mergeLayers=False, timeOffset=0, **kws):
+                 filterSettings=None, toMany=False, matchMethod=None, mergeLayers=False, timeOffset=0,
+                 apiTransfer=True, **kws):
         '''
         Copy Keys is a Hi-Level wrapper function to copy animation data between
         filtered nodes, either in hierarchies or just selected pairs.
@@ -3490,6 +4291,9 @@ class AnimFunctions(object):
         :param matchMethod: arg passed to the match code, sets matchMethod used to match 2 node names, see r9Core.matchNodeLists for details
         :param mergeLayers: this pre-processes animLayers so that we have a single, temporary merged
             animLayer to extract a compiled version of the animData from. This gets deleted afterwards.
+        :param apiTransfer: if True (default) the curves are transferred directly via the TransferAnimCurves
+            plug-in rather than through the key clipboard. Nodes on animLayers, unsupported pasteKey options
+            or anything the transfer fails on are processed via the clipboard as before
 
         TODO: this needs to support 'skipAttrs' param like the copyAttrs does - needed for the snapTransforms calls
         '''
@@ -3517,14 +4321,22 @@ class AnimFunctions(object):
         with AnimationLayerContext(srcNodes, mergeLayers=mergeLayers, restoreOnExit=True):
             if nodeList:
                 with r9General.HIKContext([d for _, d in nodeList]):
-                    for src, dest in nodeList:
+                    pairs = [(src, dest, attributes) for src, dest in nodeList]
+                    if apiTransfer and pasteKey in ('replace', 'replaceCompletely', 'merge', 'insert') \
+                            and (not time or len(time) == 2):
+                        try:
+                            pairs = self._copyKeys_transfer(nodeList, time=time, pasteKey=pasteKey,
+                                                            attributes=attributes, timeOffset=timeOffset)
+                        except StandardError, err:
+                            log.debug('TransferAnimCurves failed, reverting to the key clipboard : %s' % err)
+                    for src, dest, attrs in pairs:
                         try:
                             if logging_is_debug():
                                 log.debug('copyKeys : %s > %s' % (r9Core.nodeNameStrip(dest),
                                                                     r9Core.nodeNameStrip(src)))
-                            if attributes:
+                            if attrs:
                                 # copy only specific attributes
-                                for attr in attributes:
+                                for attr in attrs:
                                     if cmds.copyKey(src, attribute=attr, hierarchy=False, time=time):
                                         cmds.pasteKey(dest, attribute=attr, option=pasteKey, timeOffset=timeOffset)
                             else:
@@ -3642,7 +4454,8 @@ class AnimFunctions(object):
 #     @r9General.evalManager_idleAction
     def snapTransform(self, nodes=None, time=(), step=1, preCopyKeys=1, preCopyAttrs=1, filterSettings=None,
                       iterations=1, matchMethod=None, prioritySnapOnly=False, snapRotates=True, snapTranslates=True, 
-                      snapScales=False, additionalCalls=[], cutkeys=False, smartbake=False, smartBakeRef=[], additionalCalls_pre=[], **kws):
+                      snapScales=False, additionalCalls=[], cutkeys=False, smartbake=False, smartBakeRef=[], additionalCalls_pre=[],
+                      bulkBake=True, **kws):
         '''
         Snap objects over a timeRange. This wraps the default hierarchy filters
         so it's capable of multiple hierarchy filtering and matching methods.
@@ -3681,6 +4494,10 @@ class AnimFunctions(object):
             are then respected during the process
         :param smartBakeRef: smartbake=True if given, used as reference nodes to extract keytimes from, else we look at all nodes about to be
             processed which isn't always what we want. If we still find no keytimes we revert to base range times with step given
+        :param bulkBake: when processing a timerange, bake via the SnapBakeEngine, sampling the data through timed
+            contexts, solving in memory and writing each animCurve in a single pass. We revert to the frame by frame
+            process if the nodes aren't supported, or if smartbake or any additionalCalls are used as these need the
+            scene evaluated at each frame
 
         .. note::
             you can also pass the CopyKey kws in to the preCopy call, see copyKeys above
@@ -3692,7 +4509,7 @@ class AnimFunctions(object):
         '''
         self.snapCacheData = {}  # TO DO - Cache the data and check after first run data is all valid
         self.nodesToSnap = []
-        _smartBake_nodekeys = {}
+        _smartBake_keyIndex = None
         _smartBakeRef = list(smartBakeRef)  # so we don't mutate the input arg (pass by reference issues)
         # cutkeys = False
 
@@ -3754,10 +4571,8 @@ class AnimFunctions(object):
                 if not _smartBakeRef:
                     for node in self.nodesToSnap:
                         _smartBakeRef.extend(node)  # have to take both as the src may have no keys, it may be driven
-                for node in _smartBakeRef:
-                    _keys = timeLineRangeProcess(time[0], time[1], step, incEnds=True, nodes=node)
-                    if _keys:
-                        _smartBake_nodekeys[node] = _keys
+                # index all the reference key times in one pass rather than re-querying per node / frame
+                _smartBake_keyIndex = KeyTimeIndex(_smartBakeRef, time=time)
                 if not _smartBakeRef:
                     raise IOError("ABORTED : SmartBake couldn't find any reference nodes with keys to base the data on!")
 
@@ -3775,7 +4590,8 @@ class AnimFunctions(object):
                         progressBar = r9General.ProgressBarContext(maxValue=time[1] - time[0], step=step, ismain=True)
                         
                         # grab the frms BEFORE we cut the keys in-case the nodes to process are part of the _smartbake list
-                        keytimes = timeLineRangeProcess(time[0], time[1], step, incEnds=True, nodes=_smartBakeRef)
+                        keytimes = timeLineRangeProcess(time[0], time[1], step, incEnds=True, nodes=_smartBakeRef,
+                                                        keyIndex=_smartBake_keyIndex)
 
                         if cutkeys:
                             for _, dest in self.nodesToSnap:
@@ -3787,6 +4603,24 @@ class AnimFunctions(object):
                                 if snapScales:
                                     cmds.cutKey(dest, at='scale', time=time)
 
+                        # bulk bake, sample / solve in memory and write the curves in one pass
+                        if bulkBake and _smartBake_keyIndex is None and not additionalCalls and not additionalCalls_pre:
+                            bakeEngine = SnapBakeEngine(self.nodesToSnap,
+                                                        snapTranslates=snapTranslates,
+                                                        snapRotates=snapRotates,
+                                                        snapScales=snapScales,
+                                                        iterations=iterations)
+                            if not bakeEngine.isSupported():
+                                log.info('SnapBakeEngine : nodes not supported by the bulk bake, reverting to frame by frame processing')
+                            else:
+                                try:
+                                    with progressBar:
+                                        cancelled = not bakeEngine.run(keytimes, progressBar)
+                                    keytimes = []  # baked, nothing left for the frame by frame process
+                                except StandardError:
+                                    log.warning('SnapBakeEngine failed, reverting to frame by frame processing')
+                                    log.debug(traceback.format_exc())
+
                         with progressBar:
                             for t in keytimes:  # timeLineRangeProcess(time[0], time[1], step, incEnds=True, nodes=_smartBakeRef):
                                 if progressBar.isCanceled():
@@ -3807,36 +4641,50 @@ class AnimFunctions(object):
                                             log.debug('Additional Pre-Snap Func Called : %s' % func)
                                             func()
 
+                                    _pairs = []
                                     for src, dest in self.nodesToSnap:
                                         # verify the src node has a key at the given accumulated keytime (if smartbake)
-                                        if _smartBake_nodekeys and src in _smartBake_nodekeys.keys() and t not in _smartBake_nodekeys[src]:
+                                        if _smartBake_keyIndex is not None and src in _smartBake_keyIndex and not _smartBake_keyIndex.hasKey(src, t):
                                             if logging_is_debug():
                                                 log.debug('skipping time : %s : node : %s' % (t, r9Core.nodeNameStrip(src)))
                                         else:
-#                                             cmds.matchTransform(src, dest, pos=snapTranslates, rot=snapRotates, scl=snapScales)  # still not an option
-                                            try:
-                                                cmds.SnapTransforms(source=src, destination=dest,
-                                                                    timeEnabled=True,
-    #                                                                 time=t,
-                                                                    snapRotates=snapRotates,
-                                                                    snapTranslates=snapTranslates,
-                                                                    snapScales=snapScales)
-                                                cmds.setKeyframe(dest, at=_keyed_attrs)
-    
-                                                if logging_is_debug():
+                                            _pairs.append((src, dest))
+                                    if _pairs:
+#                                         cmds.matchTransform(src, dest, pos=snapTranslates, rot=snapRotates, scl=snapScales)  # still not an option
+                                        try:
+                                            # all pairs snapped, in order, in a single call
+                                            cmds.SnapTransforms(source=[src for src, _ in _pairs],
+                                                                destination=[dest for _, dest in _pairs],
+                                                                timeEnabled=True,
+                                                                snapRotates=snapRotates,
+                                                                snapTranslates=snapTranslates,
+                                                                snapScales=snapScales)
+                                            cmds.setKeyframe([dest for _, dest in _pairs], at=_keyed_attrs)
+                                            if logging_is_debug():
+                                                for src, dest in _pairs:
                                                     log.debug('Snapfrm %s : source(%s) >> target(%s) ::  %s to %s' % (str(t),
                                                                                                                       r9Core.nodeNameStrip(src),
                                                                                                                       r9Core.nodeNameStrip(dest),
                                                                                                                       dest,
                                                                                                                       src))
-                                            except Exception as err:
-                                                if logging_is_debug():
-                                                    log.debug('Snapfrm FAILED : %s : source(%s) >> target(%s) ::  %s to %s' % (str(t),
-                                                                                                                      r9Core.nodeNameStrip(src),
-                                                                                                                      r9Core.nodeNameStrip(dest),
-                                                                                                                      dest,
-                                                                                                                      src))
-                                                    log.debug(traceback.format_exc())
+                                        except Exception:
+                                            # a pair failed, re-run them individually so the rest still get processed
+                                            for src, dest in _pairs:
+                                                try:
+                                                    cmds.SnapTransforms(source=src, destination=dest,
+                                                                        timeEnabled=True,
+                                                                        snapRotates=snapRotates,
+                                                                        snapTranslates=snapTranslates,
+                                                                        snapScales=snapScales)
+                                                    cmds.setKeyframe(dest, at=_keyed_attrs)
+                                                except Exception:
+                                                    if logging_is_debug():
+                                                        log.debug('Snapfrm FAILED : %s : source(%s) >> target(%s) ::  %s to %s' % (str(t),
+                                                                                                                          r9Core.nodeNameStrip(src),
+                                                                                                                          r9Core.nodeNameStrip(dest),
+                                                                                                                          dest,
+                                                                                                                          src))
+                                                        log.debug(traceback.format_exc())
                                     # standard POST-SNAP additional calls
                                     if additionalCalls:
                                         for func in additionalCalls:
@@ -3854,12 +4702,13 @@ class AnimFunctions(object):
                             for func in additionalCalls_pre:
                                 log.debug('Additional Pre-Snap Func Called : %s' % func)
                                 func()
+                        cmds.SnapTransforms(source=[src for src, _ in self.nodesToSnap],
+                                            destination=[dest for _, dest in self.nodesToSnap],
+                                            timeEnabled=False,
+                                            snapRotates=snapRotates,
+                                            snapTranslates=snapTranslates,
+                                            snapScales=snapScales)
                         for src, dest in self.nodesToSnap:  # nodeList.MatchedPairs:
-                            cmds.SnapTransforms(source=src, destination=dest,
-                                                timeEnabled=False,
-                                                snapRotates=snapRotates,
-                                                snapTranslates=snapTranslates,
-                                                snapScales=snapScales)
                             if logging_is_debug():
                                 log.debug('Snapfrm : source(%s) >> target(%s) :: %s to %s' % (r9Core.nodeNameStrip(src),
                                                                                               r9Core.nodeNameStrip(dest),
@@ -3927,7 +4776,7 @@ class AnimFunctions(object):
                                 timeEnabled=False)
 
     @staticmethod
-    def stabilizer(nodes=None, time=(), step=1, trans=True, rots=True):
+    def stabilizer(nodes=None, time=(), step=1, trans=True, rots=True, smartbake=False):
         '''
         This is designed with 2 specific functionalities:
         If you have a single node selected it will stabilize it regardless
@@ -3942,6 +4791,8 @@ class AnimFunctions(object):
         :param step: int value for frame advance between process runs
         :param trans: track translates
         :param rots: track rotates
+        :param smartbake: if True, and given a time range, we only process the frames where the
+            given nodes currently have keys, ignoring the step
         '''
         # destObj = None  #Main Object being manipulated and keyed
         # snapRef = None  #Tracking ReferenceObject Used to Pass the transforms over
@@ -3965,7 +4816,10 @@ class AnimFunctions(object):
 
         with r9General.AnimationContext(eval_mode=eval_mode, time=False):  # , cached_eval=False):
             if time:
-                timeRange = timeLineRangeProcess(time[0], time[1], step, incEnds=True)  # this is a LIST of frames
+                keyIndex = None
+                if smartbake:
+                    keyIndex = KeyTimeIndex(nodes or cmds.ls(sl=True, l=True), time=time, perNode=False)
+                timeRange = timeLineRangeProcess(time[0], time[1], step, incEnds=True, keyIndex=keyIndex)  # this is a LIST of frames
                 cmds.currentTime(timeRange[0], e=True)  # ensure that the initial time is updated
                 duration = time[1] - time[0]
                 log.debug('timeRange : %s', timeRange)
@@ -5062,6 +5916,51 @@ class MirrorHierarchy(object):
             log.debug('%s node has no MirrorData' % r9Core.nodeNameStrip(node))
             return ''
 
+    def getMirrorDataMap(self, nodes):
+        '''
+        bulk version of getMirrorSide / getMirrorIndex, resolving the mirror data for
+        all the given nodes in one API pass rather than 2 getAttr calls per node
+
+        :param nodes: nodes to process
+        :return: {node: (side, index)} where side / index are None if the attr doesn't exist
+        '''
+        data = {}
+        depFn = OpenMaya.MFnDependencyNode()
+        mobj = OpenMaya.MObject()
+        selList = OpenMaya.MSelectionList()
+        for node in nodes:
+            if node in data:
+                continue
+            try:
+                selList.clear()
+                selList.add(node)
+                selList.getDependNode(0, mobj)
+                depFn.setObject(mobj)
+            except:
+                log.debug('%s node has no MirrorData' % r9Core.nodeNameStrip(node))
+                data[node] = (None, None)
+                continue
+            side = None
+            index = None
+            if depFn.hasAttribute(self.mirrorSide):
+                try:
+                    plug = depFn.findPlug(self.mirrorSide)
+                    side = OpenMaya.MFnEnumAttribute(plug.attribute()).fieldName(plug.asShort())
+                except RuntimeError:
+                    side = self.getMirrorSide(node)  # not an enum, let getAttr deal with it
+            if depFn.hasAttribute(self.mirrorIndex):
+                index = int(depFn.findPlug(self.mirrorIndex).asDouble())
+            data[node] = (side, index)
+        return data
+
+    def getMirrorCompiledIDs(self, nodes):
+        '''
+        bulk version of getMirrorCompiledID
+
+        :return: {node: compiledID}, ie 'Centre_10'
+        '''
+        return dict((node, '%s_%s' % (side, index)) for node, (side, index) in self.getMirrorDataMap(nodes).items())
+
     def getMirrorAxis(self, node):
         '''
         get any custom attributes set at node level to inverse, if none found
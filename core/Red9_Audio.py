@@ -33,6 +33,7 @@ import Red9_CoreUtils as r9Core
 
 import wave
 import contextlib
+import struct
 
 import logging
 logging.basicConfig()
@@ -44,6 +45,17 @@ try:
 except:
     log.debug('unable to import pydub libs')
 
+try:
+    import audioop
+except ImportError:
+    from ..packages.pydub.pydub import pyaudioop as audioop
+
+try:
+    import numpy
+except:
+    numpy = None
+    log.debug('unable to import numpy, combineAudio falling back to audioop for the sample mixing')
+
 
 # ------------------------------------------------------------------------------------------------
 # ProPack management and legacy wraps for the timecode converts
@@ -201,6 +213,178 @@ def inspect_wav(multi=False, audioNodes=[]):
 
 # Audio Handlers  -----------------------------------------------------
 
+# ------------------------------------------------------------------------------------------------
+# Streaming audio mixer ---
+# ------------------------------------------------------------------------------------------------
+
+AUDIO_MIX_BLOCK = 65536  # frames mixed per block, this bounds the memory used by the mixer
+
+class _AudioClipStream(object):
+    '''
+    streams the frames of a single wav, trimmed to the given source range, converted on
+    the fly to the mixer's output format. The wav is only held open while the clip is active
+    '''
+    def __init__(self, path, startMS, sourceStartMS, sourceEndMS):
+        '''
+        :param path: wav to stream
+        :param startMS: where the clip starts in the output track
+        :param sourceStartMS: trimmed start of the clip within the wav
+        :param sourceEndMS: trimmed end of the clip within the wav
+        '''
+        self.path = path
+        self.startMS = startMS
+        self.outStart = 0  # start frame in the output track, set by setOutputFormat
+        self.exhausted = False
+        self._wav = None
+        self._pending = ''
+        self._ratecvState = None
+        with contextlib.closing(wave.open(path, 'rb')) as wav:
+            self.channels = wav.getnchannels()
+            self.sample_width = wav.getsampwidth()
+            self.frame_rate = wav.getframerate()
+            self.sourceStart = int(sourceStartMS * self.frame_rate / 1000.0)
+            self.sourceEnd = min(int(sourceEndMS * self.frame_rate / 1000.0), wav.getnframes())
+
+    def setOutputFormat(self, channels, sample_width, frame_rate):
+        self._outChannels = channels
+        self._outWidth = sample_width
+        self._outRate = frame_rate
+        self.outStart = int(self.startMS * frame_rate / 1000.0)
+
+    def _convert(self, data):
+        if self.sample_width == 1:
+            data = audioop.bias(data, 1, -128)  # 8bit wavs are unsigned
+        if not self.sample_width == self._outWidth:
+            data = audioop.lin2lin(data, self.sample_width, self._outWidth)
+        if self.channels == 1 and self._outChannels == 2:
+            data = audioop.tostereo(data, self._outWidth, 1, 1)
+        if not self.frame_rate == self._outRate:
+            data, self._ratecvState = audioop.ratecv(data, self._outWidth, self._outChannels,
+                                                     self.frame_rate, self._outRate, self._ratecvState)
+        return data
+
+    def read(self, frames):
+        '''
+        :return: up to the given number of frames, in the output format. Shorter once the clip runs out
+        '''
+        if self._wav is None:
+            self._wav = wave.open(self.path, 'rb')
+            self._wav.setpos(self.sourceStart)
+            self._remaining = max(0, self.sourceEnd - self.sourceStart)
+        size = frames * self._outChannels * self._outWidth
+        chunks = [self._pending]
+        pending = len(self._pending)
+        while pending < size and self._remaining > 0:
+            nframes = min(AUDIO_MIX_BLOCK, self._remaining)
+            data = self._wav.readframes(nframes)
+            if not data:
+                self._remaining = 0
+                break
+            self._remaining -= nframes
+            data = self._convert(data)
+            chunks.append(data)
+            pending += len(data)
+        data = ''.join(chunks)
+        self._pending = data[size:]
+        if not self._pending and self._remaining <= 0:
+            self.close()
+        return data[:size]
+
+    def close(self):
+        self.exhausted = True
+        if self._wav:
+            self._wav.close()
+            self._wav = None
+
+
+def _mixAudioBlock(chunks, frames, channels, sample_width):
+    '''
+    sum the clip chunks into a single block, clipping to the sample range.
+
+    :param chunks: [(frameOffset, data)] where data is in the output format
+    '''
+    frameWidth = channels * sample_width
+    if numpy is not None:
+        dtype = {2: '<i2', 4: '<i4'}[sample_width]
+        block = numpy.zeros(frames * channels, dtype=numpy.int64)
+        for offset, data in chunks:
+            samples = numpy.frombuffer(data, dtype=dtype)
+            block[offset * channels:offset * channels + len(samples)] += samples
+        limit = 2 ** (sample_width * 8 - 1)
+        numpy.clip(block, -limit, limit - 1, out=block)
+        return block.astype(dtype).tostring()
+    # audioop.add saturates on each add, as per the original pydub overlay
+    block = '\0' * (frames * frameWidth)
+    for offset, data in chunks:
+        start = offset * frameWidth
+        end = start + len(data)
+        block = block[:start] + audioop.add(block[start:end], data, sample_width) + block[end:]
+    return block
+
+def mixAudioClips(clips, filepath, duration, blockSize=AUDIO_MIX_BLOCK):
+    '''
+    Streaming mixer : the clips are sorted by start and mixed block by block straight
+    into a wav writer so memory stays constant regardless of the overall length.
+    As per pydub's overlay the output format is the widest of all the clips, with a
+    minimum of mono, 16bit, 11025Hz, and clips are cut at the end of the duration.
+
+    :param clips: [(wavpath, startMS, sourceStartMS, sourceEndMS)]
+    :param filepath: wav to write
+    :param duration: length of the output track in milliseconds
+    :return: list of the clip paths that failed to mix
+    '''
+    streams = []
+    failed = []
+    for path, startMS, sourceStartMS, sourceEndMS in clips:
+        try:
+            stream = _AudioClipStream(path, startMS, sourceStartMS, sourceEndMS)
+        except (IOError, EOFError, wave.Error, struct.error), err:
+            log.warning('Audio file failed to open : "%s" : %s' % (path, err))
+            failed.append(path)
+            continue
+        if stream.sample_width not in [1, 2, 4] or stream.channels > 2:
+            log.warning('Audio format is NOT supported in Python audioop lib!  : "%s" == %ibit %i channels' %
+                        (path, stream.sample_width * 8, stream.channels))
+            failed.append(path)
+            continue
+        streams.append(stream)
+
+    channels = max([1] + [stream.channels for stream in streams])
+    sample_width = max([2] + [stream.sample_width for stream in streams])
+    frame_rate = max([11025] + [stream.frame_rate for stream in streams])
+    frameWidth = channels * sample_width
+    totalFrames = int(frame_rate * (duration / 1000.0))
+    for stream in streams:
+        stream.setOutputFormat(channels, sample_width, frame_rate)
+    streams = sorted(streams, key=lambda x: x.outStart)
+
+    active = []
+    nextStream = 0
+    with contextlib.closing(wave.open(filepath, 'wb')) as output:
+        output.setnchannels(channels)
+        output.setsampwidth(sample_width)
+        output.setframerate(frame_rate)
+        for blockStart in range(0, totalFrames, blockSize):
+            frames = min(blockSize, totalFrames - blockStart)
+            while nextStream < len(streams) and streams[nextStream].outStart < blockStart + frames:
+                active.append(streams[nextStream])
+                nextStream += 1
+            chunks = []
+            for stream in active:
+                offset = max(0, stream.outStart - blockStart)
+                data = stream.read(frames - offset)
+                if data:
+                    chunks.append((offset, data))
+            active = [stream for stream in active if not stream.exhausted]
+            if chunks:
+                output.writeframesraw(_mixAudioBlock(chunks, frames, channels, sample_width))
+            else:
+                output.writeframesraw('\0' * (frames * frameWidth))
+    for stream in active:
+        stream.close()
+    return failed
+
+
 class AudioHandler(object):
     '''
     process on multiple audio nodes within the Maya scene, ie, already loaded
@@ -494,10 +678,11 @@ class AudioHandler(object):
         if frmrange[0] < 0:
             neg_adjustment = frmrange[0]
 
-        duration = ((frmrange[1] + abs(neg_adjustment)) / r9General.getCurrentFPS()) * 1000
+        fps = r9General.getCurrentFPS()
+        duration = ((frmrange[1] + abs(neg_adjustment)) / fps) * 1000
         log.info('Audio BaseTrack duration = %f' % duration)
-        baseTrack = audio_segment.AudioSegment.silent(duration)
 
+        clips = []
         for audio in self.audioNodes:
             if not os.path.exists(audio.path):
                 log.warning('Audio file not found!  : "%s" == %s' % (audio.audioNode, audio.path))
@@ -507,19 +692,18 @@ class AudioHandler(object):
             # deal with any trimming of the audio node in Maya
             sourceStart = cmds.getAttr(audio.audioNode + '.sourceStart')
             sourceEnd = cmds.getAttr(audio.audioNode + '.sourceEnd')
-            sound = audio_segment.AudioSegment.from_wav(audio.path)[(sourceStart / r9General.getCurrentFPS()) * 1000:(sourceEnd / r9General.getCurrentFPS()) * 1000]
-            # sound = audio_segment.AudioSegment.from_wav(audio.path)
-            if sound.sample_width not in [1, 2, 4]:
-                log.warning('24bit Audio is NOT supported in Python audioop lib!  : "%s" == %i' % (audio.audioNode, sound.sample_width))
-                status = False
-                failed.append(audio)
-                continue
             insertFrame = (audio.startFrame + abs(neg_adjustment))
             log.info('inserting sound : %s at %f adjusted to %f' %
                      (audio.audioNode, audio.startFrame, insertFrame))
-            baseTrack = baseTrack.overlay(sound, position=(insertFrame / r9General.getCurrentFPS()) * 1000)
+            clips.append((audio, (audio.path, (insertFrame / fps) * 1000, (sourceStart / fps) * 1000, (sourceEnd / fps) * 1000)))
+
+        # streamed, block by block, so memory is constant regardless of the timeline length
+        failedPaths = mixAudioClips([clip for _, clip in clips], filepath, duration)
+        for audio, clip in clips:
+            if clip[0] in failedPaths:
+                status = False
+                failed.append(audio)
 
-        baseTrack.export(filepath, format="wav")
         compiled = AudioNode(filepath=filepath)
         compiled.importAndActivate()
         compiled.stampCompiled(self.mayaNodes)
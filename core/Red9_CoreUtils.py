@@ -23,6 +23,7 @@ import maya.OpenMaya as OpenMaya
 
 from functools import partial
 import re
+import ast
 import random
 import math
 import os
@@ -256,59 +257,56 @@ def removeNameSpace_fromDag(dagpath):
         return dagpath
     return dagpath
 
+# decodeString : literal tokens and the memo of decoded scalars
+_DECODE_LITERALS = {'True': True, 'False': False, 'None': None}
+_decodeMemo = {}
+DECODE_MEMO_SIZE = 20000
+
 def decodeString(val):
     '''
     From configObj the return is a string, we want to encode
     it back to it's original state so we pass it through this
+
+    This is eval free : bools and None are looked up, list, tuple and dict
+    strings go through ast.literal_eval and everything else is cast to int,
+    then float, else left as a string. Decoded scalars are memoized as pose
+    files repeat the same tokens ('0.0', '1.0', 'True') over and over.
+    Non-string values, ie those from JSON, are returned as is.
     '''
-    try:
+    if not isinstance(val, basestring):
         # configobj section handler to push back to native dict
+        if isinstance(val, configobj.Section):
+            return val.dict()
+        return val
+    try:
+        return _decodeMemo[val]
+    except KeyError:
+        pass
+    if not val:
+        return
+    first = val[0]
+    last = val[-1]
+    if (first == '[' and last == ']') or (first == '(' and last == ')') or (first == '{' and last == '}'):
         try:
-            from Red9.packages.configobj import Section
-            if issubclass(type(val), Section):
-                return val.dict()
-        except:
-            log.debug('failed to convert configObj section %s' % val)
-
-        if not issubclass(type(val), str) and not type(val) == unicode:
-            # log.debug('Val : %s : is not a string / unicode' % val)
-            # log.debug('ValType : %s > left undecoded' % type(val))
-            return val
-        if val == 'False' or val == 'True' or val == 'None':
-            # log.debug('Decoded as type(bool)')
-            return eval(val)
-        elif val == '[]':
-            # log.debug('Decoded as type(empty list)')
-            return eval(val)
-        elif val == '()':
-            # log.debug('Decoded as type(empty tuple)')
-            return eval(val)
-        elif val == '{}':
-            # log.debug('Decoded as type(empty dict)')
-            return eval(val)
-        elif (val[0] == '[' and val[-1] == ']'):
-            # log.debug('Decoded as type(list)')
-            return eval(val)
-        elif (val[0] == '(' and val[-1] == ')'):
-            # log.debug('Decoded as type(tuple)')
-            return eval(val)
-        elif (val[0] == '{' and val[-1] == '}'):
-            # log.debug('Decoded as type(dict)')
-            return eval(val)
-        try:
-            # log.debug('Decoded as type(int)')
-            return int(val)
-        except:
-            pass
+            return ast.literal_eval(val)
+        except StandardError:
+            log.debug('failed to decode string : %s' % val)
+            return
+    if val in _DECODE_LITERALS:
+        decoded = _DECODE_LITERALS[val]
+    else:
         try:
-            # log.debug('Decoded as type(float)')
-            return float(val)
-        except:
-            pass
-    except:
-        return
-    # log.debug('Decoded as type(string)')
-    return val
+            decoded = int(val)
+        except ValueError:
+            try:
+                decoded = float(val)
+            except ValueError:
+                # log.debug('Decoded as type(string)')
+                return val
+    if len(_decodeMemo) > DECODE_MEMO_SIZE:
+        _decodeMemo.clear()
+    _decodeMemo[val] = decoded
+    return decoded
 
 
 def validateString(strText, fix=False, illegals=['-', '#', '!', ' ', '@'], mayanode=False):
@@ -1783,6 +1781,29 @@ def getBlendTargetIndex(blendNode, targetName):
 # -------------------------------------------------------------------------------------
 # Node Matching ------
 # -------------------------------------------------------------------------------------
+def _matchTable(keyedIndices):
+    '''
+    build the {key: [index, ...]} lookup used by matchNodeLists from (index, key) pairs given
+    in ascending index order. Each index list is stored descending so that the first, lowest,
+    index is always at the end and consumed entries can be popped off cheaply
+    '''
+    table = {}
+    for index, key in keyedIndices:
+        table.setdefault(key, []).append(index)
+    for indices in table.values():
+        indices.reverse()
+    return table
+
+def _matchTableFirst(table, key, consumed):
+    '''
+    return the lowest index for the key in the table that hasn't already been consumed, else None
+    '''
+    indices = table.get(key)
+    while indices and consumed[indices[-1]]:
+        indices.pop()
+    if indices:
+        return indices[-1]
+
 # @r9General.Timer
 def matchNodeLists(nodeListA, nodeListB, matchMethod='stripPrefix', returnfails=False, prefix='', suffix='', **kws):
     '''
@@ -1815,6 +1836,14 @@ def matchNodeLists(nodeListA, nodeListB, matchMethod='stripPrefix', returnfails=
         * matchMethod="metaData" : match the nodes based on their wiring connections to the MetaData framework
 
     :return: matched pairs of tuples for processing [(a1,b2),[(a2,b2)]
+
+    .. note::
+        both lists are normalised once and nodeListB indexed into hash tables, exact names,
+        prefix/suffix stripped names and, for the stripPrefix/stripSuffix relaxed rules, every
+        tail/head of each name. Each nodeA is then resolved by lookups rather than a rescan of
+        nodeListB. Results are identical to the original nested scan: the base name match is
+        always tried first and otherwise the first remaining nodeB (in list order) satisfying
+        any of the method's rules wins.
     '''
     infoPrint = ""
     matchedData = []
@@ -1824,15 +1853,6 @@ def matchNodeLists(nodeListA, nodeListB, matchMethod='stripPrefix', returnfails=
     _A_prefix = prefix
     _B_prefix = prefix
 
-    # print 'MatchMethod : ', matchedData
-    # take a copy of B as we modify the data here
-    hierarchyB = list(nodeListB)
-
-    if matchMethod == 'mirrorIndex':
-        getMirrorID = r9Anim.MirrorHierarchy().getMirrorCompiledID
-    if matchMethod == 'metaData':
-        getMetaDict = r9Meta.MetaClass.getNodeConnectionMetaDataMap  # optimisation
-        metaDictB = {}  # a cache of the connections so we don't re-process unless we have to
     if matchMethod == 'commonSuffix':
         _A_suffix = common_suffix(nodeListA, suggested=False)
         _B_suffix = common_suffix(nodeListB, suggested=False)
@@ -1857,107 +1877,99 @@ def matchNodeLists(nodeListA, nodeListB, matchMethod='stripPrefix', returnfails=
         nodeListB.reverse()
         matchedData = zip(nodeListA, nodeListB)
     else:
+        # normalise both lists once and index nodeListB
+        strippedB = [nodeNameStrip(nodeB).upper() for nodeB in nodeListB]
+        consumed = [False] * len(nodeListB)
+        exactB = _matchTable(enumerate(strippedB))
+        relaxed = not matchMethod == 'base'
+        prefixed = relaxed and any([_A_prefix, _B_prefix])
+        suffixed = relaxed and any([_A_suffix, _B_suffix])
+        endsWith = matchMethod == 'stripPrefix' and not _A_prefix and not _B_prefix
+        startsWith = matchMethod == 'stripSuffix' and not _A_suffix and not _B_suffix
+
+        if prefixed and _B_prefix:
+            prefixStrippedB = _matchTable((i, re.sub(_B_prefix, '', name)) for i, name in enumerate(strippedB))
+        if suffixed and _B_suffix:
+            suffixStrippedB = _matchTable((i, re.sub(_B_suffix, '', name)) for i, name in enumerate(strippedB))
+        if endsWith:
+            # every tail of every name, nodeB.endswith(nodeA) becomes a lookup on nodeA
+            tailsB = _matchTable((i, name[c:]) for i, name in enumerate(strippedB) for c in range(len(name)))
+        if startsWith:
+            # every head of every name, nodeB.startswith(nodeA) becomes a lookup on nodeA
+            headsB = _matchTable((i, name[:c]) for i, name in enumerate(strippedB) for c in range(1, len(name) + 1))
+        if matchMethod == 'mirrorIndex':
+            mirrorIDs = r9Anim.MirrorHierarchy().getMirrorCompiledIDs(list(nodeListA) + list(nodeListB))
+            mirrorB = _matchTable((i, mirrorIDs[nodeB]) for i, nodeB in enumerate(nodeListB))
+        if matchMethod == 'metaData':
+            # batched, one connection query per list rather than per node
+            metaDictA = r9Meta.getNodeConnectionMetaDataMaps(nodeListA)
+            metaDictB = r9Meta.getNodeConnectionMetaDataMaps(nodeListB)
+            metaB = _matchTable((i, tuple(sorted(metaDictB[nodeB].items()))) for i, nodeB in enumerate(nodeListB))
+
         for nodeA in nodeListA:
-            if matchMethod == 'mirrorIndex':
-                indexA = getMirrorID(nodeA)
-            if matchMethod == 'metaData':
-                metaDictA = getMetaDict(nodeA)
-            matched = False
+            strippedA = nodeNameStrip(nodeA).upper()
+            matched = None
 
             # BaseMatch is a direct compare ONLY
             # note that for all string match methods we now FIRST do a base name
             # test to match like for like if we can, if successful we don't
             # progress to the main match block
             if matchMethod in ['base', 'stripPrefix', 'stripSuffix', 'commonSuffix', 'commonPrefix']:
-                strippedA = nodeNameStrip(nodeA).upper()
-                for nodeB in hierarchyB:
-                    strippedB = nodeNameStrip(nodeB).upper()
-                    if strippedA == strippedB:
-                        if logging_is_debug():
-                            infoPrint += '\nMatch Method : %s : %s == %s' % \
-                                    (matchMethod, nodeA.split('|')[-1], nodeB.split('|')[-1])
-                        matchedData.append((nodeA, nodeB))
-                        hierarchyB.remove(nodeB)
-                        matched = True
-                        break
-
-            if not matchMethod == 'base':
-
-                for nodeB in hierarchyB:
-                    strippedB = nodeNameStrip(nodeB).upper()
-
-                    # we have a common prefix so use that to strip the string before the match
-                    if any([_A_prefix, _B_prefix]) and not matched:
-                        if (_A_prefix and re.sub(_A_prefix, '', strippedA) == strippedB) \
-                            or (_B_prefix and re.sub(_B_prefix, '', strippedB)  == strippedA):
-                            if logging_is_debug():
-                                infoPrint += '\nMatch Method : %s : %s == %s' % \
-                                         (matchMethod, nodeA.split('|')[-1], nodeB.split('|')[-1])
-                            matchedData.append((nodeA, nodeB))
-                            hierarchyB.remove(nodeB)
-                            matched = True
-                            break
-
-                    # we have a common suffix so use that to strip the string before the match
-                    if any([_A_suffix, _B_suffix]) and not matched:
-                        if (_A_suffix and re.sub(_A_suffix, '', strippedA) == strippedB) \
-                            or (_B_suffix and re.sub(_B_suffix, '', strippedB)  == strippedA):
-                            if logging_is_debug():
-                                infoPrint += '\nMatch Method : %s : CommonSuffix : %s %s : %s == %s' % \
-                                         (matchMethod, _A_suffix, _B_suffix, nodeA.split('|')[-1], nodeB.split('|')[-1])
-                            matchedData.append((nodeA, nodeB))
-                            hierarchyB.remove(nodeB)
-                            matched = True
-                            break
-
-                    # no common prefix so use the str.endswith method to test, this can cause issues
-                    if matchMethod == 'stripPrefix' and not matched and not _A_prefix and not _B_prefix:                            
-                        if strippedA.endswith(strippedB) \
-                            or strippedB.endswith(strippedA):
-                            if logging_is_debug():
-                                infoPrint += '\nMatch Method : %s : %s == %s' % \
-                                         (matchMethod, nodeA.split('|')[-1], nodeB.split('|')[-1])
-                            matchedData.append((nodeA, nodeB))
-                            hierarchyB.remove(nodeB)
-                            matched = True
-                            break
-
-                    # no common suffix so use the str.startswith method to test, this can cause issues
-                    elif matchMethod == 'stripSuffix' and not matched and not _A_suffix and not _B_suffix:        
-                        if strippedA.startswith(strippedB) \
-                            or strippedB.startswith(strippedA):
-                            if logging_is_debug():
-                                infoPrint += '\nMatch Method : %s : %s == %s' % \
-                                         (matchMethod, nodeA.split('|')[-1], nodeB.split('|')[-1])
-                            matchedData.append((nodeA, nodeB))
-                            hierarchyB.remove(nodeB)
-                            matched = True
-                            break
-
-                    # compare using the nodes internal mirrorIndex if found
-                    elif matchMethod == 'mirrorIndex':
-                        if indexA and indexA == getMirrorID(nodeB):
-                            if logging_is_debug():
-                                infoPrint += '\nMatch Method : %s : %s == %s' % \
-                                        (matchMethod, nodeA.split('|')[-1], nodeB.split('|')[-1])
-                            matchedData.append((nodeA, nodeB))
-                            hierarchyB.remove(nodeB)
-                            matched = True
-                            break
-
-                    # straight metaData wire compare
-                    elif matchMethod == 'metaData':
-                        if nodeB not in metaDictB.keys():
-                            metaDictB[nodeB] = getMetaDict(nodeB)
-                        if metaDictA and metaDictA == metaDictB[nodeB]:  # getMetaDict(nodeB):
-                            if logging_is_debug():
-                                infoPrint += '\nMatch Method : %s : %s == %s' % \
-                                        (matchMethod, nodeA.split('|')[-1], nodeB.split('|')[-1])
-                            matchedData.append((nodeA, nodeB))
-                            hierarchyB.remove(nodeB)
-                            matched = True
-                            break
-            if not matched:
+                matched = _matchTableFirst(exactB, strippedA, consumed)
+
+            if relaxed and matched is None:
+                # gather the first remaining candidate from each rule, the lowest index wins
+                # which is the nodeB the original list scan would have hit first
+                candidates = []
+
+                # we have a common prefix so use that to strip the string before the match
+                if prefixed:
+                    if _A_prefix:
+                        candidates.append(_matchTableFirst(exactB, re.sub(_A_prefix, '', strippedA), consumed))
+                    if _B_prefix:
+                        candidates.append(_matchTableFirst(prefixStrippedB, strippedA, consumed))
+
+                # we have a common suffix so use that to strip the string before the match
+                if suffixed:
+                    if _A_suffix:
+                        candidates.append(_matchTableFirst(exactB, re.sub(_A_suffix, '', strippedA), consumed))
+                    if _B_suffix:
+                        candidates.append(_matchTableFirst(suffixStrippedB, strippedA, consumed))
+
+                # no common prefix so use the str.endswith method to test, this can cause issues
+                if endsWith:
+                    for c in range(len(strippedA)):
+                        candidates.append(_matchTableFirst(exactB, strippedA[c:], consumed))
+                    candidates.append(_matchTableFirst(tailsB, strippedA, consumed))
+
+                # no common suffix so use the str.startswith method to test, this can cause issues
+                elif startsWith:
+                    for c in range(1, len(strippedA) + 1):
+                        candidates.append(_matchTableFirst(exactB, strippedA[:c], consumed))
+                    candidates.append(_matchTableFirst(headsB, strippedA, consumed))
+
+                # compare using the nodes internal mirrorIndex if found
+                elif matchMethod == 'mirrorIndex':
+                    if mirrorIDs[nodeA]:
+                        candidates.append(_matchTableFirst(mirrorB, mirrorIDs[nodeA], consumed))
+
+                # straight metaData wire compare
+                elif matchMethod == 'metaData':
+                    if metaDictA[nodeA]:
+                        candidates.append(_matchTableFirst(metaB, tuple(sorted(metaDictA[nodeA].items())), consumed))
+
+                candidates = [index for index in candidates if index is not None]
+                if candidates:
+                    matched = min(candidates)
+
+            if matched is not None:
+                nodeB = nodeListB[matched]
+                consumed[matched] = True
+                matchedData.append((nodeA, nodeB))
+                if logging_is_debug():
+                    infoPrint += '\nMatch Method : %s : %s == %s' % \
+                            (matchMethod, nodeA.split('|')[-1], nodeB.split('|')[-1])
+            else:
                 unmatched.append(nodeA)
 
         if unmatched and logging_is_debug():
@@ -2399,9 +2411,7 @@ class LockChannels(object):
             if not node.hasAttr('attrMap'):
                 node.addAttr('attrMap', self.statusDict)
             else:
-                node.attrSetLocked('attrMap', False)
-                # cmds.setAttr('%s.attrMap' % serializeNode, l=False)
-                node.attrMap = self.statusDict
+                node.setAttrs({'attrMap': self.statusDict})  # force unlocks the attr for the set
             try:
                 node.attrSetLocked('attrMap', True)
                 # cmds.setAttr('%s.attrMap' % serializeNode, l=True)
@@ -2436,7 +2446,7 @@ class LockChannels(object):
         elif serializeNode:
             serializeNode = r9Meta.MetaClass(serializeNode)
             if serializeNode.hasAttr('attrMap'):
-                self.statusDict = serializeNode.attrMap
+                self.statusDict = serializeNode.getAttrs(['attrMap'])['attrMap']
                 # print type(self.statusDict), self.statusDict
             else:
                 raise StandardError('attrMap not found on given node')
@@ -2847,6 +2857,7 @@ class TimeOffset(object):
         # New mrig section so that we can process rigs as entire entities for all the calls
         if mRigs:
             _mrigs = []
+            network = r9Meta.MetaNetwork()  # one snapshot of the meta graph shared by all the walks below
             for node in basenodes:
                 # get directly connected mSystemRoots to the given node
                 mrig = r9Meta.getConnectedMetaSystemRoot(node)
@@ -2854,7 +2865,7 @@ class TimeOffset(object):
                     _mrigs.append(mrig)
                     if not currentSystem:
                         # PRO_PACK : extend those to child mRigs (facial connected to body as child)
-                        _child_mrigs = mrig.getChildSystemRoots()
+                        _child_mrigs = mrig.getChildSystemRoots(network=network)
 #                         _child_mrigs = mrig.getChildMetaNodes(walk=True, mInstances=['Pro_MetaRig','Pro_MetaRig_FacialUI'])
                         if _child_mrigs:
                             _mrigs.extend(_child_mrigs)
@@ -2865,11 +2876,11 @@ class TimeOffset(object):
             if _mrigs:
                 mNodes.extend(_mrigs)
                 for rig in _mrigs:
-                    _children = rig.getChildMetaNodes(walk=True, currentSystem=currentSystem)
+                    _children = rig.getChildMetaNodes(walk=True, currentSystem=currentSystem, network=network)
                     for _child in _children:
                         if _child not in mNodes:
                             mNodes.append(_child)
-                    filtered.extend(rig.getChildren())
+                    filtered.extend(rig.getChildren(network=network))
 
         # process everything
         # ======================================
@@ -34,6 +34,7 @@ import json
 import itertools
 import traceback
 import datetime
+import timeit
 
 # Only valid Red9 import
 import Red9.startup.setup as r9Setup
@@ -341,6 +342,19 @@ def runProfile(func):
         return profile
     return wrapper
 
+def cmdsProfile(func):
+    '''
+    DECORATOR : run the enclosed function under the CmdsProfiler, logging the report of
+    the maya.cmds calls made - only ever used when debugging / optimizing
+    '''
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with CmdsProfiler(func.__name__) as profile:
+            res = func(*args, **kwargs)
+        log.info(profile.report())
+        return res
+    return wrapper
+
 def run_dgtimer():
     '''
     simple call to write a dgtime output file based on the current scene name
@@ -1075,6 +1089,231 @@ class SceneRestoreContext(object):
         log.debug('Scene Restored fully')
         return True
 
+class CmdsProfiler(object):
+    """
+    CONTEXT MANAGER : Maya command call-count profiler. For the duration of the context every
+    maya.cmds command, and the main OpenMaya API entry points we use in Red9, are wrapped and
+    their call counts and cumulative times recorded against the Red9 function that called them.
+    cProfile (see runProfile) tells you where the Python time goes, this tells you which Red9
+    functions are hammering Maya, which is nearly always where the real cost is.
+
+    >>> with r9General.CmdsProfiler('poseSave') as profile:
+    >>>     r9Pose.PoseData().poseSave(nodes, filepath)
+    >>> print(profile.report())
+    >>> # poseSave : 17,300 calls : getAttr 14,200, listConnections 3,100
+    >>> profile.dumpJson('c:/profiles/poseSave.json')  # diff runs with CmdsProfiler.compare()
+
+    :param name: label for this profile run, used in the report
+    :param commands: list of maya.cmds commands to wrap, default (None) wraps them all
+    :param api: if True we also wrap the OpenMaya calls listed in API_CALLS
+
+    .. note::
+        the patching is done on the maya.cmds module itself so it's seen by all code, Red9 or
+        otherwise, but calls are attributed to the nearest Red9 function in the stack, anything
+        else is logged as '<external>'. Decorator wrappers are stepped over so the real function is
+        reported, not nodeLockManager or Timer.
+    """
+    API_CALLS = {'MSelectionList': ['add', 'getDependNode', 'getDagPath', 'getPlug'],
+                 'MFnDependencyNode': ['setObject', 'findPlug', 'hasAttribute', 'name', 'typeName', 'getConnections'],
+                 'MPlug': ['asString', 'asDouble', 'asInt', 'asBool', 'connectedTo', 'setDouble', 'setInt', 'setBool'],
+                 'MDagPath': ['getAPathTo', 'fullPathName'],
+                 'MFnAnimCurve': ['setObject', 'numKeys', 'time', 'value', 'addKeys', 'addKey']}
+
+    _red9Root = os.path.join(os.path.normcase(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), '')
+    _red9Packages = os.path.join(_red9Root, 'packages', '')  # vendored libs, configobj etc, aren't Red9 code
+
+    def __init__(self, name='', commands=None, api=True):
+        self.name = name
+        self.commands = commands
+        self.api = api
+        self.data = {}  # {caller: {command: [count, time]}}
+        self.elapsed = 0.0
+        self._patched = []
+        self._codeCache = {}
+        self._start = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+    def _caller(self, frame):
+        '''
+        walk the stack to the first Red9 function, stepping over decorator wrappers and
+        the vendored packages so their calls are credited to the Red9 code calling them
+        '''
+        while frame:
+            code = frame.f_code
+            label = self._codeCache.get(code)
+            if label is None:
+                label = False
+                filename = os.path.normcase(os.path.abspath(code.co_filename))
+                if filename.startswith(self._red9Root) and not filename.startswith(self._red9Packages) \
+                        and not code.co_name in ['wrapper', 'wrapped', '<lambda>']:
+                    label = '%s.%%s%s' % (os.path.splitext(os.path.basename(filename))[0], code.co_name)
+                self._codeCache[code] = label
+            if label:
+                cls = ''
+                try:
+                    if code.co_varnames and code.co_varnames[0] in ['self', 'cls']:
+                        inst = frame.f_locals.get(code.co_varnames[0])
+                        cls = '%s.' % (inst.__name__ if isinstance(inst, type) else type(inst).__name__)
+                except:
+                    pass
+                return label % cls
+            frame = frame.f_back
+        return '<external>'
+
+    def _wrap(self, command, func):
+        data = self.data
+        getCaller = self._caller
+        timer = timeit.default_timer
+
+        @wraps(func)
+        def _profiled(*args, **kws):
+            t1 = timer()
+            try:
+                return func(*args, **kws)
+            finally:
+                t2 = timer()
+                record = data.setdefault(getCaller(sys._getframe(1)), {}).setdefault(command, [0, 0.0])
+                record[0] += 1
+                record[1] += t2 - t1
+        return _profiled
+
+    def start(self):
+        '''
+        patch maya.cmds and the API entry points, recording from this point on
+        '''
+        if self._patched:
+            return
+        commands = self.commands
+        if not commands:
+            commands = [cmd for cmd in dir(cmds) if not cmd.startswith('_')]
+        for cmd in commands:
+            func = getattr(cmds, cmd, None)
+            if callable(func):
+                self._patched.append((cmds, cmd, func, True))
+                setattr(cmds, cmd, self._wrap(cmd, func))
+        if self.api:
+            import maya.OpenMaya as OpenMaya
+            for clsName, methods in self.API_CALLS.items():
+                cls = getattr(OpenMaya, clsName, None)
+                if not cls:
+                    continue
+                for method in methods:
+                    func = getattr(cls, method, None)
+                    if not callable(func):
+                        continue
+                    # we restore the class dict entry, or remove ours if the method was inherited
+                    self._patched.append((cls, method, cls.__dict__.get(method), method in cls.__dict__))
+                    setattr(cls, method, self._wrap('%s.%s' % (clsName, method), func))
+        self._start = timeit.default_timer()
+
+    def stop(self):
+        '''
+        restore maya.cmds and the API, stopping the recording
+        '''
+        if self._start is not None:
+            self.elapsed += timeit.default_timer() - self._start
+            self._start = None
+        for owner, name, func, owned in reversed(self._patched):
+            if owned:
+                setattr(owner, name, func)
+            else:
+                delattr(owner, name)
+        self._patched = []
+
+    def reset(self):
+        self.data.clear()  # cleared in place as the wrappers are bound to this dict
+        self.elapsed = 0.0
+
+    def totals(self):
+        '''
+        :return: {command: [count, time]} summed over all callers
+        '''
+        totals = {}
+        for commands in self.data.values():
+            for command, (count, t) in commands.items():
+                total = totals.setdefault(command, [0, 0.0])
+                total[0] += count
+                total[1] += t
+        return totals
+
+    def callCount(self, command=None, caller=None):
+        '''
+        :param command: if given return the count for just this command
+        :param caller: if given clamp to the calls from this Red9 function
+        '''
+        if caller:
+            commands = self.data.get(caller, {})
+        else:
+            commands = self.totals()
+        if command:
+            return commands.get(command, [0])[0]
+        return sum(count for count, _ in commands.values())
+
+    def report(self, limit=10):
+        '''
+        formatted report of the commands called, grouped by the Red9 function calling them
+
+        :param limit: max number of commands to list per line, ordered by call count
+        '''
+        def _format(commands):
+            ordered = sorted(commands.items(), key=lambda x: x[1][0], reverse=True)[:limit]
+            return ', '.join(['{:,} {}'.format(count, cmd) for cmd, (count, _) in ordered])
+
+        totals = self.totals()
+        lines = ['%s : %s calls : %0.3f s in Maya (%0.3f s total) : %s' % (self.name or 'CmdsProfiler',
+                                                                         '{:,}'.format(self.callCount()),
+                                                                         sum(t for _, t in totals.values()),
+                                                                         self.elapsed,
+                                                                         _format(totals))]
+        for caller, commands in sorted(self.data.items(), key=lambda x: sum(c for c, _ in x[1].values()), reverse=True):
+            lines.append('    %s : %0.3f s : %s' % (caller, sum(t for _, t in commands.values()), _format(commands)))
+        return '\n'.join(lines)
+
+    def toDict(self):
+        return {'name': self.name,
+                'elapsed': self.elapsed,
+                'data': self.data}
+
+    def dumpJson(self, filepath):
+        '''
+        dump the profile to JSON so we can diff runs via CmdsProfiler.compare
+        '''
+        writeJson(filepath, self.toDict())
+
+    @staticmethod
+    def compare(profileA, profileB):
+        '''
+        diff 2 profiles, either CmdsProfiler instances, their toDict data or JSON dumps
+
+        :return: {caller: {command: countB - countA}} for all calls whose count changed
+        '''
+        def _data(profile):
+            if isinstance(profile, CmdsProfiler):
+                return profile.data
+            if is_basestring(profile):
+                profile = readJson(profile)
+            return profile['data']
+
+        dataA = _data(profileA)
+        dataB = _data(profileB)
+        diff = {}
+        for caller in set(dataA.keys()) | set(dataB.keys()):
+            commandsA = dataA.get(caller, {})
+            commandsB = dataB.get(caller, {})
+            for command in set(commandsA.keys()) | set(commandsB.keys()):
+                delta = commandsB.get(command, [0])[0] - commandsA.get(command, [0])[0]
+                if delta:
+                    diff.setdefault(caller, {})[command] = delta
+        return diff
+
+
 # ---------------------------------------------------------------------------------
 # General ---
 # ---------------------------------------------------------------------------------
@@ -45,6 +45,7 @@ import maya.mel as mel
 import maya.OpenMaya as OpenMaya
 from functools import partial
 from functools import wraps
+from collections import deque
 import sys
 import os
 import uuid
@@ -79,6 +80,8 @@ LANGUAGE_MAP = r9Setup.LANGUAGE_MAP
 # import Red9_AnimationUtils as r9Anim
 # =============================================
 
+import cPickle
+
 try:
     import json as json
 except:
@@ -99,6 +102,12 @@ RED9_META_REGISTERY = {}
 global RED9_META_INHERITANCE_MAP
 RED9_META_INHERITANCE_MAP = {}
 
+global RED9_META_SUBCLASS_MAP
+RED9_META_SUBCLASS_MAP = {}
+
+global RED9_META_ATTRSCHEMA_STATS
+RED9_META_ATTRSCHEMA_STATS = {'hits': 0, 'misses': 0, 'callsSaved': 0}
+
 if 'RED9_META_CALLBACKS' in globals():
     log.debug('RED9_META_CALLBACKS already setup')
 else:
@@ -107,6 +116,8 @@ else:
     RED9_META_CALLBACKS = {}
     RED9_META_CALLBACKS['Open'] = []
     RED9_META_CALLBACKS['New'] = []
+    RED9_META_CALLBACKS['NodeRemoved'] = []
+    RED9_META_CALLBACKS['NameChanged'] = []
 #     RED9_META_CALLBACKS['Reference'] = []
     # RED9_META_CALLBACKS['DuplicatePre'] = []
     # RED9_META_CALLBACKS['DuplicatePost'] = []
@@ -129,10 +140,11 @@ global RED9_META_REGISTERY
 def registerMClassInheritanceMapping():
     '''
     build up the master global registry of all available subclasses from r9Meta.MetaClass,
-    this build up 2 global dicts:
+    this build up 3 global dicts:
     RED9_META_REGISTERY : {'className': class pointer}
     RED9_META_INHERITANCE_MAP : {'className': {'full': [list of inherited class pointers]},
                                               {'short': [list of inherited class.__names__]}}
+    RED9_META_SUBCLASS_MAP : {'className': set([registered className's inheriting from className])}
     '''
     
     # really this should be outside the module with a reload of Meta first to prevent 
@@ -143,6 +155,8 @@ def registerMClassInheritanceMapping():
     RED9_META_REGISTERY = {}
     global RED9_META_INHERITANCE_MAP
     RED9_META_INHERITANCE_MAP = {}
+    global RED9_META_SUBCLASS_MAP
+    RED9_META_SUBCLASS_MAP = {}
 
     RED9_META_REGISTERY['MetaClass'] = MetaClass
     RED9_META_INHERITANCE_MAP['MetaClass'] = {}
@@ -156,6 +170,12 @@ def registerMClassInheritanceMapping():
         RED9_META_INHERITANCE_MAP[mclass.__name__]['full'] = list(inspect.getmro(mclass))
         RED9_META_INHERITANCE_MAP[mclass.__name__]['short'] = [n.__name__ for n in inspect.getmro(mclass)]
 
+    # reverse of the short inheritance map so that mInstances searches resolve
+    # against the number of registered classes, not the number of nodes
+    for key, inheritance in RED9_META_INHERITANCE_MAP.items():
+        for base in inheritance['short']:
+            RED9_META_SUBCLASS_MAP.setdefault(base, set()).add(key)
+
 def printSubClassRegistry():
     for m in RED9_META_REGISTERY:
         print(m)
@@ -228,7 +248,7 @@ def mTypesToRegistryKey(mTypes):
         except:
             keys.append(cls)
     # remove the key if it's not registered!
-    return [key for key in keys if key in RED9_META_REGISTERY.keys()] or []
+    return [key for key in keys if key in RED9_META_REGISTERY] or []
 
 def getMClassDataFromNode(node, checkInstance=True):
     '''
@@ -263,6 +283,136 @@ def getMClassDataFromNode(node, checkInstance=True):
                 if key.lower() == _nodetype.lower():
                     return key
 
+def getMClassDataFromNodes(nodes):
+    '''
+    bulk version of getMClassDataFromNode, this resolves the mClass binding for an entire
+    list of nodes in a single API pass rather than individual cmds.getAttr calls per node.
+    The mClassGrp and mSystemRoot attrs are pulled in the same pass as all the getMeta
+    filters need them.
+
+    :param nodes: list of Maya nodes to inspect
+    :return: {node: (mClass, mClassGrp, mSystemRoot)} where mClass is the resolved registry
+        key or None if the node isn't bound to a registered class. mClassGrp is None if the
+        node has no mClassGrp attr.
+    '''
+    data = {}
+    registryLower = None
+    depFn = OpenMaya.MFnDependencyNode()
+    mobj = OpenMaya.MObject()
+    selList = OpenMaya.MSelectionList()
+    for node in nodes:
+        if node in data:
+            continue
+        try:
+            selList.clear()
+            selList.add(node)
+            selList.getDependNode(0, mobj)
+            depFn.setObject(mobj)
+        except:
+            log.debug('getMClassDataFromNodes : unable to resolve node : %s' % node)
+            continue
+        mClass = None
+        mClassGrp = None
+        mSystemRoot = False
+        fromNodeType = True
+        if depFn.hasAttribute('mClassGrp'):
+            mClassGrp = depFn.findPlug('mClassGrp').asString()
+        if depFn.hasAttribute('mSystemRoot'):
+            mSystemRoot = depFn.findPlug('mSystemRoot').asBool()
+        if depFn.hasAttribute('mClass'):
+            mClass = depFn.findPlug('mClass').asString()
+            if mClass not in RED9_META_REGISTERY:
+                mClass = None
+                # matches getMClassDataFromNode, a missing mClassGrp drops through to the nodeType test
+                if mClassGrp is not None:
+                    fromNodeType = False
+                    if mClassGrp in RED9_META_REGISTERY:
+                        mClass = mClassGrp
+            else:
+                fromNodeType = False
+        if fromNodeType and not mClass:
+            # Node has no mClass attr BUT in certain circumstances we can register
+            # default node Types to Meta (HIK for example) so we need to check
+            _nodetype = depFn.typeName()
+            if 'Meta%s' % _nodetype in RED9_META_REGISTERY:
+                mClass = 'Meta%s' % _nodetype
+            else:
+                if registryLower is None:
+                    registryLower = dict((key.lower(), key) for key in RED9_META_REGISTERY)
+                mClass = registryLower.get(_nodetype.lower())
+        data[node] = (mClass, mClassGrp, mSystemRoot)
+    return data
+
+def mInstancesToRegistryKeys(mInstances):
+    '''
+    resolve the given mInstances to the set of registered class keys that inherit from
+    them, via the RED9_META_SUBCLASS_MAP built by registerMClassInheritanceMapping. This
+    is the bulk equivalent of running isMetaNodeInherited(mode='short') per node
+
+    :param mInstances: given metaClass to test inheritance - str, cls or [cls]
+    '''
+    keys = set()
+    for inst in mTypesToRegistryKey(mInstances):
+        keys.update(RED9_META_SUBCLASS_MAP.get(inst, []))
+    return keys
+
+def filterMetaNodes(nodes, mTypes=[], mInstances=[], mClassGrps=[], mSystemRoot=False, skipTypes=[], skipInstances=[], mClassData=None):
+    '''
+    bulk classification of the given nodes, returning only those that pass the given meta filters.
+    All the mClass data is read in one pass via getMClassDataFromNodes and the filters resolved
+    to sets of registry keys up front, so the cost scales with the number of registered
+    classes rather than nodes x filters.
+
+    :param nodes: Maya nodes to filter
+    :param mTypes: only return meta nodes of a given type
+    :param mInstances: only return meta nodes who's class is inherited from the given classes,
+        note if given this takes precedence over the mTypes filter as in getMetaNodes
+    :param mClassGrps: only return nodes who's mClassGrp attr matches
+    :param mSystemRoot: if True only return nodes with the mSystemRoot attr set
+    :param skipTypes: skip nodes of the given mTypes
+    :param skipInstances: skip nodes inheriting from the given mInstances
+    :param mClassData: optional, pre-resolved getMClassDataFromNodes data for the nodes
+    :return: filtered list of nodes, order preserved
+    '''
+    if not nodes:
+        return []
+    if mClassData is None:
+        mClassData = getMClassDataFromNodes(nodes)
+
+    if mInstances:
+        validKeys = mInstancesToRegistryKeys(mInstances)
+    elif mTypes:
+        validKeys = set(mTypesToRegistryKey(mTypes))
+    else:
+        validKeys = None
+    skipKeys = set()
+    if skipTypes:
+        skipKeys.update(mTypesToRegistryKey(skipTypes))
+    if skipInstances:
+        skipKeys.update(mInstancesToRegistryKeys(skipInstances))
+    if mClassGrps and r9General.is_basestring(mClassGrps):
+        mClassGrps = [mClassGrps]
+    mClassGrps = set(mClassGrps or [])
+
+    filtered = []
+    for node in nodes:
+        data = mClassData.get(node)
+        if not data or not data[0]:
+            continue
+        mClass, mClassGrp, systemRoot = data
+        if validKeys is not None and mClass not in validKeys:
+            continue
+        if mClass in skipKeys:
+            if logging_is_debug():
+                log.debug('skipping node mType found >> %s = %s' % (node, mClass))
+            continue
+        if mClassGrps and mClassGrp not in mClassGrps:
+            continue
+        if mSystemRoot and not systemRoot:
+            continue
+        filtered.append(node)
+    return filtered
+
 # def getMClassDataFromNode(node):
 #    '''
 #    from the node get the class to instantiate, this gives us a level of
@@ -356,6 +506,240 @@ def generateUUID():
     '''
     return str(uuid.uuid4()).upper()
 
+
+class MetaNodeCache(object):
+    '''
+    Registry of all currently instantiated mNodes. Nodes are keyed by their UUID
+    (or their node name for legacy nodes with no UUID support) and also indexed by
+    their MObjectHandle hashCode so that MetaClass.__new__ can resolve an already
+    instantiated node without any cmds calls.
+
+    Invalidation is driven by the Maya callbacks bound at the bottom of this module,
+    nodeRemoved and nameChanged, and the cache is cleared on scene New / Open. This
+    means we never have to sweep the entire cache just because one node has gone stale.
+
+    .. note::
+        self.nodes is the same dict object as the global RED9_META_NODECACHE, the cache
+        is only ever cleared in place so that reference stays valid.
+    '''
+    def __init__(self):
+        self.nodes = {}  # UUID : mNode
+        self.handles = {}  # MObjectHandle.hashCode() : UUID
+        self.keys = {}  # UUID : MObjectHandle.hashCode()
+        self.named = set()  # legacy keys which are the node name, not a UUID
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, UUID):
+        return UUID in self.nodes
+
+    def register(self, UUID, mNode, named=False):
+        '''
+        add an instantiated mNode to the cache under the given key
+
+        :param UUID: key to register the node against, the UUID or node name for legacy nodes
+        :param mNode: instantiated mNode to add
+        :param named: the key is the node name rather than a UUID, legacy nodes only
+        '''
+        hashCode = object.__getattribute__(mNode, '_MObjectHandle').hashCode()
+        current = self.handles.get(hashCode)
+        if current is not None and not current == UUID and self.nodes.get(current) is mNode:
+            # the node's key has changed, ie a new UUID was generated so drop the old key
+            self._pop(current)
+        self.nodes[UUID] = mNode
+        self.handles[hashCode] = UUID
+        self.keys[UUID] = hashCode
+        if named:
+            self.named.add(UUID)
+        object.__setattr__(mNode, '_lastUUID', UUID)
+
+    def _pop(self, UUID):
+        mNode = self.nodes.pop(UUID, None)
+        hashCode = self.keys.pop(UUID, None)
+        if hashCode is not None and self.handles.get(hashCode) == UUID:
+            self.handles.pop(hashCode)
+        self.named.discard(UUID)
+        if mNode is not None:
+            mNode.__clearAttrSchema__()
+        return mNode
+
+    def getByUUID(self, UUID):
+        '''
+        O(1) return of an instantiated mNode from it's UUID
+
+        :param UUID: UUID key to return
+        '''
+        mNode = self.nodes.get(UUID)
+        if mNode is not None:
+            if mNode.isValidMObject():
+                self.hits += 1
+                return mNode
+            self.remove(UUID)
+        self.misses += 1
+
+    def getByMObject(self, mobj):
+        '''
+        O(1) return of an instantiated mNode from the given MObject
+
+        :param mobj: MObject to look up in the cache
+        '''
+        UUID = self.handles.get(OpenMaya.MObjectHandle(mobj).hashCode())
+        if UUID is not None:
+            mNode = self.nodes.get(UUID)
+            if mNode is not None and mNode.isValidMObject():
+                if object.__getattribute__(mNode, '_MObject') == mobj:
+                    self.hits += 1
+                    return mNode
+            else:
+                self.remove(UUID)
+        self.misses += 1
+
+    def get(self, node):
+        '''
+        return an instantiated mNode from the given Maya node name if it's already in the cache
+
+        :param node: str(name) of the node in the DAG
+        '''
+        if not r9General.is_basestring(node):
+            return
+        if not self.nodes:
+            self.misses += 1
+            return
+        try:
+            mobj = getMObject(node)
+        except:
+            self.misses += 1
+            return
+        return self.getByMObject(mobj)
+
+    def remove(self, UUID):
+        '''
+        remove the given key from the cache, returns the mNode removed
+        '''
+        mNode = self._pop(UUID)
+        if mNode is not None:
+            self.evictions += 1
+        return mNode
+
+    def removeMObject(self, mobj):
+        '''
+        remove any cached mNode bound to the given MObject, called by the nodeRemoved callback
+        '''
+        UUID = self.handles.get(OpenMaya.MObjectHandle(mobj).hashCode())
+        if UUID is not None and self.remove(UUID) is not None:
+            if logging_is_debug():
+                log.debug('CACHE : %s being Removed from the cache as the node was deleted' % UUID)
+
+    def renameMObject(self, mobj):
+        '''
+        legacy nodes with no UUID support are keyed by name so need re-keying when
+        the node is renamed, called by the nameChanged callback
+        '''
+        if not self.named:
+            return
+        key = self.handles.get(OpenMaya.MObjectHandle(mobj).hashCode())
+        if key is None or key not in self.named:
+            return
+        mNode = self.nodes.get(key)
+        try:
+            self.register(mNode.mNode, mNode, named=True)
+        except MetaInstanceError:
+            self.remove(key)
+
+    def clean(self):
+        '''
+        full sweep of the cache removing all invalid MObjects
+        '''
+        for UUID, mNode in self.nodes.items():
+            try:
+                if not mNode.isValidMObject():
+                    self.remove(UUID)
+                    log.debug('CACHE : %s being Removed from the cache due to invalid MObject' % UUID)
+            except:
+                log.debug('CACHE : clean failure')
+
+    def clear(self):
+        for mNode in self.nodes.values():
+            mNode.__clearAttrSchema__()
+        self.nodes.clear()
+        self.handles.clear()
+        self.keys.clear()
+        self.named.clear()
+
+    def resetStats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        '''
+        return the hit / miss / eviction counters for the cache
+        '''
+        return {'size': len(self.nodes),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions}
+
+
+RED9_META_CACHE = MetaNodeCache()
+RED9_META_NODECACHE = RED9_META_CACHE.nodes
+
+def _metaCache_nodeRemovedCB(node, *args):
+    '''
+    callback bound to MDGMessage.addNodeRemovedCallback to invalidate deleted nodes
+    '''
+    if RED9_META_CACHE.handles:
+        RED9_META_CACHE.removeMObject(node)
+
+def _metaCache_nameChangedCB(node, prevName, *args):
+    '''
+    callback bound to MNodeMessage.addNameChangedCallback to re-key legacy name based nodes
+    '''
+    if RED9_META_CACHE.handles:
+        RED9_META_CACHE.renameMObject(node)
+
+def _metaAttrSchema_changedCB(msg, plug, otherPlug, schema):
+    '''
+    callback bound per cached mNode via MNodeMessage.addAttributeChangedCallback to keep
+    the MetaClass attr schema in sync with the Maya node. The clientData is the schema dict itself
+    '''
+    if not schema:
+        return
+    if msg & (OpenMaya.MNodeMessage.kAttributeAdded |
+              OpenMaya.MNodeMessage.kAttributeRemoved |
+              OpenMaya.MNodeMessage.kAttributeRenamed):
+        schema.clear()
+    elif msg & (OpenMaya.MNodeMessage.kAttributeLocked | OpenMaya.MNodeMessage.kAttributeUnlocked):
+        locked = bool(msg & OpenMaya.MNodeMessage.kAttributeLocked)
+        try:
+            fnAttr = OpenMaya.MFnAttribute(plug.attribute())
+            names = [name for name in (fnAttr.name(), fnAttr.shortName()) if schema.get(name)]
+        except:
+            names = []
+        if names:
+            for name in names:
+                schema[name]['locked'] = locked
+        else:
+            # not found by name, ie aliased, so drop all the cached lock states
+            for entry in schema.values():
+                if entry:
+                    entry.pop('locked', None)
+
+def getAttrSchemaStats():
+    '''
+    return the counters for the MetaClass attribute schema cache, callsSaved
+    being the number of Maya queries answered from the cache
+    '''
+    return dict(RED9_META_ATTRSCHEMA_STATS)
+
+def resetAttrSchemaStats():
+    for key in RED9_META_ATTRSCHEMA_STATS:
+        RED9_META_ATTRSCHEMA_STATS[key] = 0
+
 def registerMClassNodeCache(mNode):
     '''
     Add a given mNode to the global RED9_META_NODECACHE cache of currently instantiated
@@ -363,15 +747,15 @@ def registerMClassNodeCache(mNode):
 
     :param mNode: instantiated mNode to add
     '''
-    global RED9_META_NODECACHE
     version = r9Setup.mayaVersion()
 
     # Maya 2016 onwards UUID management  ---------
     if version >= 2016:
-        UUID = cmds.ls(mNode.mNode, uuid=True)[0]
-        if UUID in RED9_META_NODECACHE.keys():
+        UUID = object.__getattribute__(mNode, '_MFnDependencyNode').uuid().asString()
+        cached = RED9_META_NODECACHE.get(UUID)
+        if cached is not None and cached is not mNode:
             # log.debug('CACHE : UUID is already registered in cache')
-            if not mNode == RED9_META_NODECACHE[UUID]:
+            if not mNode == cached:
                 log.debug('CACHE : %s : UUID is registered to a different node : modifying UUID: %s' % (UUID, mNode.mNode))
                 UUID = mNode.setUUID()
 
@@ -382,52 +766,22 @@ def registerMClassNodeCache(mNode):
             if not UUID:
                 # log.debug('CACHE : generating fresh UUID')
                 UUID = mNode.setUUID()
-            elif UUID in RED9_META_NODECACHE.keys():
+            elif UUID in RED9_META_NODECACHE:
                 # log.debug('CACHE : UUID is already registered in cache')
                 if not mNode == RED9_META_NODECACHE[UUID]:
                     log.debug('CACHE : %s : UUID is registered to a different node : modifying UUID: %s' % (UUID, mNode.mNode))
                     UUID = mNode.setUUID()
         except StandardError, err:
             log.debug('CACHE : Failed to set UUID for mNode : %s' % mNode.mNode)
+            return
 
     else:
         # log.debug('CACHE : UUID attr not bound to this node, must be an older system')
-        if RED9_META_NODECACHE or mNode.mNode not in RED9_META_NODECACHE.keys():
-            # log.debug('CACHE : Adding to MetaNode Cache : %s' % mNode.mNode)
-            RED9_META_NODECACHE[mNode.mNode] = mNode
-            return
+        RED9_META_CACHE.register(mNode.mNode, mNode, named=True)
+        return
 
-    if RED9_META_NODECACHE or UUID not in RED9_META_NODECACHE.keys():
-        # log.debug('CACHE : Adding to MetaNode UUID Cache : %s > %s' % (mNode.mNode, UUID))
-        RED9_META_NODECACHE[UUID] = mNode
-
-    mNode._lastUUID = UUID
-
-#    if mNode.hasAttr('UUID') or version>=2016:
-#        try:
-#            if version<2016:
-#                UUID=mNode.UUID
-#                if not UUID:
-#                    log.debug('CACHE : generating fresh UUID')
-#                    UUID=mNode.setUUID()
-#                elif UUID in RED9_META_NODECACHE.keys():
-#                    log.debug('CACHE : UUID is already registered in cache')
-#                    if not mNode.mNode == RED9_META_NODECACHE[UUID]:
-#                        log.debug('CACHE : %s : UUID is registered to a different node : modifying UUID: %s' % (UUID, mNode.mNode))
-#                        UUID=mNode.setUUID()
-#            else:
-#                UUID=cmds.ls(mNode.mNode, uuid=True)[0]
-#            if RED9_META_NODECACHE or not UUID in RED9_META_NODECACHE.keys():
-#                log.debug('CACHE : Adding to MetaNode UUID Cache : %s > %s' % (mNode.mNode, UUID))
-#                RED9_META_NODECACHE[UUID]=mNode
-#        except StandardError, err:
-#            #print err
-#            log.debug('CACHE : Failed to set UUID for mNode : %s' % mNode.mNode)
-#    else:
-#        log.debug('CACHE : UUID attr not bound to this node, must be an older system')
-#        if RED9_META_NODECACHE or not mNode.mNode in RED9_META_NODECACHE.keys():
-#            log.debug('CACHE : Adding to MetaNode Cache : %s' % mNode.mNode)
-#            RED9_META_NODECACHE[mNode.mNode]=mNode
+    # log.debug('CACHE : Adding to MetaNode UUID Cache : %s > %s' % (mNode.mNode, UUID))
+    RED9_META_CACHE.register(UUID, mNode)
 
 
 def getMetaFromCache(mNode):
@@ -436,42 +790,26 @@ def getMetaFromCache(mNode):
     already be instantiated.
 
     :param mNode: str(name) of node from DAG
+
+    .. note::
+        this is resolved via the MObjectHandle index in the cache, no cmds calls,
+        so it's safe to run on every MetaClass.__new__
     '''
-    try:
-        if r9Setup.mayaVersion() < 2016:
-            UUID = cmds.getAttr('%s.UUID' % mNode)  # if this fails we bail to the mNode name block
-        else:
-            UUID = cmds.ls(mNode, uuid=True)[0]
+    return RED9_META_CACHE.get(mNode)
 
-        if UUID in RED9_META_NODECACHE.keys():
-            try:
-                if RED9_META_NODECACHE[UUID].isValidMObject():
-                    if not RED9_META_NODECACHE[UUID]._MObject == getMObject(mNode):
-                        log.debug('CACHE ABORTED : %s : UUID is already registered but to a different node : %s' % (UUID, mNode))
-                        mNode.setUUID()
-                        return
-                    # log.debug('CACHE : %s Returning mNode from UUID cache! = %s' % (mNode, UUID))
-                    return RED9_META_NODECACHE[UUID]
-                else:
-                    # log.debug('%s being Removed from the cache due to invalid MObject' % mNode)
-                    cleanCache()
-            except:
-                log.debug('CACHE : inspection failure')
-    except:
-        if mNode in RED9_META_NODECACHE.keys():
-            try:
-                if RED9_META_NODECACHE[mNode].isValidMObject():
-                    if not RED9_META_NODECACHE[mNode]._MObject == getMObject(mNode):
-                        # log.debug('CACHE : %s : ID is already registered but MObjects are different, node may have been renamed' % mNode)
-                        return
-                    # print 'namebased returned from cache ', mNode
-                    # log.debug('CACHE : %s Returning mNode from nameBased cache!' % mNode)
-                    return RED9_META_NODECACHE[mNode]
-                else:
-                    # log.debug('%s being Removed from the cache due to invalid MObject' % mNode)
-                    cleanCache()
-            except:
-                log.debug('CACHE : inspection failure')
+def getMetaFromCache_byUUID(UUID):
+    '''
+    Pull the given mNode from the RED9_META_NODECACHE directly by it's UUID
+
+    :param UUID: UUID the node was registered against
+    '''
+    return RED9_META_CACHE.getByUUID(UUID)
+
+def getMetaCacheStats():
+    '''
+    return the hit / miss / eviction counters for the RED9_META_NODECACHE
+    '''
+    return RED9_META_CACHE.stats()
 
 def upgrade_toLatestBindings(*args):
     '''
@@ -510,42 +848,41 @@ def printMetaCacheRegistry():
     cleanCache()
     for k, v in RED9_META_NODECACHE.items():
         print('%s : %s : %s' % (k, r9Core.nodeNameStrip(v.mNode), v))
+    print('CACHE STATS : %s' % getMetaCacheStats())
 
 def cleanCache():
     '''
     Run through the current cache of metaNodes and confirm that they're
     all still valid by testing the MObjectHandles.
+
+    .. note::
+        the cache is now kept in sync by the nodeRemoved / nameChanged callbacks so
+        this full sweep is only needed for debugging or after callbacks were suspended
     '''
-    for k, v in RED9_META_NODECACHE.items():
-        try:
-            if not v.isValidMObject():
-                RED9_META_NODECACHE.pop(k)
-                log.debug('CACHE : %s being Removed from the cache due to invalid MObject' % k)
-        except:
-            log.debug('CACHE : clean failure')
+    RED9_META_CACHE.clean()
 
 def removeFromCache(mNodes):
     '''
     remove instanciated mNodes from the cache
     '''
-    for k, v in RED9_META_NODECACHE.items():
-        if not type(mNodes) == list:
-            mNodes = [mNodes]
-        if v and v in mNodes:
-            try:
-                RED9_META_NODECACHE.pop(k)
-                if logging_is_debug():
-                    log.debug('CACHE : %s being Removed from the cache >> %s' % (r9Core.nodeNameStrip(k),
-                                                                             r9Core.nodeNameStrip(v.mNode)))
-            except:
-                log.debug('CACHE : Failed to remove %s from cache')
+    if not type(mNodes) == list:
+        mNodes = [mNodes]
+    for mNode in mNodes:
+        try:
+            UUID = object.__getattribute__(mNode, '_lastUUID')
+        except AttributeError:
+            continue
+        if UUID and RED9_META_NODECACHE.get(UUID) is mNode:
+            RED9_META_CACHE.remove(UUID)
+            if logging_is_debug():
+                log.debug('CACHE : %s being Removed from the cache >> %s' % (r9Core.nodeNameStrip(UUID),
+                                                                         object.__getattribute__(mNode, '_lastDagPath')))
 
 def resetCache(*args):
     '''
     reset the global cache, called after SceneOpen or NewScene
     '''
-    global RED9_META_NODECACHE
-    RED9_META_NODECACHE = {}
+    RED9_META_CACHE.clear()
 
 def resetCacheOnSceneNew(*args):
     resetCache()
@@ -841,6 +1178,7 @@ def getMetaNodes(mTypes=[], mInstances=[], mClassGrps=[], mAttrs=None, dataType=
     :param dataType: default='mClass' return the nodes already instantiated to
                 the correct class object. If not then return the Maya node itself
     :param nTypes: only inspect nodes of a given Type
+    :param mSystemRoot: if True only return nodes that have the mSystemRoot attr set
     :param byname: [] a specific list of node names to search for
     '''
     mNodes = []
@@ -856,23 +1194,9 @@ def getMetaNodes(mTypes=[], mInstances=[], mClassGrps=[], mAttrs=None, dataType=
             nodes = cmds.ls(type=nTypes, l=True)
     if not nodes:
         return mNodes
-    for node in nodes:
-        mNode = False
-        if not mInstances:
-            if isMetaNode(node, mTypes=mTypes):
-                mNode = True
-        else:
-            if isMetaNodeInherited(node, mInstances):
-                mNode = True
-        if mNode:
-            if mClassGrps:
-#                 if not hasattr(mClassGrps, '__iter__'):
-                if r9General.is_basestring(mClassGrps):
-                    mClassGrps = [mClassGrps]
-                if isMetaNodeClassGrp(node, mClassGrps):
-                    mNodes.append(node)
-            else:
-                mNodes.append(node)
+    # bulk classify, one pass over the nodes rather than isMetaNode calls per node
+    mNodes = filterMetaNodes(nodes, mTypes=mTypes, mInstances=mInstances,
+                             mClassGrps=mClassGrps, mSystemRoot=mSystemRoot)
     if not mNodes:
         return mNodes
     if mAttrs:
@@ -971,6 +1295,7 @@ def getConnectedMetaNodes(nodes, source=True, destination=True, mTypes=[], mInst
     '''
     mNodes = []
     connections = []
+    found = set()
 
     if not nTypes:
         nTypes = getMClassNodeTypes()
@@ -980,35 +1305,18 @@ def getConnectedMetaNodes(nodes, source=True, destination=True, mTypes=[], mInst
         if cons:
             # NOTE we're only interested in connected nodes via message linked attrs
             for plug, node in zip(cons[::2], cons[1::2]):
+                if node in found:
+                    continue
                 if cmds.getAttr(plug, type=True) == 'message':
-                    if node not in connections:
-                        connections.append(node)
-                        # log.debug(node)
+                    found.add(node)
+                    connections.append(node)
+                    # log.debug(node)
     if not connections:
         return mNodes
 
-    for node in connections:
-        addNode = False
-        if not mInstances:
-            if isMetaNode(node, mTypes=mTypes):
-                addNode = True
-                # mNodes.append(node)
-        else:
-            if isMetaNodeInherited(node, mInstances):
-                addNode = True
-                # mNodes.append(node)
-        if skipTypes:
-            if isMetaNode(node, mTypes=skipTypes):
-                if logging_is_debug():
-                    log.debug('skipping node mType found >> %s = %s' % (node, getMClassDataFromNode(node)))
-                addNode = False
-        if skipInstances:
-            if isMetaNodeInherited(node, skipInstances):
-                if logging_is_debug():
-                    log.debug('skipping node mInstance found >> %s = %s' % (node, getMClassDataFromNode(node)))
-                addNode = False
-        if addNode:
-            mNodes.append(node)
+    # bulk classify, one pass over the connected nodes rather than isMetaNode calls per node
+    mNodes = filterMetaNodes(connections, mTypes=mTypes, mInstances=mInstances,
+                             skipTypes=skipTypes, skipInstances=skipInstances)
 
     if mAttrs:
         # lazy to avoid cyclic imports
@@ -1019,6 +1327,210 @@ def getConnectedMetaNodes(nodes, source=True, destination=True, mTypes=[], mInst
     else:
         return list(set(mNodes))
 
+def getNodeConnectionMetaDataMaps(nodes, mTypes=[], mNodes=[]):
+    '''
+    batched version of MetaClass.getNodeConnectionMetaDataMap. Rather than a listConnections per
+    registered nodeType, per node, we run one connection query for the entire node list, classify the
+    connected nodes in bulk and read each mNode's mNodeID only once.
+
+    :param nodes: list of nodes to inspect
+    :param mTypes: if given this is a list of specific mTypes that the connected mNode must be
+    :param mNodes: if given this is a list of specific mNodes themselves that we clamp the return too
+    :return: {node: mNode_data} for every given node, mNode_data being {'metaAttr', 'metaNodeID'}
+        as getNodeConnectionMetaDataMap, or an empty dict if the node isn't wired to a valid mNode
+    '''
+    data = dict((node, {}) for node in nodes)
+    if not nodes:
+        return data
+    connections = cmds.listConnections(nodes, s=True, d=False, c=True, p=True)
+    if not connections:
+        return data
+
+    # the c=True plugs come back with the shortest unique name so map back to the given names via the MObject
+    handles = {}
+    selList = OpenMaya.MSelectionList()
+    mobj = OpenMaya.MObject()
+    for node in nodes:
+        try:
+            selList.clear()
+            selList.add(node)
+            selList.getDependNode(0, mobj)
+            handles.setdefault(OpenMaya.MObjectHandle(mobj).hashCode(), []).append(node)
+        except:
+            log.debug('getNodeConnectionMetaDataMaps : unable to resolve node : %s' % node)
+
+    # only nodes of the registered nodeTypes bound to a valid mClass are considered, as the single node call
+    srcNodes = set(con.split('.')[0] for con in connections[1::2])
+    validNodes = set(filterMetaNodes(cmds.ls(list(srcNodes), type=getMClassNodeTypes()) or [], mTypes=mTypes))
+    if mNodes:
+        validNodes.intersection_update(mNodes)
+    if not validNodes:
+        return data
+
+    mNodeIDs = {}
+    resolved = {}
+    depFn = OpenMaya.MFnDependencyNode()
+    for plug, con in zip(connections[::2], connections[1::2]):
+        mNode, attr = con.split('.', 1)
+        if mNode not in validNodes:
+            continue
+        name = plug.split('.')[0]
+        if name not in resolved:
+            try:
+                selList.clear()
+                selList.add(name)
+                selList.getDependNode(0, mobj)
+                resolved[name] = handles.get(OpenMaya.MObjectHandle(mobj).hashCode(), [])
+            except:
+                resolved[name] = []
+        for node in resolved[name]:
+            if data[node]:
+                continue  # first valid connection wins as the single node call
+            if mNode not in mNodeIDs:
+                try:
+                    selList.clear()
+                    selList.add(mNode)
+                    selList.getDependNode(0, mobj)
+                    depFn.setObject(mobj)
+                    mNodeIDs[mNode] = depFn.findPlug('mNodeID').asString()
+                except:
+                    mNodeIDs[mNode] = None
+            mNodeID = mNodeIDs[mNode]
+            if mNodeID is None:
+                mNodeID = node.split(':')[-1].split('|')[-1]
+            data[node] = {'metaAttr': attr, 'metaNodeID': mNodeID}
+    return data
+
+class MetaNetwork(object):
+    '''
+    Adjacency snapshot of the message connections between all the mNodes in the scene,
+    built from a single bulk listConnections pass. This is what getChildMetaNodes(walk=True)
+    now walks rather than running a getConnectedMetaNodes call per node, per registered nodeType.
+
+    The snapshot is static so as long as the meta network isn't modified it can be passed
+    into multiple walks via the network flag on getChildMetaNodes / getChildren
+
+    >>> network = r9Meta.MetaNetwork()
+    >>> for mRig in r9Meta.getMetaRigs():
+    >>>     mRig.getChildMetaNodes(walk=True, network=network)
+    '''
+    def __init__(self, nTypes=None):
+        '''
+        :param nTypes: only snapshot nodes of the given types, default is all registered meta nodeTypes
+        '''
+        self.nTypes = nTypes or getMClassNodeTypes()
+        self.children = {}  # {mNode: [child mNodes]} message connected children in connection order
+        self.mClassData = {}  # {mNode: (mClass, mClassGrp, mSystemRoot)} as returned by getMClassDataFromNodes
+        self.snapshot()
+
+    def __contains__(self, node):
+        return node in self.mClassData
+
+    def __len__(self):
+        return len(self.mClassData)
+
+    def snapshot(self):
+        '''
+        rebuild the adjacency from the current scene
+        '''
+        self.children = {}
+        self.mClassData = {}
+        nodes = cmds.ls(type=self.nTypes)
+        if not nodes:
+            return
+        self.mClassData = dict((node, data) for node, data in getMClassDataFromNodes(nodes).items() if data[0])
+        if not self.mClassData:
+            return
+        cons = cmds.listConnections(list(self.mClassData.keys()), s=False, d=True, c=True, p=True, shapes=True)
+        if not cons:
+            return
+        selList = OpenMaya.MSelectionList()
+        plug = OpenMaya.MPlug()
+        linked = set()
+        for srcPlug, dstPlug in zip(cons[::2], cons[1::2]):
+            child = dstPlug.split('.')[0]
+            if child not in self.mClassData:
+                continue
+            parent = srcPlug.split('.')[0]
+            if (parent, child) in linked:
+                continue
+            # NOTE we're only interested in connected nodes via message linked attrs
+            try:
+                selList.clear()
+                selList.add(srcPlug)
+                selList.getPlug(0, plug)
+            except:
+                log.debug('MetaNetwork : unable to resolve plug : %s' % srcPlug)
+                continue
+            if not plug.attribute().hasFn(OpenMaya.MFn.kMessageAttribute):
+                continue
+            linked.add((parent, child))
+            self.children.setdefault(parent, []).append(child)
+
+    def _resolve(self, node):
+        '''
+        the snapshot is keyed by the shortest unique names as returned by cmds.ls,
+        whereas mNode returns the full path for dagNodes
+        '''
+        if node in self.mClassData:
+            return node
+        resolved = cmds.ls(node)
+        if resolved:
+            return resolved[0]
+        return node
+
+    def walk(self, node, mTypes=[], mInstances=[], mAttrs=None, skipTypes=[], skipInstances=[],
+             stepover=False, currentSystem=False):
+        '''
+        breadth first walk down the network from the given node using the snapshot adjacency.
+        Filter args are as getChildMetaNodes, with stepover=False the filters are applied during
+        the traversal so a branch stops at the first node that fails them, with stepover=True
+        we walk everything and return the nodes matching ANY of mTypes, mInstances or mAttrs.
+
+        :param node: mNode to walk from, not included in the return
+        :return: list of child mNodes in walk order
+        '''
+        node = self._resolve(node)
+        if node not in self.mClassData:
+            return []
+        filtering = any([mTypes, mInstances, mAttrs, skipTypes, skipInstances])
+
+        visited = set([node])
+        queue = deque([node])
+        found = []
+        while queue:
+            # gather the next depth in one go so that the filters run in bulk per level
+            level = []
+            for _ in range(len(queue)):
+                for child in self.children.get(queue.popleft(), []):
+                    if child not in visited:
+                        visited.add(child)
+                        level.append(child)
+            if not level:
+                break
+            if currentSystem:
+                for child in [c for c in level if self.mClassData[c][2]]:
+                    log.debug('skipping new System - preventing walking into child mRig systems : %s' % child)
+                level = [c for c in level if not self.mClassData[c][2]]
+            if filtering and not stepover:
+                level = filterMetaNodes(level, mTypes=mTypes, mInstances=mInstances, skipTypes=skipTypes,
+                                        skipInstances=skipInstances, mClassData=self.mClassData)
+                if mAttrs and level:
+                    level = r9Core.FilterNode().lsSearchAttributes(mAttrs, nodes=level)
+            found.extend(level)
+            queue.extend(level)
+
+        if filtering and stepover and found:
+            matched = set()
+            if mTypes:
+                matched.update(filterMetaNodes(found, mTypes=mTypes, mClassData=self.mClassData))
+            if mInstances:
+                matched.update(filterMetaNodes(found, mInstances=mInstances, mClassData=self.mClassData))
+            if mAttrs:
+                matched.update(r9Core.FilterNode().lsSearchAttributes(mAttrs, nodes=found))
+            found = [n for n in found if n in matched]
+        return found
+
 def getConnectedMetaSystemRoot(node, mTypes=[], ignoreTypes=[], mSystemRoot=True, **kws):
     '''
     From a given node see if it's part of a MetaData system, if so
@@ -1666,7 +2178,10 @@ class MetaClass(object):
                    'lockState',
                    '_forceAsMeta',
                    '_lastDagPath',
-                   '_lastUUID']
+                   '_lastUUID',
+                   '_attrSchema',
+                   '_attrSchemaCB',
+                   '_decodedCache']
 
     def __new__(cls, *args, **kws):
 
@@ -1747,6 +2262,9 @@ class MetaClass(object):
         object.__setattr__(self, '_lastUUID', '')  # . ..NEW...stored on caching of node
         object.__setattr__(self, '_lockState', False)  # by default all mNode's are unlocked, manage this in any subclass if needed
         object.__setattr__(self, '_forceAsMeta', False)  # force all getAttr calls to return mClass objects even for standard Maya nodes
+        object.__setattr__(self, '_attrSchema', None)  # attr schema cache, bound on first attr access of a cached mNode
+        object.__setattr__(self, '_attrSchemaCB', None)  # attributeChanged callback that invalidates the schema
+        object.__setattr__(self, '_decodedCache', {})  # {attr: (hash, raw, kind, value)} decoded JSON string attrs
 
         if not node:
 #             if not name:
@@ -2004,7 +2522,7 @@ class MetaClass(object):
         except:
             # if this fails we have a dead node more than likely
             try:
-                RED9_META_NODECACHE.pop(object.__getattribute__(self, "_lastUUID"))
+                RED9_META_CACHE.remove(object.__getattribute__(self, "_lastUUID"))
                 if logging_is_debug():
                     log.debug("Dead mNode %s removed from cache..." % object.__getattribute__(self, "_lastDagPath"))
             except:
@@ -2021,7 +2539,7 @@ class MetaClass(object):
         # added this is mObject valid check as this was another place stuff breaks on a dead node...same cache clear ability
         if not self._MObjectHandle.isValid():
             try:
-                RED9_META_NODECACHE.pop(object.__getattribute__(self, "_lastUUID"))
+                RED9_META_CACHE.remove(object.__getattribute__(self, "_lastUUID"))
                 if logging_is_debug():
                     log.debug("Dead mNode %s removed from cache..." % object.__getattribute__(self, "_lastDagPath"))
             except:
@@ -2089,6 +2607,119 @@ class MetaClass(object):
             return cmds.ls(self.mNode, uuid=True)[0]
         return self.UUID
 
+    # Attribute Schema cache
+    # -----------------------------------------------------------------------------------
+
+    def __bindAttrSchema__(self):
+        '''
+        bind the attr schema cache and it's attributeChanged callback. Only mNodes held in the
+        RED9_META_NODECACHE get a schema, otherwise we'd bind a callback for every transient
+        wrapped instance. The callback is removed when the node leaves the cache.
+        '''
+        try:
+            UUID = object.__getattribute__(self, '_lastUUID')
+        except AttributeError:
+            return False
+        if not UUID or RED9_META_NODECACHE.get(UUID) is not self:
+            return False
+        schema = {}
+        try:
+            callbackID = OpenMaya.MNodeMessage.addAttributeChangedCallback(object.__getattribute__(self, '_MObject'),
+                                                                          _metaAttrSchema_changedCB, schema)
+        except:
+            log.debug('unable to bind the attributeChanged callback for the attr schema')
+            return False
+        object.__setattr__(self, '_attrSchema', schema)
+        object.__setattr__(self, '_attrSchemaCB', callbackID)
+        return True
+
+    def __clearAttrSchema__(self):
+        '''
+        unbind the attr schema cache, called when the mNode is removed from the RED9_META_NODECACHE
+        '''
+        try:
+            callbackID = object.__getattribute__(self, '_attrSchemaCB')
+        except AttributeError:
+            return
+        if callbackID:
+            try:
+                OpenMaya.MMessage.removeCallback(callbackID)
+            except:
+                log.debug('failed to remove the attr schema callback')
+        object.__setattr__(self, '_attrSchema', None)
+        object.__setattr__(self, '_attrSchemaCB', None)
+
+    def __resetAttrSchema__(self):
+        '''
+        invalidate the cached attr schema, run whenever we add, delete or rename attrs on the mNode
+        '''
+        schema = object.__getattribute__(self, '_attrSchema')
+        if schema:
+            schema.clear()
+
+    def __attrSchema__(self, attr):
+        '''
+        return the cached schema for the given attr on the mNode. This is built lazily on first
+        access and then held on the instance so that the get / set calls no longer have to
+        query Maya for the attrType, lock state etc on every access.
+
+        :param attr: attr to return the schema for
+        :return: None if no schema is bound to this instance (uncached or standard wrapped nodes),
+            False if the attr doesn't exist on the mNode, else {'type': attrType, 'hasAttr': bool}
+            which is then filled on demand with 'locked', 'multi' and 'enums' by __attrSchemaField__
+        '''
+        try:
+            schema = object.__getattribute__(self, '_attrSchema')
+        except AttributeError:
+            return None
+        if schema is None:
+            if not object.__getattribute__(self, '__bindAttrSchema__')():
+                return None
+            schema = object.__getattribute__(self, '_attrSchema')
+        entry = schema.get(attr)
+        if entry is not None:
+            RED9_META_ATTRSCHEMA_STATS['hits'] += 1
+            RED9_META_ATTRSCHEMA_STATS['callsSaved'] += 1
+            return entry
+        RED9_META_ATTRSCHEMA_STATS['misses'] += 1
+        try:
+            entry = {'type': cmds.getAttr('%s.%s' % (object.__getattribute__(self, 'mNode'), attr), type=True),
+                     'hasAttr': object.__getattribute__(self, '_MFnDependencyNode').hasAttribute(attr)}
+        except:
+            entry = False
+        schema[attr] = entry
+        return entry
+
+    def __attrSchemaField__(self, attr, field, entry=None):
+        '''
+        return the given field from the attr schema, querying Maya only if it's not yet cached.
+        If there's no schema bound we fall back to the direct Maya query every time.
+
+        :param attr: attr to inspect
+        :param field: 'type', 'locked', 'multi' or 'enums'
+        :param entry: the schema entry if already resolved by the caller
+        '''
+        if entry is None:
+            entry = object.__getattribute__(self, '__attrSchema__')(attr)
+        if entry and field in entry:
+            if not field == 'type':
+                RED9_META_ATTRSCHEMA_STATS['callsSaved'] += 1
+            return entry[field]
+        mNode = object.__getattribute__(self, 'mNode')
+        if field == 'type':
+            value = cmds.getAttr('%s.%s' % (mNode, attr), type=True)
+        elif field == 'locked':
+            value = cmds.getAttr('%s.%s' % (mNode, attr), l=True)
+        elif field == 'multi':
+            value = cmds.attributeQuery(attr, node=mNode, multi=True)
+        elif field == 'enums':
+            value = cmds.attributeQuery(attr, node=mNode, listEnum=True)[0].split(':')
+        else:
+            raise KeyError('unknown attr schema field : %s' % field)
+        if entry:
+            entry[field] = value
+        return value
+
     # Attribute Management block
     # -----------------------------------------------------------------------------------
 
@@ -2098,7 +2729,7 @@ class MetaClass(object):
         '''
         if attributeDataType(value) in ['string', 'unicode']:
             log.debug('set enum attribute by string :  %s' % value)
-            enums = cmds.attributeQuery(attr, node=self.mNode, listEnum=True)[0].split(':')
+            enums = self.__attrSchemaField__(attr, 'enums')
             try:
                 value = enums.index(value)
             except:
@@ -2112,7 +2743,7 @@ class MetaClass(object):
         the ONLY connections to that msgLink and all other current connections will be deleted
         hence cleanCurrent=True
         '''
-        if cmds.attributeQuery(attr, node=self.mNode, multi=True) == False:
+        if self.__attrSchemaField__(attr, 'multi') == False:
             if attributeDataType(value) == 'complex':
                 raise ValueError("You can't connect multiple nodes to a singluar message plug via __setattr__")
 
@@ -2122,6 +2753,62 @@ class MetaClass(object):
             log.debug('set multi-message attribute connection:  %s' % value)
             self.connectChildren(value, attr, cleanCurrent=True, force=force)
 
+    def __setAttrValue__(self, attr, value, attrType, force=True):
+        '''
+        push the value to the given attr on the mNode, the attr must exist and be unlocked.
+        Split out of __setattr__ so that setAttrs can run it for a batch of attrs under a
+        single lock management pass
+        '''
+        mnode = self.mNode
+        object.__getattribute__(self, '_decodedCache').pop(attr, None)
+        # enums Handling
+        if attrType == 'enum':
+            self.__setEnumAttr__(attr, value)
+
+        # message Link handling
+        elif attrType == 'message':
+            self.__setMessageAttr__(attr, value, force)
+
+        # standard Attribute
+        else:
+            attrString = '%s.%s' % (mnode, attr)  # mayaNode.attribute for cmds.get/set calls
+            # attrType=cmds.getAttr(attrString, type=True)  # the MayaNode attribute valueType
+            valueType = attributeDataType(value)  # DataType passed in to be set as Value
+            # log.debug('setting attribute type : %s to value : %s' % (attrType,value))
+
+            if attrType == 'string':
+                if valueType == 'string' or valueType == 'unicode':
+                    cmds.setAttr(attrString, value, type='string')
+                    if logging_is_debug():
+                        log.debug("setAttr : %s : type : 'string' to value : %s" % (attr, value))
+                    # return  # why was this returned here, by-passing the attr lock handling?
+                elif valueType == 'complex':
+                    if logging_is_debug():
+                        log.debug("setAttr : %s : type : 'complex_string' to value : %s" % (attr, self.__serializeComplex(value)))
+                    cmds.setAttr(attrString, self.__serializeComplex(value), type='string')
+                    # return  # why was this returned here, by-passing the attr lock handling?
+
+            elif attrType in ['double3', 'float3'] and valueType == 'complex':
+                try:
+                    cmds.setAttr(attrString, value[0], value[1], value[2])
+                except ValueError, error:
+                    raise ValueError(error)
+            elif attrType == 'doubleArray':
+                cmds.setAttr(attrString, value, type='doubleArray')
+            elif attrType == 'matrix':
+                cmds.setAttr(attrString, value, type='matrix')
+
+            # elif attrType=='TdataCompound': #ie blendShape weights = multi data or joint.minRotLimitEnable
+            #    pass
+            else:
+                try:
+                    cmds.setAttr(attrString, value)
+                except StandardError, error:
+                    log.debug('failed to setAttr %s - might be connected' % attrString)
+                    raise StandardError(error)
+            if logging_is_debug():
+                log.debug("setAttr : %s : type : '%s' to value : %s" % (attr, attrType, value))
+
     @nodeLockManager
     def __setattr__(self, attr, value, force=True, **kws):
         '''
@@ -2131,61 +2818,17 @@ class MetaClass(object):
         object.__setattr__(self, attr, value)
 
         if attr not in MetaClass.UNMANAGED and not attr == 'UNMANAGED':
-            if self.hasAttr(attr):
+            schema = self.__attrSchema__(attr)
+            if schema is None:
+                exists = self.hasAttr(attr)
+            else:
+                exists = schema and schema['hasAttr']
+            if exists:
                 locked = False
-                if self.attrIsLocked(attr) and force:
+                if force and self.__attrSchemaField__(attr, 'locked', schema):
                     self.attrSetLocked(attr, False)
                     locked = True
-                mnode = self.mNode
-                attrType = self.attrType(attr)
-
-                # enums Handling
-                if attrType == 'enum':
-                    self.__setEnumAttr__(attr, value)
-
-                # message Link handling
-                elif attrType == 'message':
-                    self.__setMessageAttr__(attr, value, force)
-
-                # standard Attribute
-                else:
-                    attrString = '%s.%s' % (mnode, attr)  # mayaNode.attribute for cmds.get/set calls
-                    # attrType=cmds.getAttr(attrString, type=True)  # the MayaNode attribute valueType
-                    valueType = attributeDataType(value)  # DataType passed in to be set as Value
-                    # log.debug('setting attribute type : %s to value : %s' % (attrType,value))
-
-                    if attrType == 'string':
-                        if valueType == 'string' or valueType == 'unicode':
-                            cmds.setAttr(attrString, value, type='string')
-                            if logging_is_debug():
-                                log.debug("setAttr : %s : type : 'string' to value : %s" % (attr, value))
-                            # return  # why was this returned here, by-passing the attr lock handling?
-                        elif valueType == 'complex':
-                            if logging_is_debug():
-                                log.debug("setAttr : %s : type : 'complex_string' to value : %s" % (attr, self.__serializeComplex(value)))
-                            cmds.setAttr(attrString, self.__serializeComplex(value), type='string')
-                            # return  # why was this returned here, by-passing the attr lock handling?
-
-                    elif attrType in ['double3', 'float3'] and valueType == 'complex':
-                        try:
-                            cmds.setAttr(attrString, value[0], value[1], value[2])
-                        except ValueError, error:
-                            raise ValueError(error)
-                    elif attrType == 'doubleArray':
-                        cmds.setAttr(attrString, value, type='doubleArray')
-                    elif attrType == 'matrix':
-                        cmds.setAttr(attrString, value, type='matrix')
-
-                    # elif attrType=='TdataCompound': #ie blendShape weights = multi data or joint.minRotLimitEnable
-                    #    pass
-                    else:
-                        try:
-                            cmds.setAttr(attrString, value)
-                        except StandardError, error:
-                            log.debug('failed to setAttr %s - might be connected' % attrString)
-                            raise StandardError(error)
-                    if logging_is_debug():
-                        log.debug("setAttr : %s : type : '%s' to value : %s" % (attr, attrType, value))
+                self.__setAttrValue__(attr, value, self.__attrSchemaField__(attr, 'type', schema), force)
                 if locked:
                     self.attrSetLocked(attr, True)
             else:
@@ -2202,7 +2845,7 @@ class MetaClass(object):
         msgLinks = cmds.listConnections('%s.%s' % (self.mNode, attr), destination=True, source=True, sh=True)
         if msgLinks:
             msgLinks = cmds.ls(msgLinks, l=True)
-            if not cmds.attributeQuery(attr, node=self.mNode, m=True):  # singular message
+            if not self.__attrSchemaField__(attr, 'multi'):  # singular message
                 if isMetaNode(msgLinks[0]):
                     return MetaClass(msgLinks[0])
             for i, link in enumerate(msgLinks):
@@ -2246,12 +2889,23 @@ class MetaClass(object):
                 return data
             # stops recursion, do not getAttr on mNode here
             mNode = object.__getattribute__(self, "mNode")
-            if not mNode or not cmds.objExists(mNode):
+            if not mNode:
+                return data
+            # cached attr schema, if bound this by-passes the objExists and attrType queries
+            schema = object.__getattribute__(self, "__attrSchema__")(attr)
+            if schema is None and not cmds.objExists(mNode):
                 return data  # object.__getattribute__(self, attr)
             else:
                 # MayaNode processing - retrieve attrVals on the MayaNode
                 try:
-                    attrType = cmds.getAttr('%s.%s' % (mNode, attr), type=True)
+                    if schema is None:
+                        attrType = cmds.getAttr('%s.%s' % (mNode, attr), type=True)
+                    elif schema:
+                        RED9_META_ATTRSCHEMA_STATS['callsSaved'] += 1  # objExists
+                        attrType = schema['type']
+                    else:
+                        # schema says the attr isn't on the mNode
+                        raise AttributeError(attr)
 
                     # Message Link handling
                     # =====================
@@ -2264,13 +2918,7 @@ class MetaClass(object):
                     if attrType == 'string':
                         # for string data we pass it via the JSON decoder such that
                         # complex data can be managed and returned correctly
-                        try:
-                            attrVal = self.__deserializeComplex(attrVal)
-                            if type(attrVal) == dict:
-                                return attrVal
-                        except:
-                            log.debug('string is not JSON deserializable')
-                        return attrVal
+                        return object.__getattribute__(self, '__decodeComplexAttr__')(attr, attrVal)
 
                     elif attrType == 'double3' or attrType == 'float3':
                         return attrVal[0]  # return (x,x,x) not [(x,x,x)] as standard Maya does
@@ -2310,6 +2958,37 @@ class MetaClass(object):
             return json.loads(str(data))
         return json.loads(data)
 
+    def __decodeComplexAttr__(self, attr, attrVal):
+        '''
+        return the value for the given raw string attr value, the JSON decoded data if the string
+        is JSON deserializable, else the raw string itself. Decoded data is cached per attr and keyed
+        on the raw string's hash so repeated reads of large complex attrs, poses, mirrorMaps etc,
+        don't re-parse the JSON. Mutable returns, dicts and lists, are cached as a cPickle and each
+        read returns a fresh copy from it, which is still a lot faster than json.loads, so callers
+        are free to modify the return.
+        If the raw string has changed, setAttr or otherwise, the hash won't match and we re-decode.
+        '''
+        if not attrVal:
+            return attrVal
+        cache = object.__getattribute__(self, '_decodedCache')
+        key = hash(attrVal)
+        cached = cache.get(attr)
+        if cached and cached[0] == key and cached[1] == attrVal:
+            if cached[2] == 'pickle':
+                return cPickle.loads(cached[3])
+            return cached[3]
+        try:
+            decoded = object.__getattribute__(self, '_MetaClass__deserializeComplex')(attrVal)
+        except:
+            log.debug('string is not JSON deserializable')
+            cache[attr] = (key, attrVal, 'raw', attrVal)
+            return attrVal
+        if isinstance(decoded, (dict, list)):
+            cache[attr] = (key, attrVal, 'pickle', cPickle.dumps(decoded, cPickle.HIGHEST_PROTOCOL))
+        else:
+            cache[attr] = (key, attrVal, 'value', decoded)
+        return decoded
+
     @nodeLockManager
     def __delattr__(self, attr):
         try:
@@ -2319,6 +2998,7 @@ class MetaClass(object):
             if self.hasAttr(attr):
                 cmds.setAttr('%s.%s' % (self.mNode, attr), l=False)
                 cmds.deleteAttr('%s.%s' % (self.mNode, attr))
+                self.__resetAttrSchema__()
 
         except StandardError, error:
             raise StandardError(error)
@@ -2327,7 +3007,7 @@ class MetaClass(object):
         '''
         return the api attr type
         '''
-        return cmds.getAttr('%s.%s' % (self.mNode, attr), type=True)
+        return self.__attrSchemaField__(attr, 'type')
 
     def hasAttr(self, attr):
         '''
@@ -2356,11 +3036,11 @@ class MetaClass(object):
         if not r9General.is_basestring(attr):
             locked = False
             for a in attr:
-                if cmds.getAttr('%s.%s' % (self.mNode, a), l=True):
+                if self.__attrSchemaField__(a, 'locked'):
                     locked = True
                     break
             return locked
-        return cmds.getAttr('%s.%s' % (self.mNode, attr), l=True)
+        return self.__attrSchemaField__(attr, 'locked')
 
     @nodeLockManager
     def attrSetLocked(self, attr, state):
@@ -2379,6 +3059,99 @@ class MetaClass(object):
         except StandardError, error:
             log.debug(error)
 
+    def getAttrs(self, attrs):
+        '''
+        bulk read of the given attrs from the mNode returning {attr: value}. The attr types are resolved
+        once up front (from the attr schema if bound) and the values pulled without the per attr objExists
+        and type queries that mNode.attr runs. String attrs that are JSON deserializable are returned
+        decoded, dicts, lists, numbers or None, else the raw string, matching the standard mNode.attr call.
+
+        :param attrs: list of attrs to return, attrs not on the mNode fall back to the python
+            attrs on the instance / class, raising AttributeError if not found at all
+        '''
+        if r9General.is_basestring(attrs):
+            attrs = [attrs]
+        mNode = self.mNode
+
+        # resolve all attr types first
+        attrTypes = []
+        for attr in attrs:
+            attrType = None
+            if attr not in MetaClass.UNMANAGED:
+                schema = self.__attrSchema__(attr)
+                if schema is None:
+                    if self.hasAttr(attr):
+                        attrType = cmds.getAttr('%s.%s' % (mNode, attr), type=True)
+                elif schema:
+                    RED9_META_ATTRSCHEMA_STATS['callsSaved'] += 1
+                    attrType = schema['type']
+            attrTypes.append((attr, attrType))
+
+        data = {}
+        for attr, attrType in attrTypes:
+            if not attrType:
+                data[attr] = getattr(self, attr)
+            elif attrType == 'message':
+                data[attr] = self.__getMessageAttr__(attr)
+            else:
+                attrVal = cmds.getAttr('%s.%s' % (mNode, attr), silent=True)
+                if attrType == 'string':
+                    attrVal = self.__decodeComplexAttr__(attr, attrVal)
+                elif attrType == 'double3' or attrType == 'float3':
+                    attrVal = attrVal[0]
+                data[attr] = attrVal
+        return data
+
+    @nodeLockManager
+    def setAttrs(self, data, force=True, safe=False):
+        '''
+        bulk set of attrs on the mNode from a given {attr: value} dict. Attr types and lock states
+        are resolved once, any locked attrs are unlocked in one pass before the sets and relocked after,
+        and the node lock is managed once for the batch rather than per attr as setattr does.
+
+        :param data: {attr: value} to set, attrs not on the mNode are set on the python instance only
+        :param force: as __setattr__, unlock any locked attrs to set them, relocking after
+        :param safe: if True failures are logged and returned rather than raising
+        :return: {attr: formatted traceback} for any attrs that failed to set when safe=True
+        '''
+        failed = {}
+        toSet = []
+        toUnlock = []
+        for attr, value in data.items():
+            object.__setattr__(self, attr, value)
+            if attr in MetaClass.UNMANAGED or attr == 'UNMANAGED':
+                continue
+            schema = self.__attrSchema__(attr)
+            if schema is None:
+                exists = self.hasAttr(attr)
+            else:
+                exists = schema and schema['hasAttr']
+            if not exists:
+                log.debug('attr : %s doesnt exist on MayaNode > class attr only' % attr)
+                continue
+            if force and self.__attrSchemaField__(attr, 'locked', schema):
+                toUnlock.append(attr)
+            toSet.append((attr, value, self.__attrSchemaField__(attr, 'type', schema)))
+
+        if toUnlock and self.isReferenced():
+            toUnlock = []  # as attrSetLocked, can't modify the lock state of referenced attrs
+        mNode = self.mNode
+        for attr in toUnlock:
+            cmds.setAttr('%s.%s' % (mNode, attr), l=False)
+        try:
+            for attr, value, attrType in toSet:
+                try:
+                    self.__setAttrValue__(attr, value, attrType, force)
+                except StandardError, error:
+                    if not safe:
+                        raise
+                    log.debug('setAttrs : failed to set %s : %s' % (attr, error))
+                    failed[attr] = traceback.format_exc()
+        finally:
+            for attr in toUnlock:
+                cmds.setAttr('%s.%s' % (mNode, attr), l=True)
+        return failed
+
     def attrBreakConnections(self, attr, source=True, dest=False):
         '''
         break all current connections to the given attr on the mNode
@@ -2400,6 +3173,7 @@ class MetaClass(object):
         wrap over cmds.renameAttr
         '''
         cmds.renameAttr('%s.%s' % (self.mNode, currentAttr), newName)
+        self.__resetAttrSchema__()
 
     @nodeLockManager
     def delAttr(self, attr, force=False):
@@ -2411,6 +3185,7 @@ class MetaClass(object):
                 if force:
                     cmds.setAttr('%s.%s' % (self.mNode, attr), l=False)
                 cmds.deleteAttr(self.mNode, at=attr)
+                self.__resetAttrSchema__()
             except StandardError, err:
                 raise StandardError('Failed to delete given attrs : %s : %s' % (attr, err))
 
@@ -2487,6 +3262,7 @@ class MetaClass(object):
                 if kws:
                     if addkwsToEdit:
                         cmds.addAttr('%s.%s' % (self.mNode, attr), e=True, **addkwsToEdit)
+                        self.__resetAttrSchema__()  # enumNames may have changed
                         if logging_is_debug():
                             log.debug('addAttr Edit flags run : %s = %s' % (attr, addkwsToEdit))
                     if setKwsToEdit:
@@ -2512,6 +3288,7 @@ class MetaClass(object):
                 if logging_is_debug():
                     log.debug('addAttr : %s : valueType : %s > dataType kws: %s' % (attr, attrType, DataTypeKws[attrType]))
                 cmds.addAttr(self.mNode, **DataTypeKws[attrType])
+                self.__resetAttrSchema__()
 
                 if attrType == 'double3' or attrType == 'float3':
                     if attrType == 'double3':
@@ -2581,7 +3358,7 @@ class MetaClass(object):
         from a given enum attr on this mNode, return the current enum value as a string
         ''' 
         if self.attrType(attr) == 'enum':
-            enums = cmds.attributeQuery(attr, node=self.mNode, listEnum=True)[0].split(':')
+            enums = self.__attrSchemaField__(attr, 'enums')
             return enums[getattr(self, attr)]
 
     # Utity Functions
@@ -2671,23 +3448,16 @@ class MetaClass(object):
         but in certain instances, we still want to return just this base info for the mNode.
         This now keeps the info here very dynamic for all child classes no matter how deep they are!
         '''
-        data = {}
+        # simple attr management for some of the mRig base classes
+        # added here so that we don't have to subclass these simple additions
+        # although really that needs doing in future
+        attrs = ['mNodeID', 'mClass', 'mClassGrp', 'mSystemRoot']
+        attrs.extend([attr for attr in ['systemType', 'mirrorSide'] if self.hasAttr(attr)])
+        data = self.getAttrs(attrs)
         data['mNode'] = self.mNode
-        data['mNodeID'] = self.mNodeID
-        data['mClass'] = self.mClass
         data['mClassInheritance'] = str(self.__class__)
-        data['mClassGrp'] = self.mClassGrp
-        data['mSystemRoot'] = self.mSystemRoot
         data['lockState'] = self.lockState
         data['nodeType'] = cmds.nodeType(self.mNode)
-
-        # simple attr management for some of the mRig base classes
-        # added here so that we don't have to subclass these simple additions
-        # although really that needs doing in future
-        if self.hasAttr('systemType'):
-            data['systemType'] = self.systemType
-        if self.hasAttr('mirrorSide'):
-            data['mirrorSide'] = self.mirrorSide
         return data
 
     @property
@@ -3165,7 +3935,7 @@ class MetaClass(object):
             return mChild
 
 #     @r9General.Timer
-    def getChildMetaNodes(self, walk=False, mAttrs=None, stepover=False, currentSystem=False, **kws):
+    def getChildMetaNodes(self, walk=False, mAttrs=None, stepover=False, currentSystem=False, network=None, **kws):
         '''
         Find any connected Child MetaNodes to this mNode.
 
@@ -3180,6 +3950,8 @@ class MetaClass(object):
             root of a given mRig system, by respecting this we clamp searches to the current system and prevent
             walking into the connected child sub-system. Primarily used in ProPack to stop facial nodes being
             returned and processed as part of the connected body rig.
+        :param network: only used if walk=True, a MetaNetwork snapshot of the scene to walk. If not given
+            one is built for the call, pass one in when walking multiple systems over an unchanged scene
 
         .. note::
             mAttrs is only searching attrs on the mNodes themselves, not all children
@@ -3200,84 +3972,28 @@ class MetaClass(object):
                         children.remove(child)
             return children
         else:
-            metaNodes = []
-            if not any(['mTypes' in kws, 'mInstances' in kws, mAttrs]):
+            if not any([kws.get('mTypes'), kws.get('mInstances'), mAttrs]):
                 # no flags passed so the stepover flag is redundant
                 stepover = False
-            if stepover:
-                # if we're stepping over unmatched children then we remove the kws and deal with the match later
-                children = getConnectedMetaNodes(self.mNode, source=False, destination=True, dataType='unicode')  # , **kws)
-            else:
-                children = getConnectedMetaNodes(self.mNode, source=False, destination=True, mAttrs=mAttrs, dataType='unicode', **kws)
-
-            if children:
-                runaways = 0
-                depth = 0
-                processed = []
-                extendedChildren = []
-                while children and runaways <= 1000:
-                    for child in children:
-                        if currentSystem:
-                            if cmds.objExists('%s.mSystemRoot' % child) and cmds.getAttr('%s.mSystemRoot' % child):
-                                log.debug('skipping new System - preventing walking into child mRig systems : %s' % child)
-                                children.remove(child)
-                                continue
-                        mNode = child
-                        if mNode not in processed:
-                            metaNodes.append(child)
-                        else:
-                            # print('skipping as node already processed : %s' % mNode)
-                            children.remove(child)
-                            continue
-                            # log.info('mNode added to metaNodes : %s' % mNode)
-                        children.remove(child)
-                        processed.append(mNode)
-                        # log.info( 'connections too : %s' % mNode)
-                        if stepover:
-                            # if we're stepping over unmatched children then we remove the kws and deal with the match later
-                            extendedChildren.extend(getConnectedMetaNodes(mNode, source=False, destination=True, dataType='unicode'))  # , **kws))
-                        else:
-                            extendedChildren.extend(getConnectedMetaNodes(mNode, source=False, destination=True, mAttrs=mAttrs, dataType='unicode', **kws))
-                        # log.info('left to process : %s' % ','.join([c.mNode for c in children]))
-                        if not children:
-                            if extendedChildren:
-                                log.debug('Child MetaNode depth extended %i' % depth)
-                                # log.debug('Extended Depth child List: %s' % ','.join([c.mNode for c in extendedChildren]))
-                                children.extend(extendedChildren)
-                                extendedChildren = []
-                                depth += 1
-                        runaways += 1
-
-                # at this point we're still dealing with unicode nodes
-                childmNodes = [MetaClass(node) for node in metaNodes if not node == self.mNode]
-
-                typematched = []
-                if stepover:
-                    for node in childmNodes:
-                        if 'mTypes' in kws and node not in typematched:
-                            if isMetaNode(node, kws['mTypes']):
-                                log.debug('getChildMetaNodes : mTypes matched : %s' % node)
-                                typematched.append(node)
-                        if 'mInstances' in kws and node not in typematched:
-                            if isMetaNodeInherited(node, kws['mInstances']):
-                                log.debug('getChildMetaNodes : mInstances matched : %s' % node)
-                                typematched.append(node)
-                        if mAttrs and node not in typematched:
-                            if r9Core.FilterNode().lsSearchAttributes(mAttrs, nodes=[node.mNode]):
-                                log.debug('getChildMetaNodes : mAttrs matched : %s' % node)
-                                typematched.append(node)
-                    return typematched
-                else:
-                    return childmNodes
-        return []
+            if network is None:
+                network = MetaNetwork(nTypes=kws.get('nTypes'))
+            children = network.walk(self.mNode,
+                                    mTypes=kws.get('mTypes', []),
+                                    mInstances=kws.get('mInstances', []),
+                                    mAttrs=mAttrs,
+                                    skipTypes=kws.get('skipTypes', []),
+                                    skipInstances=kws.get('skipInstances', []),
+                                    stepover=stepover,
+                                    currentSystem=currentSystem)
+            return [MetaClass(node) for node in children]
 
-    def getChildSystemRoots(self):
+    def getChildSystemRoots(self, **kws):
         '''
         return all child MetaNodes that have the mSystemRoot checkbox set. This is used to denote a child
         MSystem in it's own right. Usually used in ProPack to denote a new child MetaRig, ie, facial system
         connected as a child of a mRig body system
         '''
-        return self.getChildMetaNodes(walk=True, mAttrs=['mSystemRoot=True'])
+        return self.getChildMetaNodes(walk=True, mAttrs=['mSystemRoot=True'], **kws)
 
     def getParentMetaNode(self, **kws):
         '''
@@ -3428,6 +4144,19 @@ class MetaClass(object):
             #    return mNode_data
         return mNode_data
 
+    def getNodeConnectionMetaDataMaps(self, nodes, mTypes=[], mNodes=[]):
+        '''
+        batched version of getNodeConnectionMetaDataMap returning {node: mNode_data} for the
+        given list of nodes, see the module getNodeConnectionMetaDataMaps for details.
+
+        .. note::
+            if getNodeConnectionMetaDataMap has been overloaded on this class we respect that
+            and run the overloaded call per node rather than the batched base implementation
+        '''
+        if type(self).getNodeConnectionMetaDataMap is not MetaClass.getNodeConnectionMetaDataMap:
+            return dict((node, self.getNodeConnectionMetaDataMap(node, mTypes=mTypes, mNodes=mNodes)) for node in nodes)
+        return getNodeConnectionMetaDataMaps(nodes, mTypes=mTypes, mNodes=mNodes)
+
     def getNodeConnetionAttr(self, node):
         '''
         really light wrapper, designed to return the attr via which a node
@@ -3570,14 +4299,8 @@ class MetaRig(MetaClass):
         data = {}
         data['mClass'] = super(MetaRig, self).gatherInfo(level=level, encode_objects=encode_objects, *args, **kws)
         data['filepath'] = cmds.file(q=True, sn=True)
-        if self.hasAttr('version'):
-            data['version'] = self.version
-        if self.hasAttr('rigType'):
-            data['rigType'] = self.rigType
-        if self.hasAttr('exportSkeletonRoot'):
-            data['exportSkeletonRoot'] = self.exportSkeletonRoot
-        if self.hasAttr('timecode_node'):
-            data['timecode_node'] = self.timecode_node
+        data.update(self.getAttrs([attr for attr in ['version', 'rigType', 'exportSkeletonRoot', 'timecode_node']
+                                   if self.hasAttr(attr)]))
         if self.isReferenced():
             data['namespace'] = self.nameSpace()
             data['namespace_full'] = self.nameSpaceFull()
@@ -5213,7 +5936,7 @@ class MetaHIKControlSetNode(MetaRig):
     def getHIKCharacterNode(self):
         return cmds.listConnections(self.mNode, type='HIKCharacterNode')[0]
 
-    def getChildren(self, walk=False, mAttrs=None, cAttrs=None):
+    def getChildren(self, walk=False, mAttrs=None, cAttrs=None, **kws):
         '''
         Carefully over-loaded for HIK system
         '''
@@ -5377,12 +6100,8 @@ class MetaHIKPropertiesNode(MetaClass):
         '''
         get the current mapping state and return a dict {attr:val, ...}
         '''
-        data = {}
-        for attr in sorted(cmds.listAttr(self.mNode)):
-            if attr == 'message':  # skip the default message wire back to the HIK Character node
-                continue
-            data[attr] = getattr(self, attr)
-        return data
+        # skip the default message wire back to the HIK Character node
+        return self.getAttrs([attr for attr in sorted(cmds.listAttr(self.mNode)) if not attr == 'message'])
 
     def get_non_default_values(self):
         '''
@@ -5449,25 +6168,37 @@ class MetaHIKPropertiesNode(MetaClass):
             raise IOError('Filepath not found! %s' % filepath)
 
         log.info('HIKProperty Loading Preset from : %s' % filepath)
+        data = {}
         for key, val in r9General.readJson(filepath).items():
-            try:
-                if type(val) in dataTypes:
-                    if skip_measurements and key in self.measurements:
-                        continue
-                    if skip_rolls and key in self.roll_pitch:
-                        continue
+            if type(val) in dataTypes:
+                if skip_measurements and key in self.measurements:
+                    continue
+                if skip_rolls and key in self.roll_pitch:
+                    continue
+                data[key] = val
 
-                    # only load data that's different from the default config
-                    if changes_only:
-                        current = getattr(self, key)
-                        if not current == val:
-                            setattr(self, key, val)
-                            status['changed'][key] = (current, val)
-                    else:
-                        setattr(self, key, val)
-                        status['set'][key] = val
+        # only load data that's different from the default config
+        if changes_only:
+            try:
+                current = self.getAttrs(data.keys())
             except:
-                status['failed'][key] = (val, traceback.format_exc())
+                # resolve per attr so we know which keys failed
+                current = {}
+                for key in data.keys():
+                    try:
+                        current[key] = getattr(self, key)
+                    except:
+                        status['failed'][key] = (data.pop(key), traceback.format_exc())
+            data = dict((key, val) for key, val in data.items() if not current[key] == val)
+
+        failed = self.setAttrs(data, safe=True)
+        for key, val in data.items():
+            if key in failed:
+                status['failed'][key] = (val, failed[key])
+            elif changes_only:
+                status['changed'][key] = (current[key], val)
+            else:
+                status['set'][key] = val
         if verbose:
             for attr, val in sorted(status['set'].items()):
                 log.info('HIKProperty Set : %s : %s' % (attr, val))
@@ -5848,6 +6579,11 @@ if not RED9_META_CALLBACKS['Open']:
     RED9_META_CALLBACKS['Open'].append(OpenMaya.MSceneMessage.addCallback(OpenMaya.MSceneMessage.kBeforeOpen, metaData_sceneCleanups))
 if not RED9_META_CALLBACKS['New']:
     RED9_META_CALLBACKS['New'].append(OpenMaya.MSceneMessage.addCallback(OpenMaya.MSceneMessage.kBeforeNew, metaData_sceneCleanups))
+# cache invalidation, deleted nodes are dropped from the cache, renamed legacy nodes re-keyed
+if not RED9_META_CALLBACKS.get('NodeRemoved'):
+    RED9_META_CALLBACKS['NodeRemoved'] = [OpenMaya.MDGMessage.addNodeRemovedCallback(_metaCache_nodeRemovedCB, 'dependNode')]
+if not RED9_META_CALLBACKS.get('NameChanged'):
+    RED9_META_CALLBACKS['NameChanged'] = [OpenMaya.MNodeMessage.addNameChangedCallback(OpenMaya.MObject(), _metaCache_nameChangedCB)]
 # if not RED9_META_CALLBACKS['Reference']:
 #     RED9_META_CALLBACKS['Reference'].append(OpenMaya.MSceneMessage.addCallback(OpenMaya.MSceneMessage.kAfterReference, metaData_sceneCleanups))
 # if r9Setup.mayaVersion()<=2015:
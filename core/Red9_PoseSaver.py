@@ -39,7 +39,14 @@ import Red9.packages.configobj as configobj
 import time
 import getpass
 import json
+import hashlib
 import traceback
+import struct
+import array
+import sys
+import multiprocessing
+import cPickle as pickle
+import collections
 
 
 import logging
@@ -49,6 +56,12 @@ log.setLevel(logging.INFO)
 
 LANGUAGE_MAP = r9Setup.LANGUAGE_MAP
 
+try:
+    import numpy
+except:
+    numpy = None
+    log.debug('unable to import numpy, PoseCompare and PoseBlender falling back to pure python')
+
 def getFolderPoseHandler(posePath):
     '''
     Check if the given directory contains a poseHandler.py file
@@ -151,6 +164,695 @@ def apply_nodepose_from_clipboad(nodes=None, cb_selection=True, world_space=Fals
 #                             log.warning('Failed to restore atts %s.%s' % (r9Core.nodeNameStrip(node), attr))
 
 
+# ---------------------------------------------------------------------------------
+# Binary DataMap format ---
+# ---------------------------------------------------------------------------------
+
+# Binary container used by the DataMap when dataformat='binary'. The file is a small header and section
+# table followed by the section payloads, so any single block, ie 'info', can be read without touching
+# the pose data. The info, filterNode_settings, skeletonDict and hikDict blocks are stored as JSON, the
+# poseData is split so that all numeric attr values go into a packed little-endian float64 array, indexed
+# against a string table of the node keys / block names and a table of attr layouts. Controls nearly always
+# share the same set of attrs so a layout is stored once and referenced by every block that uses it.
+# Anything non-numeric stays in a residual JSON block.
+#
+#    header   : '<4sHI'   magic, format version, number of sections
+#    sections : '<32sQQ'  name, offset, length - per section
+#    poseData sub-sections:
+#        'poseData'          : residual JSON, the poseDict minus the packed values
+#        'poseData.strings'  : JSON list, the string table of node keys and block names
+#        'poseData.layouts'  : JSON list of layouts, each a list of [attr, valueType, count]
+#        'poseData.index'    : uint32 array, (key, block, layout) per packed block
+#        'poseData.values'   : float64 array, the values themselves
+
+BINARY_MAGIC = 'R9DM'
+BINARY_VERSION = 1
+BINARY_HEADER = '<4sHI'
+BINARY_SECTION = '<32sQQ'
+BINARY_VALUE_TYPES = {float: 0, int: 1, long: 1, bool: 2}
+BINARY_FLOATLIST = 3
+
+def _binaryArrayToString(arr):
+    if sys.byteorder == 'big':
+        arr = array.array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tostring()
+
+def _binaryArrayFromString(typecode, data):
+    arr = array.array(typecode)
+    arr.fromstring(data)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+def _packPoseDict(poseDict):
+    '''
+    split the poseDict into the residual dict and the packed arrays for the binary format
+
+    :return: (residual, strings, layouts, index, values)
+    '''
+    strings = []
+    stringIDs = {}
+    layouts = []
+    layoutIDs = {}
+    index = array.array('I')
+    values = array.array('d')
+    residual = {}
+
+    def _stringID(string):
+        i = stringIDs.get(string)
+        if i is None:
+            i = stringIDs[string] = len(strings)
+            strings.append(string)
+        return i
+
+    for key, keyData in poseDict.items():
+        residual[key] = {}
+        for block, blockData in keyData.items():
+            if not type(blockData) == dict:
+                residual[key][block] = blockData
+                continue
+            layout = []
+            leftover = {}
+            for attr, val in sorted(blockData.items()):
+                valueType = BINARY_VALUE_TYPES.get(type(val))
+                if valueType is not None:
+                    layout.append((attr, valueType, 1))
+                    values.append(val)
+                elif type(val) == list and val and all(type(v) == float for v in val):
+                    layout.append((attr, BINARY_FLOATLIST, len(val)))
+                    values.extend(val)
+                else:
+                    leftover[attr] = val
+            if not layout:
+                residual[key][block] = blockData
+                continue
+            if leftover:
+                residual[key][block] = leftover
+            layout = tuple(layout)
+            layoutID = layoutIDs.get(layout)
+            if layoutID is None:
+                layoutID = layoutIDs[layout] = len(layouts)
+                layouts.append(layout)
+            index.extend((_stringID(key), _stringID(block), layoutID))
+    return residual, strings, layouts, index, values
+
+def _unpackPoseDict(residual, strings, layouts, index, values):
+    '''
+    rebuild the poseDict from the binary format data, see _packPoseDict
+    '''
+    poseDict = residual
+    # pre-process the layouts, most are pure float data so can be zipped straight into the dict
+    _layouts = []
+    for layout in layouts:
+        attrs = [attr for attr, _, _ in layout]
+        if all(valueType == 0 for _, valueType, _ in layout):
+            _layouts.append((attrs, None, len(attrs)))
+        else:
+            _layouts.append((attrs, [(valueType, count) for _, valueType, count in layout], sum(c for _, _, c in layout)))
+
+    pos = 0
+    indexIter = iter(index)
+    for key, block, layoutID in zip(indexIter, indexIter, indexIter):
+        attrs, valueTypes, size = _layouts[layoutID]
+        blockValues = values[pos:pos + size].tolist()
+        pos += size
+        if valueTypes:
+            converted = []
+            i = 0
+            for valueType, count in valueTypes:
+                if valueType == BINARY_FLOATLIST:
+                    converted.append(blockValues[i:i + count])
+                elif valueType == 1:
+                    converted.append(int(blockValues[i]))
+                elif valueType == 2:
+                    converted.append(bool(blockValues[i]))
+                else:
+                    converted.append(blockValues[i])
+                i += count
+            blockValues = converted
+        keyData = poseDict.setdefault(strings[key], {})
+        block = strings[block]
+        if block in keyData:
+            keyData[block].update(zip(attrs, blockValues))
+        else:
+            keyData[block] = dict(zip(attrs, blockValues))
+    return poseDict
+
+def isBinaryDataMap(filepath):
+    '''
+    simple check on the file's magic header to see if it's a binary DataMap file
+    '''
+    try:
+        with open(filepath, 'rb') as f:
+            return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+    except IOError:
+        return False
+
+def writeBinaryDataMap(filepath, blocks):
+    '''
+    write the given data blocks to the binary DataMap format
+
+    :param filepath: file to write
+    :param blocks: list of (name, data) tuples, data being JSON serializable dicts. The 'poseData'
+        block is split and packed, all others are stored as JSON sections
+    '''
+    payload = []
+    for name, data in blocks:
+        if name == 'poseData':
+            residual, strings, layouts, index, values = _packPoseDict(data)
+            payload.append(('poseData', json.dumps(residual)))
+            payload.append(('poseData.strings', json.dumps(strings)))
+            payload.append(('poseData.layouts', json.dumps(layouts)))
+            payload.append(('poseData.index', _binaryArrayToString(index)))
+            payload.append(('poseData.values', _binaryArrayToString(values)))
+        else:
+            payload.append((name, json.dumps(data)))
+
+    offset = struct.calcsize(BINARY_HEADER) + struct.calcsize(BINARY_SECTION) * len(payload)
+    with open(filepath, 'wb') as f:
+        f.write(struct.pack(BINARY_HEADER, BINARY_MAGIC, BINARY_VERSION, len(payload)))
+        for name, raw in payload:
+            f.write(struct.pack(BINARY_SECTION, name, offset, len(raw)))
+            offset += len(raw)
+        for _, raw in payload:
+            f.write(raw)
+
+def readBinaryDataMap(filepath, blocks=None):
+    '''
+    read the binary DataMap format, only reading the requested blocks
+
+    >>> # read just the info block from a pose, without touching the pose data
+    >>> info = readBinaryDataMap(filepath, blocks=['info'])['info']
+
+    :param filepath: file to read
+    :param blocks: list of block names to read, default (None) reads all
+    :return: {name: data}
+    '''
+    data = {}
+    with open(filepath, 'rb') as f:
+        magic, version, count = struct.unpack(BINARY_HEADER, f.read(struct.calcsize(BINARY_HEADER)))
+        if not magic == BINARY_MAGIC:
+            raise IOError('File is not a binary DataMap : %s' % filepath)
+        if version > BINARY_VERSION:
+            raise IOError('Binary DataMap version %i is newer than this code supports : %s' % (version, filepath))
+        sectionSize = struct.calcsize(BINARY_SECTION)
+        sections = {}
+        for _ in range(count):
+            name, offset, length = struct.unpack(BINARY_SECTION, f.read(sectionSize))
+            sections[name.rstrip('\0')] = (offset, length)
+
+        def _read(name):
+            offset, length = sections[name]
+            f.seek(offset)
+            return f.read(length)
+
+        for name in sections:
+            if '.' in name or (blocks and name not in blocks):
+                continue
+            if name == 'poseData':
+                data[name] = _unpackPoseDict(json.loads(_read('poseData')),
+                                             json.loads(_read('poseData.strings')),
+                                             json.loads(_read('poseData.layouts')),
+                                             _binaryArrayFromString('I', _read('poseData.index')),
+                                             _binaryArrayFromString('d', _read('poseData.values')))
+            else:
+                data[name] = json.loads(_read(name))
+    return data
+
+
+def readDataMapFile(filepath, dataformat=None):
+    '''
+    read a DataMap file, pose / anim etc, into its raw data blocks. This is the reader
+    behind DataMap._readPose and needs no Maya session so can be used for offline
+    processing of pose libraries
+
+    :param filepath: file to read
+    :param dataformat: 'config', 'json' or 'binary', None to detect it from the file. Binary
+        files are always detected from their header, a failed json read falls back to config
+    :return: ({blockName: data}, resolvedDataformat) where blocks are 'poseData', 'info',
+        'filterNode_settings' and optionally 'skeletonDict' and 'hikDict'
+    '''
+    # =========================
+    # read binary format
+    # =========================
+    # tested on the file header so binary files always load regardless of the dataformat
+    if isBinaryDataMap(filepath):
+        return readBinaryDataMap(filepath), 'binary'
+    if not dataformat:
+        with open(filepath, 'r') as f:
+            dataformat = 'json' if f.read(64).lstrip().startswith('{') else 'config'
+    # =========================
+    # read JSON format
+    # =========================
+    if dataformat == 'json':
+        try:
+            with open(filepath, 'r') as f:
+                return json.load(f), 'json'
+        except (IOError, ValueError):
+            log.info('JSON : DataMap format failed to load, reverting to legacy ConfigObj')
+    # =========================
+    # read ConfigObject
+    # =========================
+    return configobj.ConfigObj(filepath, encoding='utf-8'), 'config'
+
+def writeDataMapFile(filepath, blocks, dataformat='config'):
+    '''
+    write DataMap data blocks to file, the writer behind DataMap._writePose
+
+    :param filepath: file to write
+    :param blocks: list of (blockName, data) tuples
+    :param dataformat: 'config', 'json' or 'binary'
+    '''
+    # =========================
+    # write to ConfigObject
+    # =========================
+    if dataformat == 'config':
+        ConfigObj = configobj.ConfigObj(indent_type='\t', encoding='utf-8')
+        for name, data in blocks:
+            ConfigObj[name] = data
+        ConfigObj.filename = filepath
+        ConfigObj.write()
+    # =========================
+    # write to JSON format
+    # =========================
+    elif dataformat == 'json':
+        with open(filepath, 'w') as f:
+            f.write(json.dumps(dict(blocks), sort_keys=True, indent=None))  # indent=4))  # , separators=(',', ':')))
+    # =========================
+    # write to binary format
+    # =========================
+    elif dataformat == 'binary':
+        writeBinaryDataMap(filepath, blocks)
+    else:
+        raise ValueError('Unsupported DataMap dataformat : %s' % dataformat)
+    DATAMAP_READ_CACHE.invalidate(filepath)
+
+
+class DataMapReadCache(object):
+    '''
+    Process wide LRU cache of parsed DataMap files, pose and r9Anim, used by DataMap._readPose.
+    Entries are keyed on the file path and only valid while the file's (mtime, size) are
+    unchanged, any write through writeDataMapFile invalidates the path explicitly.
+
+    The parsed blocks are held pickled so every read hands back its own copy of the data,
+    which callers are free to modify, and so the memory budget is measured exactly.
+
+    >>> r9Pose.DATAMAP_READ_CACHE.stats()
+    >>> r9Pose.DATAMAP_READ_CACHE.maxBytes = 512 * 1024 * 1024
+    >>> r9Pose.DATAMAP_READ_CACHE.invalidate()  # clear the lot
+    '''
+    def __init__(self, maxBytes=256 * 1024 * 1024):
+        self.maxBytes = maxBytes  # memory budget for the pickled data
+        self.enabled = True
+        self._entries = collections.OrderedDict()  # {path: ((mtime, size), dataformat, payload)}, oldest first
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _cacheKey(filepath):
+        return os.path.normcase(os.path.abspath(filepath))
+
+    def read(self, filepath, dataformat=None):
+        '''
+        cached version of readDataMapFile, ConfigObj sections are returned as plain dicts
+
+        :return: ({blockName: data}, resolvedDataformat)
+        '''
+        key = self._cacheKey(filepath)
+        stat = os.stat(filepath)
+        signature = (stat.st_mtime, stat.st_size)
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._bytes -= len(entry[2])
+            if entry[0] == signature:
+                self.hits += 1
+                self._store(key, entry)  # re-insert as the most recently used
+                return pickle.loads(entry[2]), entry[1]
+        self.misses += 1
+        blocks, resolved = readDataMapFile(filepath, dataformat)
+        if isinstance(blocks, configobj.Section):
+            blocks = blocks.dict()
+        if self.enabled:
+            payload = pickle.dumps(blocks, pickle.HIGHEST_PROTOCOL)
+            if len(payload) <= self.maxBytes:
+                self._store(key, (signature, resolved, payload))
+        return blocks, resolved
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._bytes += len(entry[2])
+        while self._bytes > self.maxBytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted[2])
+            self.evictions += 1
+
+    def invalidate(self, filepath=None):
+        '''
+        drop the given file from the cache, or clear the entire cache if no filepath given
+        '''
+        if filepath is None:
+            self._entries.clear()
+            self._bytes = 0
+            return
+        entry = self._entries.pop(self._cacheKey(filepath), None)
+        if entry:
+            self._bytes -= len(entry[2])
+
+    def stats(self):
+        '''
+        :return: dict of the cache hit/miss stats and memory usage
+        '''
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'maxBytes': self.maxBytes}
+
+DATAMAP_READ_CACHE = DataMapReadCache()
+
+def _freezeMetaData(metaData):
+    '''
+    hashable version of a node's metaData dict, {'metaAttr', 'metaNodeID'}, used as the
+    lookup key when matching by metaData
+    '''
+    return tuple(sorted(metaData.items()))
+
+# numeric attr types read back as ints by cmds.getAttr
+_PLUG_INT_TYPES = [getattr(OpenMaya.MFnNumericData, t) for t in ['kByte', 'kChar', 'kShort', 'kInt', 'kLong', 'kInt64', 'kAddr']
+                   if hasattr(OpenMaya.MFnNumericData, t)]
+
+def _getPlugValue(plug):
+    '''
+    read a simple plug value via the API, returning the same type and ui units
+    that cmds.getAttr would. Raises ValueError for any plug type not handled
+    here so the caller can fall back to cmds.getAttr
+
+    :param plug: MPlug to read
+    '''
+    if plug.isArray() or plug.isCompound():
+        raise ValueError('plug is a multi or compound : %s' % plug.name())
+    attr = plug.attribute()
+    if attr.hasFn(OpenMaya.MFn.kNumericAttribute):
+        unitType = OpenMaya.MFnNumericAttribute(attr).unitType()
+        if unitType == OpenMaya.MFnNumericData.kBoolean:
+            return plug.asBool()
+        if unitType in _PLUG_INT_TYPES:
+            return plug.asInt()
+        if unitType in (OpenMaya.MFnNumericData.kFloat, OpenMaya.MFnNumericData.kDouble):
+            return plug.asDouble()
+    elif attr.hasFn(OpenMaya.MFn.kUnitAttribute):
+        unitType = OpenMaya.MFnUnitAttribute(attr).unitType()
+        if unitType == OpenMaya.MFnUnitAttribute.kAngle:
+            return plug.asMAngle().asUnits(OpenMaya.MAngle.uiUnit())
+        if unitType == OpenMaya.MFnUnitAttribute.kDistance:
+            return plug.asMDistance().asUnits(OpenMaya.MDistance.uiUnit())
+        if unitType == OpenMaya.MFnUnitAttribute.kTime:
+            return plug.asMTime().asUnits(OpenMaya.MTime.uiUnit())
+    elif attr.hasFn(OpenMaya.MFn.kEnumAttribute):
+        return plug.asShort()
+    raise ValueError('unsupported plug type : %s' % plug.name())
+
+def getPlugValues(plugs):
+    '''
+    bulk read of plug values through the API, via _getPlugValue, so they come back in the
+    same ui units as cmds.getAttr. Anything the API reader doesn't handle drops back to
+    cmds.getAttr
+
+    :param plugs: list of 'node.attr' plugs
+    :return: matching list of values, None for any plug that couldn't be read
+    '''
+    values = []
+    selList = OpenMaya.MSelectionList()
+    mPlug = OpenMaya.MPlug()
+    for plug in plugs:
+        try:
+            selList.clear()
+            selList.add(plug)
+            selList.getPlug(0, mPlug)
+            values.append(_getPlugValue(mPlug))
+            continue
+        except (RuntimeError, ValueError):
+            pass
+        try:
+            values.append(cmds.getAttr(plug))
+        except StandardError:
+            values.append(None)
+    return values
+
+def setPlugValues(plugs, values, clamp=True):
+    '''
+    bulk set of plug values through the SetPlugValues plug-in, one MDGModifier and
+    one undo entry for the lot. If the plug-in isn't available we fall back to cmds.setAttr
+
+    :param plugs: list of 'node.attr' plugs
+    :param values: matching list of numeric values, in ui units as per setAttr
+    :param clamp: clamp the values to the attrs hard min/max
+    :return: the plugs that failed to set
+    '''
+    if not plugs:
+        return []
+    try:
+        if not cmds.pluginInfo('SetPlugValues.py', query=True, loaded=True):
+            cmds.loadPlugin('SetPlugValues.py')
+        return cmds.SetPlugValues(plug=plugs, value=values, clamp=clamp) or []
+    except StandardError, err:
+        log.debug('SetPlugValues plug-in failed, running native setAttr : %s' % err)
+    failed = []
+    for plug, value in zip(plugs, values):
+        try:
+            cmds.setAttr(plug, value, c=clamp)
+        except StandardError, err:
+            log.debug(err)
+            failed.append(plug)
+    return failed
+
+
+# ---------------------------------------------------------------------------------
+# Pose Library Index ---
+# ---------------------------------------------------------------------------------
+
+class PoseLibraryIndex(object):
+    '''
+    Persistent sidecar index for a pose folder so that the pose library UI can list and
+    filter poses without ever opening the pose files themselves. Each entry is keyed by the
+    pose name and holds the file's mtime, size, info block, node keys, mirrorIDs and the
+    thumbnail path. The index is updated incrementally, only re-reading poses whose mtime
+    or size have changed since the last update.
+
+    >>> index = PoseLibraryIndex(posePath)
+    >>> index.update()
+    >>> index.filter(searchFilter='jump', nodes=['L_Foot_Ctrl'], author='mark')
+
+    .. note::
+        the index is written as a hidden json file in the pose folder. If the folder is
+        read-only (network project folders) the index is persisted to a user-local cache
+        under the Maya prefs instead. Writes go via a temp file and rename so a reader
+        never sees a partially written index.
+    '''
+    INDEX_FILE = '.red9PoseIndex.json'
+    INDEX_VERSION = 1
+    CACHE_DIR = None  # user-local index cache, resolved from the Maya prefs on first use
+
+    def __init__(self, posePath):
+        self.posePath = posePath
+        self.indexPath = os.path.join(posePath, self.INDEX_FILE)
+        self.poses = {}
+        self._dirty = False
+        self.load()
+
+    @classmethod
+    def _cachePath(cls, posePath):
+        '''
+        the user-local index file for the pose folder, used when the folder isn't writable
+        '''
+        if not cls.CACHE_DIR:
+            cls.CACHE_DIR = os.path.join(r9Setup.mayaPrefs(), 'Red9_PoseIndex')
+        return os.path.join(cls.CACHE_DIR, '%s.json' % hashlib.md5(os.path.normcase(os.path.abspath(posePath))).hexdigest())
+
+    @classmethod
+    def hasIndex(cls, posePath):
+        return os.path.exists(os.path.join(posePath, cls.INDEX_FILE)) or os.path.exists(cls._cachePath(posePath))
+
+    def load(self):
+        '''
+        read the index back from the sidecar file, or the user-local cache, a corrupt or
+        out of date index is simply discarded and rebuilt on the next update
+        '''
+        self.poses = {}
+        for indexPath in (self.indexPath, self._cachePath(self.posePath)):
+            if not os.path.exists(indexPath):
+                continue
+            try:
+                with open(indexPath, 'r') as f:
+                    data = json.load(f)
+                if data.get('version') == self.INDEX_VERSION:
+                    self.poses = data['poses']
+                break
+            except (IOError, ValueError), err:
+                log.debug('PoseLibraryIndex : failed to read index, rebuilding : %s' % err)
+        return self.poses
+
+    @staticmethod
+    def _writeAtomic(filepath, data):
+        '''
+        write to a temp file alongside the target then rename it over the target
+        '''
+        tmpPath = '%s.tmp%i' % (filepath, os.getpid())
+        try:
+            with open(tmpPath, 'w') as f:
+                f.write(data)
+            if os.name == 'nt' and os.path.exists(filepath):
+                os.remove(filepath)  # os.rename won't replace an existing file on Windows
+            os.rename(tmpPath, filepath)
+        finally:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+    def save(self):
+        '''
+        write the index, only if something changed, to the sidecar file if the pose folder
+        is writable, else to the user-local cache
+        '''
+        if not self._dirty:
+            return
+        data = json.dumps({'version': self.INDEX_VERSION, 'poses': self.poses})
+        if os.access(self.posePath, os.W_OK):
+            try:
+                self._writeAtomic(self.indexPath, data)
+                self._dirty = False
+                return
+            except (IOError, OSError), err:
+                log.debug('PoseLibraryIndex : unable to write index to the pose folder : %s' % err)
+        cachePath = self._cachePath(self.posePath)
+        try:
+            if not os.path.exists(os.path.dirname(cachePath)):
+                os.makedirs(os.path.dirname(cachePath))
+            self._writeAtomic(cachePath, data)
+            self._dirty = False
+        except (IOError, OSError), err:
+            log.debug('PoseLibraryIndex : unable to write index : %s' % err)
+
+    def _buildEntry(self, filepath, dataMap=None):
+        '''
+        build the index entry for the pose file, if a dataMap is given, ie from a pose
+        that's just been saved, we use it directly rather than re-reading the file
+        '''
+        stat = os.stat(filepath)
+        if dataMap:
+            info, poseDict = dataMap.infoDict, dataMap.poseDict
+        else:
+            data = readDataMapFile(filepath)[0]
+            info, poseDict = data.get('info', {}), data['poseData']
+        thumbnail = '%s.bmp' % os.path.splitext(filepath)[0]
+        return {'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'info': dict(info),
+                'nodes': sorted(poseDict.keys()),
+                'mirrorIDs': sorted(set(data['mirrorID'] for data in poseDict.values()
+                                        if isinstance(data, dict) and data.get('mirrorID'))),
+                'thumbnail': thumbnail if os.path.exists(thumbnail) else ''}
+
+    def update(self):
+        '''
+        sync the index with the folder, only poses that are new or have a changed
+        mtime or size are read. Poses that have been removed are dropped from the index
+        '''
+        if not os.path.exists(self.posePath):
+            return self.poses
+        current = set()
+        for f in os.listdir(self.posePath):
+            if not f.lower().endswith('.pose'):
+                continue
+            pose = f[:-5]
+            current.add(pose)
+            filepath = os.path.join(self.posePath, f)
+            try:
+                stat = os.stat(filepath)
+                entry = self.poses.get(pose)
+                if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                    continue
+                self.poses[pose] = self._buildEntry(filepath)
+                self._dirty = True
+            except StandardError, err:
+                log.warning('PoseLibraryIndex : failed to index pose : %s : %s' % (filepath, err))
+        for pose in set(self.poses.keys()) - current:
+            del self.poses[pose]
+            self._dirty = True
+        self.save()
+        return self.poses
+
+    def addPose(self, filepath, dataMap=None):
+        '''
+        add / refresh a single pose in the index, called by the PoseSaver on save
+        '''
+        pose = os.path.splitext(os.path.basename(filepath))[0]
+        self.poses[pose] = self._buildEntry(filepath, dataMap)
+        self._dirty = True
+        self.save()
+
+    def removePose(self, pose):
+        if self.poses.pop(pose, None):
+            self._dirty = True
+            self.save()
+
+    def renamePose(self, pose, newName):
+        entry = self.poses.pop(pose, None)
+        if entry:
+            newPath = os.path.join(self.posePath, '%s.pose' % newName)
+            if os.path.exists(newPath):
+                entry['mtime'] = os.stat(newPath).st_mtime
+            thumbnail = os.path.join(self.posePath, '%s.bmp' % newName)
+            entry['thumbnail'] = thumbnail if os.path.exists(thumbnail) else ''
+            self.poses[newName] = entry
+            self._dirty = True
+            self.save()
+
+    def sortedPoses(self, sortBy='name'):
+        '''
+        :param sortBy: 'name' or 'date', date being newest first
+        '''
+        if sortBy == 'date':
+            return sorted(self.poses.keys(), key=lambda x: self.poses[x]['mtime'], reverse=True)
+        return r9Core.sortNumerically(self.poses.keys())
+
+    def filter(self, searchFilter=None, nodes=None, mirrorIDs=None, metaRig=None, author=None, sortBy='name', poses=None):
+        '''
+        filter the indexed poses, all the given filters must match
+
+        :param searchFilter: comma separated string of partial, case-insensitive pose names
+        :param nodes: list of node keys, the pose must contain all of them
+        :param mirrorIDs: list of mirrorIDs, the pose must contain all of them
+        :param metaRig: the metaRigNodeID stored in the pose info block
+        :param author: the author stored in the pose info block
+        :param sortBy: 'name' or 'date'
+        :param poses: optional pre-sorted list of pose names to filter, default is all the indexed poses
+        '''
+        if poses is None:
+            poses = self.sortedPoses(sortBy)
+        poses = [pose for pose in poses if pose in self.poses]
+        if searchFilter:
+            poses = r9Core.filterListByString(poses, searchFilter, matchcase=False) or []
+        if nodes or mirrorIDs or metaRig or author:
+            filtered = []
+            for pose in poses:
+                entry = self.poses[pose]
+                if nodes and not set(nodes).issubset(entry['nodes']):
+                    continue
+                if mirrorIDs and not set(mirrorIDs).issubset(entry['mirrorIDs']):
+                    continue
+                if metaRig and not entry['info'].get('metaRigNodeID') == metaRig:
+                    continue
+                if author and not entry['info'].get('author') == author:
+                    continue
+                filtered.append(pose)
+            poses = filtered
+        return poses
+
+
 class DataMap(object):
     '''
     New base class for handling data storage and reloading with intelligence
@@ -178,7 +880,7 @@ class DataMap(object):
         self.filename = ''  # short name of the pose
         self._read_mute = False  # a back-door to prevent the _readPose() call happening, allowing us to modify cached data safely
 
-        self.dataformat = 'config'
+        self.dataformat = 'config'  # 'config', 'json' or 'binary'
         self._dataformat_resolved = None
 
         self.mayaUpAxis = r9Setup.mayaUpAxis()
@@ -189,10 +891,14 @@ class DataMap(object):
         self.__metaPose = False
         self.metaRig = None  # filled by the code as we process
         self.matchMethod = 'base'  # method used to match nodes internally in the poseDict
+        self.matchReport = {}  # unmatched report from the last _matchNodesToPoseData call
+        self._captureHandles = {}  # {node: (MObjectHandle, MDagPath)} cached during the data capture
+        self._captureChannels = {}  # {(nodeType, keyable, channelBox): channels} cached during the data capture
         self.useFilter = True
         self.prioritySnapOnly = False  # mainly used by any load relative calls, determines whether to use the internal filters priority list
         self.skipAttrs = []  # attrs to completely ignore in any pose handling
         self.loadAttrs_only = []  # reverse of skipAttrs, if given we ONLY load data from matching attrs
+        self.applyTolerance = 0.000001  # channels already within this tolerance of the stored value are skipped on load
 
         self.nodesToStore = []  # built by the buildDataMap func
         self.nodesToLoad = []  # build in the processPoseFile func
@@ -387,12 +1093,7 @@ class DataMap(object):
         import math
         euler = []
 
-        # import maya.OpenMaya as OpenMaya
-        dagpath = OpenMaya.MDagPath()
-        selList = OpenMaya.MSelectionList()
-        selList.add(node)
-        selList.getDagPath(0, dagpath)
-        _mFntrans = OpenMaya.MFnTransform(dagpath)
+        _mFntrans = OpenMaya.MFnTransform(self._getCaptureHandle(node)[1])
 
         if worldspace:
             _mSpace = OpenMaya.MSpace.kWorld
@@ -439,34 +1140,108 @@ class DataMap(object):
             log.debug(err)
         return shps
 
+    def _getCaptureHandle(self, node):
+        '''
+        resolve the MObject and MDagPath (None for non-dag nodes) for a node, cached for
+        the duration of the data capture so the attr and world space blocks share one
+        lookup through a single reused MSelectionList
+
+        :param node: node to resolve
+        :return: (MObject, MDagPath)
+        '''
+        try:
+            handle, dagpath = self._captureHandles[node]
+            if handle.isValid():
+                return handle.object(), dagpath
+        except KeyError:
+            pass
+        if not hasattr(self, '_captureSelList'):
+            self._captureSelList = OpenMaya.MSelectionList()
+        self._captureSelList.clear()
+        self._captureSelList.add(node)
+        mobj = OpenMaya.MObject()
+        self._captureSelList.getDependNode(0, mobj)
+        dagpath = None
+        if mobj.hasFn(OpenMaya.MFn.kDagNode):
+            dagpath = OpenMaya.MDagPath()
+            self._captureSelList.getDagPath(0, dagpath)
+        self._captureHandles[node] = (OpenMaya.MObjectHandle(mobj), dagpath)
+        return mobj, dagpath
+
+    def _getCaptureChannels(self, node, nodeType):
+        '''
+        settable channels for the node, the same list as r9Anim.getSettableChannels(node, incStatics=True,
+        skipcompound=True) but the compound filtering is resolved once per node signature,
+        (nodeType, keyable attrs, channelBox attrs), and re-used for all matching nodes
+
+        :param node: node to inspect
+        :param nodeType: the node's type
+        '''
+        if nodeType == 'blendShape':
+            return r9Anim.getSettableChannels(node, incStatics=True, skipcompound=True)
+        keyable = cmds.listAttr(node, keyable=True, unlocked=True) or []
+        channelBox = cmds.listAttr(node, channelBox=True) or []
+        signature = (nodeType, tuple(keyable), tuple(channelBox))
+        try:
+            return self._captureChannels[signature]
+        except KeyError:
+            channels = [attr for attr in keyable + channelBox if not r9Anim.is_compound_attr(node, attr)]
+            self._captureChannels[signature] = channels
+            return channels
+
+    def _getAttrValues(self, node, attrs):
+        '''
+        bulk read of the given attrs on the node in one API pass. Any attr the API reader
+        doesn't handle, ie blendShape weight multis, drops back to the cmds.getAttr route
+
+        :param node: node to read
+        :param attrs: attrs to read
+        :return: {attr: value}, attrs that are invalid on the node are skipped
+        '''
+        data = {}
+        depFn = OpenMaya.MFnDependencyNode(self._getCaptureHandle(node)[0])
+        for attr in attrs:
+            try:
+                data[attr] = _getPlugValue(depFn.findPlug(attr, False))
+                continue
+            except (RuntimeError, ValueError):
+                pass
+            try:
+                if cmds.getAttr('%s.%s' % (node, attr), type=True) == 'TdataCompound':  # blendShape weights support
+                    for alias in cmds.aliasAttr(node, q=True)[::2]:  # extract the target channels from the multi
+                        data[alias] = cmds.getAttr('%s.%s' % (node, alias))
+                else:
+                    data[attr] = cmds.getAttr('%s.%s' % (node, attr))
+            except:
+                log.debug('%s : attr is invalid in this instance' % attr)
+        return data
+
     def _collectNodeData_attrs(self, node, key):
         '''
 
         Capture and build attribute data from this node and fill the
         data to the datamap[key]
+
+        .. note::
+            the channel list is resolved once per node signature and the values are read in one
+            API pass per node, see _getCaptureChannels and _getAttrValues
         '''
-        channels = r9Anim.getSettableChannels(node, incStatics=True, skipcompound=True)  # no longer allow double3 or float3 compound attrs to slip through
+        mobj = self._getCaptureHandle(node)[0]
+        nodeType = OpenMaya.MFnDependencyNode(mobj).typeName()
+        channels = self._getCaptureChannels(node, nodeType)  # no longer allow double3 or float3 compound attrs to slip through
 
         if channels:
-            self.poseDict[key]['attrs'] = {}
-            self.poseDict[key]['attrs_kWorld'] = {}
-
+            attrs = []
             for attr in channels:
                 if attr in self.skipAttrs:
                     log.debug('Skipping attr as requested : %s' % attr)
                     continue
-                try:
-                    if cmds.getAttr('%s.%s' % (node, attr), type=True) == 'TdataCompound':  # blendShape weights support
-                        attrs = cmds.aliasAttr(node, q=True)[::2]  # extract the target channels from the multi
-                        for attr in attrs:
-                            self.poseDict[key]['attrs'][attr] = cmds.getAttr('%s.%s' % (node, attr))
-                    else:
-                        self.poseDict[key]['attrs'][attr] = cmds.getAttr('%s.%s' % (node, attr))
-                except:
-                    log.debug('%s : attr is invalid in this instance' % attr)
+                attrs.append(attr)
+            self.poseDict[key]['attrs'] = self._getAttrValues(node, attrs)
+            self.poseDict[key]['attrs_kWorld'] = {}
 
             # get the world space data for all transform nodes
-            if cmds.nodeType(node) in ['transform', 'joint']:
+            if nodeType in ['transform', 'joint']:
                 self.poseDict[key]['attrs_kWorld'] = self._getTranforms(node, worldspace=True)
 
     def _collectNodeData(self, node, key):
@@ -515,30 +1290,32 @@ class DataMap(object):
         Build the internal poseDict up from the given nodes. This is the
         core of the Pose System and the main dataMap used to store and retrieve data
         '''
-        getMirrorID = r9Anim.MirrorHierarchy().getMirrorCompiledID
+        self._captureHandles = {}
+        self._captureChannels = {}
+        mirrorIDs = r9Anim.MirrorHierarchy().getMirrorCompiledIDs(nodes)  # bulk, one API pass for all nodes
         if self.metaPose:
-            getMetaDict = self.metaRig.getNodeConnectionMetaDataMap  # optimisation
             mNodes = [self.metaRig.mNode]
             mNodes.extend([n.mNode for n in self.metaRig.getChildMetaNodes(walk=True)]) # this ensures we clamp the mNode data to the current mSystem
 #             mNodes.extend([n.mNode for n in self.metaRig.getMetaSubSystems()]) # this ensures we clamp the mNode data to the current mSystem
+            metaDataMap = self.metaRig.getNodeConnectionMetaDataMaps(nodes, mNodes=mNodes)  # batched, one connection query for all nodes
 
         for i, node in enumerate(nodes):
             key = r9Core.nodeNameStrip(node)
             self.poseDict[key] = {}
             self.poseDict[key]['ID'] = i  # selection order index
             self.poseDict[key]['longName'] = node  # longNode name
-            mirrorID = getMirrorID(node)
+            mirrorID = mirrorIDs[node]
 
             if mirrorID:
                 self.poseDict[key]['mirrorID'] = mirrorID  # add the mirrorIndex
 
             if self.metaPose:
-                _metadata = getMetaDict(node, mNodes=mNodes)   # metaSystem the node is wired too
+                _metadata = metaDataMap.get(node)   # metaSystem the node is wired too
                 if _metadata:
                     self.poseDict[key]['metaData'] = _metadata
 
-            if 'transform' in cmds.nodeType(node, inherited=True):   # Oct 22 for sanity on load
-                self.poseDict[key]['rotateOrder'] = cmds.getAttr('%s.rotateOrder' % node)
+            if self._getCaptureHandle(node)[0].hasFn(OpenMaya.MFn.kTransform):   # Oct 22 for sanity on load
+                self.poseDict[key]['rotateOrder'] = self._getAttrValues(node, ['rotateOrder'])['rotateOrder']
 
             if node in self.required_shape_dependancies:
                 self.poseDict[key]['dependency_key'] = r9Core.nodeNameStrip(self.required_shape_dependancies[node])
@@ -641,26 +1418,38 @@ class DataMap(object):
         tuples of (poseDict[key], node in scene)
 
         fix: 07/11/18: added the clamp=True to the set calls so we set values to max/min if the input value is out of range
+
+        .. note::
+            the current values are read in bulk and any channel already within self.applyTolerance
+            of the stored value is skipped. The rest are set in one go via setPlugValues, a single
+            undoable MDGModifier, only non-numeric data goes through cmds.setAttr
         '''
         _attrs_linear = ['translateX', 'translateY', 'translateZ']
 
-        # setup unit conversions for linear attrs
+        # setup unit conversions for linear attrs, resolved once for the file
         _unitsfile = None
-        _conversion_needed = False
+        _linearScale = None
         _sceneunits = cmds.currentUnit(q=True, fullName=True, linear=True)
         try:
             _unitsfile = self.infoDict['sceneUnits']
-            if not _unitsfile == _sceneunits:
-                _conversion_needed = True
+            if not _unitsfile == _sceneunits and self.unitconversion:
+                # only unit convert linear attrs if the file supports it and it's needed!
+                _linearScale = r9Core.convertUnits_uiToInternal(r9Core.convertUnits_internalToUI(1.0, _unitsfile), _sceneunits)
+                log.debug('UnitConverting linear attrs : %s > %s : scale %s' % (_unitsfile, _sceneunits, _linearScale))
         except:
             log.debug("This PoseFile doesn't not support scene unit conversion")
 
+        _numeric = (bool, int, long, float)
+        self._captureHandles = {}
+        plugs = []
+        values = []
         for key, dest in self.matchedPairs:
             log.debug('Applying Key Block : %s' % key)
-            
+
             try:
                 if 'attrs' not in self.poseDict[key]:
-                    continue 
+                    continue
+                attrs = {}
                 for attr, val in self.poseDict[key]['attrs'].items():
                     if attr in self.skipAttrs:
                         log.debug('Skipping attr as requested : %s' % attr)
@@ -668,25 +1457,39 @@ class DataMap(object):
                     if self.loadAttrs_only and attr not in self.loadAttrs_only:
                         log.debug('Skipping attr as not in self.loadAttrs_only list: %s' % attr)
                         continue
-                    try:
-                        val = r9Core.decodeString(val)  # eval causes issues under 2022 Python security management
-#                         val = eval(val)
-                    except:
-                        pass
-                    try:
-                        # only unit convert linear attrs if the file supports it and it's needed!
-                        if _conversion_needed and self.unitconversion and attr in _attrs_linear:
-                            _converted = r9Core.convertUnits_uiToInternal(r9Core.convertUnits_internalToUI(val, _unitsfile), _sceneunits)
-                            log.debug('node : %s : attr : %s : UnitConverted : val %s == %s' % (dest, attr, val, _converted))
-                            cmds.setAttr('%s.%s' % (dest, attr), _converted, c=True)
-                        else:
+                    val = r9Core.decodeString(val)
+                    if _linearScale is not None and attr in _attrs_linear and isinstance(val, _numeric):
+                        val = val * _linearScale
+                    attrs[attr] = val
+
+                current = self._getAttrValues(dest, attrs.keys())  # bulk read of the current values
+                for attr, val in attrs.items():
+                    if isinstance(val, _numeric) and isinstance(current.get(attr), _numeric):
+                        if abs(val - current[attr]) <= self.applyTolerance:
+                            continue
+                        log.debug('node : %s : attr : %s : val %s' % (dest, attr, val))
+                        plugs.append('%s.%s' % (dest, attr))
+                        values.append(float(val))
+                    else:
+                        try:
                             log.debug('node : %s : attr : %s : val %s' % (dest, attr, val))
                             cmds.setAttr('%s.%s' % (dest, attr), val, c=True)
-                    except StandardError, err:
-                        log.debug(err)
+                        except StandardError, err:
+                            log.debug(err)
             except:
                 log.debug('Pose Object Key : %s : has no Attr block data' % key)
 
+        failed = setPlugValues(plugs, values, clamp=True)
+        if failed:
+            # retry via setAttr, as before, so anything the plug-in can't deal with still loads
+            plugValues = dict(zip(plugs, values))
+            for plug in failed:
+                try:
+                    cmds.setAttr(plug, plugValues[plug], c=True)
+                except StandardError, err:
+                    log.debug('Failed to set plug : %s : %s' % (plug, err))
+        log.debug('Applied %i changed channels' % len(plugs))
+
     @r9General.Timer
     def _applyData_kWorld_attrs(self, worldspace=True, *args, **kws):
         '''
@@ -727,26 +1530,18 @@ class DataMap(object):
                     tran_data = []
                     rot_data = self.poseDict[key]['attrs_kWorld']['quaternion']
                     # for the conversion if the data came from ConfigObj
-                    try:
-                        rot_data = [eval(rot_data[0]), eval(rot_data[1]), eval(rot_data[2]), eval(rot_data[3])]
-                    except:
-                        pass
+                    rot_data = [r9Core.decodeString(val) for val in rot_data]
 
                     for attr in self.poseDict[key]['attrs_kWorld']['translation']:
+                        attr = r9Core.decodeString(attr)
                         if _conversion_needed and self.unitconversion:
                             # only unit convert linear attrs if the file supports it and it's needed!
                             _converted = r9Core.convertUnits_uiToInternal(r9Core.convertUnits_internalToUI(attr, _unitsfile), _sceneunits)
                             log.debug('node : %s : UnitConverted : val %s == %s' % (dest, attr, _converted))
-                            try:
-                                tran_data.append(eval(attr))
-                            except:
-                                tran_data.append(attr)
+                            tran_data.append(attr)
                         else:
                             log.debug('node : %s : val %s' % (dest, attr))
-                            try:
-                                tran_data.append(eval(attr))
-                            except:
-                                tran_data.append(attr)
+                            tran_data.append(attr)
 
                     trans = OpenMaya.MVector(tran_data[0], tran_data[1], tran_data[2])
                     rots = OpenMaya.MQuaternion(rot_data[0], rot_data[1], rot_data[2], rot_data[3])
@@ -779,37 +1574,15 @@ class DataMap(object):
         if not force:
             if os.path.exists(filepath) and not os.access(filepath, os.W_OK):
                 raise IOError('File is Read-Only - write aborted : %s' % filepath)
-        # =========================
-        # write to ConfigObject
-        # =========================
-        if self.dataformat == 'config':
-            ConfigObj = configobj.ConfigObj(indent_type='\t', encoding='utf-8')
-            ConfigObj['info'] = self.infoDict
-            ConfigObj['filterNode_settings'] = self.settings.__dict__
-            ConfigObj['poseData'] = self.poseDict
-            if self.skeletonDict:
-                ConfigObj['skeletonDict'] = self.skeletonDict
-            if self.hikDict:
-                ConfigObj['hikDict'] = self.hikDict
-            ConfigObj.filename = filepath
-            ConfigObj.write()
-            self._dataformat_resolved = 'config'
-        # =========================
-        # write to JSON format
-        # =========================
-        elif self.dataformat == 'json':
-            data = {}
-            data['info'] = self.infoDict
-            data['filterNode_settings'] = self.settings.__dict__
-            data['poseData'] = self.poseDict
-            if self.skeletonDict:
-                data['skeletonDict'] = self.skeletonDict
-            if self.hikDict:
-                data['hikDict'] = self.hikDict
-            with open(filepath, 'w') as f:
-                f.write(json.dumps(data, sort_keys=True, indent=None)) # indent=4))  # , separators=(',', ':')))
-                f.close()
-            self._dataformat_resolved = 'json'
+        blocks = [('info', self.infoDict),
+                  ('filterNode_settings', self.settings.__dict__),
+                  ('poseData', self.poseDict)]
+        if self.skeletonDict:
+            blocks.append(('skeletonDict', self.skeletonDict))
+        if self.hikDict:
+            blocks.append(('hikDict', self.hikDict))
+        writeDataMapFile(filepath, blocks, self.dataformat)
+        self._dataformat_resolved = self.dataformat
 
     @r9General.Timer
     def _readPose(self, filename=None, force=False):
@@ -825,40 +1598,20 @@ class DataMap(object):
             filename = self.filepath
         if filename:
             if os.path.exists(filename):
-                # =========================
-                # read JSON format
-                # =========================
-                if self.dataformat == 'json':
-                    try:
-                        with open(filename, 'r') as f:
-                            data = json.load(f)
-                        self.poseDict = data['poseData']
-                        if 'info' in data.keys():
-                            self.infoDict = data['info']
-                        if 'skeletonDict' in data.keys():
-                            self.skeletonDict = data['skeletonDict']
-                        self._dataformat_resolved = 'json'
-                    except IOError, err:
-                        self._dataformat_resolved = 'config'
-                        log.info('JSON : DataMap format failed to load, reverting to legacy ConfigObj')
-                # =========================
-                # read ConfigObject
-                # =========================
-                if self._dataformat_resolved == 'config' or self.dataformat == 'config':
-                    # for key, val in configobj.ConfigObj(filename)['filterNode_settings'].items():
-                    #    self.settings.__dict__[key]=decodeString(val)
-                    data = configobj.ConfigObj(filename, encoding='utf-8')
-                    self.poseDict = data['poseData']
-                    if 'info' in data:
-                        self.infoDict = data['info']
-                    if 'skeletonDict' in data:
-                        self.skeletonDict = data['skeletonDict']
-                    if 'hikDict' in data:
-                        self.hikDict = data['hikDict']
-                    if 'filterNode_settings' in data:
-                        self.settings_internal = r9Core.FilterNode_Settings()
-                        self.settings_internal.setByDict(data['filterNode_settings'])
-                    self._dataformat_resolved = 'config'
+                if DATAMAP_READ_CACHE.enabled:
+                    data, self._dataformat_resolved = DATAMAP_READ_CACHE.read(filename, self.dataformat)
+                else:
+                    data, self._dataformat_resolved = readDataMapFile(filename, self.dataformat)
+                self.poseDict = data['poseData']
+                if 'info' in data:
+                    self.infoDict = data['info']
+                if 'skeletonDict' in data:
+                    self.skeletonDict = data['skeletonDict']
+                if 'hikDict' in data:
+                    self.hikDict = data['hikDict']
+                if 'filterNode_settings' in data:
+                    self.settings_internal = r9Core.FilterNode_Settings()
+                    self.settings_internal.setByDict(data['filterNode_settings'])
             else:
                 raise StandardError('Given filepath doesnt not exist : %s' % filename)
         else:
@@ -901,10 +1654,7 @@ class DataMap(object):
             self.setMetaRig(nodes[0])
             if self.infoDict:
                 if 'metaPose' in self.infoDict and self.metaRig:
-                    try:
-                        if eval(self.infoDict['metaPose']):
-                            self.matchMethod = 'metaData'
-                    except:
+                    if r9Core.decodeString(self.infoDict['metaPose']):
                         self.matchMethod = 'metaData'
                 else:
                     log.debug('Warning, trying to load a NON metaPose to a MRig - switching to NameMatching')
@@ -966,6 +1716,36 @@ class DataMap(object):
         log.debug('dependents_matched : %s' % dependents_matched)
         return dependents_matched, new_nodes_to_load
 
+    def _indexPoseData(self, matchMethod):
+        '''
+        build the lookup from the poseDict for the given matchMethod, such that each
+        node match is a single dict lookup rather than a walk of the entire poseDict.
+        Where multiple keys share the same value the first found wins, as before.
+
+        * 'index'          : {ID: key}
+        * 'mirrorIndex'    : {mirrorID: key}
+        * 'mirrorIndex_ID' : {mirrorIndex: key}
+        * 'metaData'       : {frozen metaData: [keys]} - a list as metaData matches are consumed once matched
+        '''
+        lookup = {}
+        for key, data in self.poseDict.items():
+            if matchMethod == 'index':
+                lookup.setdefault(int(data['ID']), key)
+            elif matchMethod == 'mirrorIndex':
+                if data.get('mirrorID'):
+                    lookup.setdefault(data['mirrorID'], key)
+            elif matchMethod == 'mirrorIndex_ID':
+                if data.get('mirrorID'):
+                    poseID = data['mirrorID'].split('_')[-1]
+                    if not poseID == 'None':
+                        lookup.setdefault(int(poseID), key)
+                    else:
+                        log.debug('poseKey SKIPPED : %s:%s : as incorrect MirrorIDs' % (key, data['mirrorID']))
+            elif matchMethod == 'metaData':
+                if data.get('metaData'):
+                    lookup.setdefault(_freezeMetaData(data['metaData']), []).append(key)
+        return lookup
+
     @r9General.Timer
     def _matchNodesToPoseData(self, nodes, matchMethod=None, returnfails=False):
         '''
@@ -975,9 +1755,16 @@ class DataMap(object):
         :param nodes: nodes to try and match from the poseDict
         :param matchMethod: if given this over-rides self.matchMethod so you can do additional checks without mutating the class var
         :param returnfails: if True we return [matchedData, unmatched] so that we can pass the unmatched list for further processing
+
+        .. note::
+            the pose data is indexed once per call and the scene side data gathered in bulk, so
+            each matchMethod is a straight join. The full result is pushed to self.matchReport, 
+            {'matchMethod', 'matched', 'unmatchedNodes', 'unmatchedKeys', 'skippedNodes'}, skippedNodes
+            being nodes that had no data to match against, ie no mirrorIndex
         '''
         matchedPairs = []
         unmatched = []
+        skipped = []
         log.debug('using matchMethod : %s' % self.matchMethod)
 
         if not matchMethod:
@@ -990,80 +1777,75 @@ class DataMap(object):
 
         # pose data specific logic
         if matchMethod == 'index':
+            lookup = self._indexPoseData(matchMethod)
             for i, node in enumerate(nodes):
-                matched = False
-                for key in self.poseDict.keys():
-                    if int(self.poseDict[key]['ID']) == i:
-                        matchedPairs.append((key, node))
-                        log.debug('poseKey : %s %s >> matchedSource : %s %i' % (key, self.poseDict[key]['ID'], node, i))
-                        matched = True
-                        break
-                if not matched:
+                key = lookup.get(i)
+                if key is not None:
+                    matchedPairs.append((key, node))
+                    log.debug('poseKey : %s %s >> matchedSource : %s %i' % (key, self.poseDict[key]['ID'], node, i))
+                else:
                     unmatched.append(node)
 
         if matchMethod == 'mirrorIndex':
-            getMirrorID = r9Anim.MirrorHierarchy().getMirrorCompiledID
+            lookup = self._indexPoseData(matchMethod)
+            mirrorIDs = r9Anim.MirrorHierarchy().getMirrorCompiledIDs(nodes)
             for node in nodes:
-                matched = False
-                mirrorID = getMirrorID(node)
+                mirrorID = mirrorIDs[node]
                 if not mirrorID:
+                    skipped.append(node)
                     continue
-                for key in self.poseDict.keys():
-                    if 'mirrorID' in self.poseDict[key] and self.poseDict[key]['mirrorID']:
-                        poseID = self.poseDict[key]['mirrorID']
-                        if poseID == mirrorID:
-                            matchedPairs.append((key, node))
-                            log.debug('poseKey : %s %s >> matched MirrorIndex : %s' % (key, node, self.poseDict[key]['mirrorID']))
-                            matched = True
-                            break
-                if not matched:
+                key = lookup.get(mirrorID)
+                if key is not None:
+                    matchedPairs.append((key, node))
+                    log.debug('poseKey : %s %s >> matched MirrorIndex : %s' % (key, node, mirrorID))
+                else:
                     unmatched.append(node)
 
         # unlike 'mirrorIndex' this matches JUST the ID's, the above matches SIDE_ID
         if matchMethod == 'mirrorIndex_ID':
-            getMirrorID = r9Anim.MirrorHierarchy().getMirrorIndex
+            lookup = self._indexPoseData(matchMethod)
+            mirrorData = r9Anim.MirrorHierarchy().getMirrorDataMap(nodes)
             for node in nodes:
-                matched = False
-                mirrorID = getMirrorID(node)
+                mirrorID = mirrorData[node][1]
                 if not mirrorID:
+                    skipped.append(node)
                     continue
-                for key in self.poseDict.keys():
-                    if 'mirrorID' in self.poseDict[key] and self.poseDict[key]['mirrorID']:
-                        poseID = self.poseDict[key]['mirrorID'].split('_')[-1]
-                        if not poseID == 'None':
-                            if int(poseID) == mirrorID:
-                                matchedPairs.append((key, node))
-                                log.debug('poseKey : %s %s >> matched MirrorIndex : %s' % (key, node, self.poseDict[key]['mirrorID']))
-                                matched = True
-                                break
-                        else:
-                            log.debug('poseKey SKIPPED : %s:%s : as incorrect MirrorIDs' % (key, self.poseDict[key]['mirrorID']))
-                if not matched:
-                        unmatched.append(node)
+                key = lookup.get(mirrorID)
+                if key is not None:
+                    matchedPairs.append((key, node))
+                    log.debug('poseKey : %s %s >> matched MirrorIndex : %s' % (key, node, self.poseDict[key]['mirrorID']))
+                else:
+                    unmatched.append(node)
 
         if matchMethod == 'metaData':
             if not self.metaRig:
                 self.setMetaRig(nodes[0])
-            getMetaDict = self.metaRig.getNodeConnectionMetaDataMap  # optimisation
-
-            poseKeys = dict(self.poseDict)  # optimisation
-            for node in nodes:
-                matched = False
-                try:
-                    metaDict = getMetaDict(node)
-                    # if metaDict:
-                    for key in poseKeys:
-                        if poseKeys[key]['metaData'] == metaDict:
-                            matchedPairs.append((key, node))
-                            log.debug('poseKey : %s %s >> matched MetaData : %s' % (key, node, poseKeys[key]['metaData']))
-                            poseKeys.pop(key)
-                            matched = True
-                            break
-                except:
-                    log.info('FAILURE to load MetaData pose blocks - Reverting to Name')
-                    matchedPairs = r9Core.matchNodeLists([key for key in self.poseDict.keys()], nodes)
-                if not matched:
+            lookup = self._indexPoseData(matchMethod)
+            if not lookup:
+                log.info('FAILURE to load MetaData pose blocks - Reverting to Name')
+                matchedPairs = r9Core.matchNodeLists([key for key in self.poseDict.keys()], nodes)
+            else:
+                metaDataMap = self.metaRig.getNodeConnectionMetaDataMaps(nodes)  # batched, one connection query for all nodes
+                for node in nodes:
+                    metaDict = metaDataMap.get(node)
+                    keys = lookup.get(_freezeMetaData(metaDict)) if metaDict else None
+                    if keys:
+                        key = keys.pop(0)  # each pose key is only matched the once
+                        matchedPairs.append((key, node))
+                        log.debug('poseKey : %s %s >> matched MetaData : %s' % (key, node, self.poseDict[key]['metaData']))
+                    else:
                         unmatched.append(node)
+
+        matchedNodes = set(node for _, node in matchedPairs)
+        matchedKeys = set(key for key, _ in matchedPairs)
+        self.matchReport = {'matchMethod': matchMethod,
+                            'matched': len(matchedPairs),
+                            'unmatchedNodes': [node for node in nodes if node not in matchedNodes and node not in skipped],
+                            'unmatchedKeys': sorted(key for key in self.poseDict.keys() if key not in matchedKeys),
+                            'skippedNodes': skipped}
+        if self.matchReport['unmatchedNodes'] or self.matchReport['unmatchedKeys']:
+            log.debug('matchMethod "%s" : unmatched nodes : %i, unmatched poseKeys : %i' %
+                      (matchMethod, len(self.matchReport['unmatchedNodes']), len(self.matchReport['unmatchedKeys'])))
         if returnfails:
             return matchedPairs, unmatched
         else:
@@ -1132,6 +1914,9 @@ class DataMap(object):
                 r9General.thumbNailScreen(filepath, self.thumbnailRes[0], self.thumbnailRes[1])
                 if sel:
                     cmds.select(sel)
+            # keep the pose library index in sync if this folder is indexed
+            if PoseLibraryIndex.hasIndex(os.path.dirname(self.filepath)):
+                PoseLibraryIndex(os.path.dirname(self.filepath)).addPose(self.filepath, dataMap=self)
         log.info('Data Saved Successfully to : %s' % self.filepath)
 
     # @r9General.Timer
@@ -1294,11 +2079,11 @@ class PoseData(DataMap):
                 self.skeletonDict[key]['longName'] = jnt.replace(parentNode[0], '')
             else:
                 self.skeletonDict[key]['longName'] = jnt
-            for attr in ['translateX', 'translateY', 'translateZ', 'rotateX', 'rotateY', 'rotateZ', 'scaleX', 'scaleY', 'scaleZ', 'jointOrientX', 'jointOrientY', 'jointOrientZ', 'segmentScaleCompensate']:
-                try:
-                    self.skeletonDict[key]['attrs'][attr] = cmds.getAttr('%s.%s' % (jnt, attr))
-                except:
-                    log.debug('%s : attr is invalid in this instance' % attr)
+            self.skeletonDict[key]['attrs'] = self._getAttrValues(jnt, ['translateX', 'translateY', 'translateZ',
+                                                                         'rotateX', 'rotateY', 'rotateZ',
+                                                                         'scaleX', 'scaleY', 'scaleZ',
+                                                                         'jointOrientX', 'jointOrientY', 'jointOrientZ',
+                                                                         'segmentScaleCompensate'])
             self.skeletonDict[key]['attrs_kWorld'] = self._getTranforms(jnt, worldspace=True)
 
     def _buildBlock_hikData(self, rootJnt):
@@ -1384,7 +2169,7 @@ class PoseData(DataMap):
                         log.debug('Skipping attr as requested : %s' % attr)
                         continue
                     try:
-                        val = eval(val)
+                        val = r9Core.decodeString(val)
                         # =====================================================================
                         # inverse the correct mirror attrs if the mirrorInverse flag was thrown
                         # =====================================================================
@@ -1613,7 +2398,15 @@ class PoseBlender(object):
     '''
     simple wrap over the PoseLoad code to control the loading of the r9Pose through a poseBlender UI
     or a simple percent args passed into the applyPercent call. This is called by the AnimUI and is really
-    only meant as an internal binding
+    only meant as an internal binding.
+
+    All the given poses are preloaded once into aligned channel arrays, keyed by the matched
+    (dest, attr) plugs, so any number of poses can be blended together against the cached base
+    state in a single weighted sum. Only the channels whose value actually changed are pushed
+    back to Maya on each slider tick.
+
+    >>> blender = r9Pose.PoseBlender(['smile.pose', 'blink.pose', 'jawOpen.pose'], nodes=['facial_root'])
+    >>> blender.setWeights({'smile.pose': 50, 'jawOpen.pose': 25})
     '''
     def __init__(self, filepaths, nodes=None, filterSettings=None, useFilter=True, matchMethod='stripPrefix'):
 
@@ -1629,29 +2422,178 @@ class PoseBlender(object):
         self.poseNode.matchMethod = matchMethod
         self.poseNode.filepath = filepaths[0]  # first path as default
 
+        # blend engine data, filled by preload()
+        self.weights = dict((filepath, 0.0) for filepath in filepaths)
+        self.channels = []  # aligned list of 'dest.attr' plugs
+        self._blendBase = []  # cached scene values for each channel
+        self._blendDeltas = {}  # {filepath: [pose - base per channel]}
+        self._blendCurrent = []  # last values pushed to Maya
+        self._blendMembers = []
+        self._poseValues = {}
+        self._preloaded = False
+
+    def preload(self):
+        '''
+        read and match all the pose files up front, building the union of the matched
+        (dest, attr) channels and the per pose values aligned to that channel list.
+        Attrs that aren't numeric, or are in the skipAttrs list, are ignored.
+        '''
+        channelIndex = {}
+        poseValues = {}
+        self.channels = []
+        self._blendMembers = []
+        for filepath in self.filepaths:
+            self.poseNode.filepath = filepath
+            self.poseNode.processPoseFile(self.nodes)
+            values = {}
+            for key, dest in self.poseNode.matchedPairs:
+                if dest not in self._blendMembers:
+                    self._blendMembers.append(dest)
+                if 'attrs' not in self.poseNode.poseDict[key]:
+                    continue
+                for attr, val in self.poseNode.poseDict[key]['attrs'].items():
+                    if attr in self.poseNode.skipAttrs:
+                        continue
+                    try:
+                        val = r9Core.decodeString(val)
+                    except:
+                        pass
+                    if isinstance(val, bool):
+                        val = float(val)
+                    if not isinstance(val, (int, long, float)):
+                        log.debug('PoseBlender : skipping non-numeric attr : %s.%s' % (dest, attr))
+                        continue
+                    plug = '%s.%s' % (dest, attr)
+                    if plug not in channelIndex:
+                        channelIndex[plug] = len(self.channels)
+                        self.channels.append(plug)
+                    values[channelIndex[plug]] = float(val)
+            poseValues[filepath] = values
+        self._poseValues = poseValues
+        self._preloaded = True
+        self.cacheBase()
+        log.info('PoseBlender : preloaded %i poses over %i channels' % (len(self.filepaths), len(self.channels)))
+
+    def cacheBase(self):
+        '''
+        cache the current scene state of all the blend channels, this is the base that
+        all the weighted pose deltas get added to. Channels that can't be read
+        (attr mismatch on the destination) are dropped from the blend.
+        '''
+        base = []
+        valid = []
+        for index, value in enumerate(getPlugValues(self.channels)):
+            try:
+                base.append(float(value))
+                valid.append(index)
+            except (TypeError, ValueError):
+                log.debug('Attr mismatch on destination : %s' % self.channels[index])
+        if len(valid) != len(self.channels):
+            self.channels = [self.channels[i] for i in valid]
+            remap = dict((old, new) for new, old in enumerate(valid))
+            self._poseValues = dict((filepath, dict((remap[i], v) for i, v in values.items() if i in remap))
+                                    for filepath, values in self._poseValues.items())
+        self._blendBase = base
+        self._blendCurrent = list(base)
+        self._blendDeltas = {}
+        for filepath, values in self._poseValues.items():
+            deltas = [0.0] * len(base)
+            for index, val in values.items():
+                deltas[index] = val - base[index]
+            self._blendDeltas[filepath] = numpy.array(deltas, dtype=numpy.float64) if numpy is not None else deltas
+        if numpy is not None:
+            self._blendBase = numpy.array(base, dtype=numpy.float64)
+
+    def syncCurrent(self):
+        '''
+        re-read the scene values of all the blend channels, in bulk, as the reference the
+        next push is diffed against. Run at the start of each slider undo chunk and each
+        applyPercent so that undos or manual edits between blends are pushed over
+        '''
+        for index, value in enumerate(getPlugValues(self.channels)):
+            try:
+                self._blendCurrent[index] = float(value)
+            except (TypeError, ValueError):
+                self._blendCurrent[index] = None
+
+    def blendValues(self, weights=None):
+        '''
+        the weighted sum of all the poses against the cached base : base + sum(weight * (pose - base))
+
+        :param weights: {filepath: percent} where percent is 0-100, defaults to self.weights
+        :return: list of the blended values, aligned to self.channels
+        '''
+        if weights is None:
+            weights = self.weights
+        active = [(filepath, float(weight) / 100.0) for filepath, weight in weights.items() if weight]
+        if numpy is not None:
+            result = numpy.array(self._blendBase, dtype=numpy.float64)
+            if active:
+                deltas = numpy.vstack([self._blendDeltas[filepath] for filepath, _ in active])
+                result += numpy.dot(numpy.array([w for _, w in active], dtype=numpy.float64), deltas)
+            return result.tolist()
+        result = list(self._blendBase)
+        for filepath, weight in active:
+            deltas = self._blendDeltas[filepath]
+            for i in range(len(result)):
+                if deltas[i]:
+                    result[i] += deltas[i] * weight
+        return result
+
+    def setWeights(self, weights):
+        '''
+        update the blend weights for any of the given poses and push the result to Maya.
+
+        :param weights: {filepath: percent} where percent is 0-100, poses not given keep their current weight
+        :return: number of channels that were actually set
+        '''
+        if not self._preloaded:
+            self.preload()
+        for filepath, weight in weights.items():
+            if filepath not in self.weights:
+                raise StandardError('PoseBlender : pose not loaded in this blender : %s' % filepath)
+            self.weights[filepath] = weight
+        return self._pushValues(self.blendValues())
+
+    def _pushValues(self, values):
+        '''
+        only set the channels that changed since the last push, or syncCurrent
+        '''
+        changed = 0
+        current = self._blendCurrent
+        for index, val in enumerate(values):
+            if current[index] is not None and abs(val - current[index]) < 0.000001:
+                continue
+            try:
+                cmds.setAttr(self.channels[index], val)
+                current[index] = val
+                changed += 1
+            except StandardError, err:
+                log.debug(err)
+        log.debug('PoseBlender : pushed %i of %i channels' % (changed, len(values)))
+        return changed
+
     def _blendPose(self, filepath, slider, *args):
         '''
-        this has been expanded to possibly support multiple floatSliders blending
-        multiple poses at once, managing the cache accordingly
+        slider drag call, each slider drives the weight of its own pose so any
+        number of sliders can be blended in together against the cached base
         '''
         if not self._poseBlendUndoChunkOpen or not slider == self._poseSliderActive:
             log.debug('Opening Undo Chunk for PoseBlender')
             cmds.undoInfo(openChunk=True)
             self._poseBlendUndoChunkOpen = True
+            self._poseSliderActive = slider
 
-            if not slider == self._poseSliderActive:
-                self.poseNode.filepath = filepath
-                self.poseNode.processPoseFile(self.nodes)
-                self.poseNode._cacheCurrentNodeStates()
-                self._poseSliderActive = slider
-
-                # zero all other sliders for the cache to be consistent
-                for _slider in self._poseSliders:
-                    if not _slider == slider:
-                        cmds.floatSliderGrp(_slider, e=True, value=0)
+            if not self._preloaded:
+                self.preload()
+            elif not any(self.weights.values()):
+                # nothing blended in so re-sync the base in case the rig has been moved
+                self.cacheBase()
+            else:
+                self.syncCurrent()
 
         # actual slider drag call
-        self.poseNode._applyData(percent=cmds.floatSliderGrp(slider, q=True, v=True))
+        self.setWeights({filepath: cmds.floatSliderGrp(slider, q=True, v=True)})
 
     def _closeChunk(self, *args):
         cmds.undoInfo(closeChunk=True)
@@ -1662,17 +2604,27 @@ class PoseBlender(object):
         '''
         key the members of the pose data
         '''
-        cmds.setKeyframe([node for _, node in self.poseNode.matchedPairs])
+        if not self._preloaded:
+            self.preload()
+        cmds.setKeyframe(self._blendMembers)
 
     def selectMembers(self, *args):
-        cmds.select([node for _, node in self.poseNode.matchedPairs])
+        if not self._preloaded:
+            self.preload()
+        cmds.select(self._blendMembers)
 
-    def applyPercent(self, percent):
+    def applyPercent(self, percent, filepath=None):
         '''
         direct call to load a percentage of the given pose in this instance
+
+        :param percent: 0-100 percent of the pose to blend in over the cached base
+        :param filepath: pose to blend, defaults to the first filepath given
         '''
-        self.poseNode.processPoseFile(self.nodes)
-        self.poseNode._applyData(percent=percent)
+        if not filepath:
+            filepath = self.filepaths[0]
+        if self._preloaded:
+            self.syncCurrent()
+        self.setWeights({filepath: percent})
 
     def show(self):
         '''
@@ -1703,7 +2655,7 @@ class PoseBlender(object):
                                 field=True,
                                 minValue=0.0,
                                 maxValue=100.0,
-                                value=0,
+                                value=self.weights.get(filepath, 0),
                                 columnWidth3=[200, 60, 200],
                                 dc=partial(self._blendPose, filepath, name),
                                 cc=partial(self._closeChunk))
@@ -2167,7 +3119,8 @@ class PoseCompare(object):
     >>> compare.fails['failedAttrs']
     '''
     def __init__(self, currentPose, referencePose, angularTolerance=0.1, linearTolerance=0.001,
-                 compareDict='poseDict', filterMap=[], ignoreBlocks=[], ignoreStrings=[], ignoreAttrs=[], longName=False, **kws):
+                 compareDict='poseDict', filterMap=[], ignoreBlocks=[], ignoreStrings=[], ignoreAttrs=[], longName=False,
+                 verbose=True, **kws):
         '''
         Make sure we have 2 PoseData objects to compare
         :param currentPose: either a PoseData object or a valid pose file
@@ -2182,6 +3135,7 @@ class PoseCompare(object):
              that string it will be skipped, note this is a partial match so you can pass in wildcard searches ['_','_end']
         :param ignoreAttrs: allows you to skip given attrs from the poseCompare calls
         :param longName: compare the longName DAG path stores against each node, note that the compare strips out any namespaces before compare
+        :param verbose: print the failures on compare, default True
 
         .. note::
             In the new setup if the pose being generated had it's settings.nodeTypes=['joint'] or we found the
@@ -2211,6 +3165,7 @@ class PoseCompare(object):
         self.ignoreStrings = ignoreStrings
         self.ignoreAttrs = ignoreAttrs
         self.longName = longName
+        self.verbose = verbose
 
         if isinstance(currentPose, PoseData):
             self.currentPose = currentPose
@@ -2232,7 +3187,7 @@ class PoseCompare(object):
         elif not os.path.exists(referencePose):
             raise IOError('Given ReferencePose Path is invalid!')
 
-    def __addFailedAttr(self, key, attr):
+    def __addFailedAttr(self, key, attr, block='attrMismatch'):
         '''
         add failed attrs data to the dict
         '''
@@ -2240,9 +3195,32 @@ class PoseCompare(object):
             self.fails['failedAttrs'] = {}
         if key not in self.fails['failedAttrs']:
             self.fails['failedAttrs'][key] = {}
-        if 'attrMismatch' not in self.fails['failedAttrs'][key]:
-            self.fails['failedAttrs'][key]['attrMismatch'] = []
-        self.fails['failedAttrs'][key]['attrMismatch'].append(attr)
+        if block not in self.fails['failedAttrs'][key]:
+            self.fails['failedAttrs'][key][block] = []
+        self.fails['failedAttrs'][key][block].append(attr)
+
+    def _floatsMatch(self, values, refValues, tolerances, gimbals):
+        '''
+        the float compare for all the flattened (node, attr) values in one pass. This is
+        r9Core.floatIsEqual applied as array ops, angular attrs are allowed to differ by
+        multiples of 90 / 180 to allow for gimbal flips
+
+        :return: list of bools, True where the values matched
+        '''
+        if not values:
+            return []
+        if numpy is not None:
+            values = numpy.array(values, dtype=numpy.float64)
+            refValues = numpy.array(refValues, dtype=numpy.float64)
+            tolerances = numpy.array(tolerances, dtype=numpy.float64)
+            diff = numpy.abs(values - refValues)
+            mod = diff % 180.0
+            gimbal = numpy.array(gimbals, dtype=bool) & ((mod < tolerances) |
+                                                         (numpy.abs(180.0 - mod) < tolerances) |
+                                                         (numpy.abs(90.0 - mod) < tolerances))
+            return ((diff < tolerances) | gimbal).tolist()
+        return [r9Core.floatIsEqual(value, refValue, tolerance, allowGimbal=gimbal)
+                for value, refValue, tolerance, gimbal in zip(values, refValues, tolerances, gimbals)]
 
     def compare(self):
         '''
@@ -2252,13 +3230,22 @@ class PoseCompare(object):
         
         * currentPose is MASTER
         * referencePose is the one being compared to the currentPose
+
+        .. note::
+            the attr values of both poses are flattened into aligned (node, attr) arrays and all
+            the float tolerance checks run in one vectorised pass (numpy if available), the fails
+            are then built from the resulting mask. Log strings are only built for actual fails.
         '''
         
         self.fails = {}
-        logprint_keymismacth = ''
-        logprint_dagpath = ''
-        logprint_missingattr = ''
-        logprint_missingfail = ''
+        missingAttrs = []  # (key, attr)
+        compared = []  # (key, attr, value, refValue) for the non-float compares
+        processed = []  # (key, attr) in the order they were processed
+        floatKeys = []  # (key, attr) aligned with the float arrays below
+        values = []
+        refValues = []
+        tolerances = []
+        gimbals = []
 
         if self.compareDict:
             currentDic = getattr(self.currentPose, self.compareDict)
@@ -2269,35 +3256,29 @@ class PoseCompare(object):
             currentDic = self.currentPose
             referenceDic = self.referencePose
 
+        angularAttrs = set(self.angularAttrs)
+        ignoreAttrs = set(self.ignoreAttrs)
+        compareAttrs = 'failedAttrs' not in self.ignoreBlocks
+
         for key, attrBlock in currentDic.items():
             if self.filterMap and key not in self.filterMap:
                 log.debug('node not in filterMap - skipping key %s' % key)
                 continue
-            skip = False
 
             # --------------------------------------------
             # check that the key isn't in the ignoreStrings
             # --------------------------------------------
-            if self.ignoreStrings:
-                for istr in self.ignoreStrings:
-                    if istr in key:
-                        skip = True
-                        break
-            if skip:
+            if self.ignoreStrings and any(istr in key for istr in self.ignoreStrings):
                 continue
 
             # ---------------------------------------------
             # "missingKeys" block - check that the key exists
             # ---------------------------------------------
-
             if key in referenceDic:
                 referenceAttrBlock = referenceDic[key]
             else:
                 if 'missingKeys' not in self.ignoreBlocks:
-                    logprint_keymismacth += 'ERROR: Key Mismatch : %s\n' % key
-                    if 'missingKeys' not in self.fails:
-                        self.fails['missingKeys'] = []
-                    self.fails['missingKeys'].append(key)
+                    self.fails.setdefault('missingKeys', []).append(key)
                 else:
                     log.debug('missingKeys in ignoreblock : node is missing from data but being skipped "%s"' % key)
                 continue
@@ -2305,88 +3286,191 @@ class PoseCompare(object):
             # ---------------------------------------------
             # "hierarchyMismatch" block - check full dagPaths
             # ---------------------------------------------
-            try:
-                referenceDag = r9Core.removeNameSpace_fromDag(referenceAttrBlock['longName'])
-                currentDag = r9Core.removeNameSpace_fromDag(attrBlock['longName'])
-
-                if self.longName and not referenceDag == currentDag:
-                    if 'dagMismatch' not in self.ignoreBlocks:
-                        logprint_dagpath += 'ERROR: hierarchy Mismatch : \n\t\texpectedValue=\t"%s" >> \n\t\tcurrentValue=\t"%s"\n' % (currentDag, referenceDag)
-                        if 'dagMismatch' not in self.fails:
-                            self.fails['dagMismatch'] = []
-                        self.fails['dagMismatch'].append(key)
-                    else:
-                        log.debug('dagMismatch in ignoreblock : DagPath compare being skipped "%s"' % key)
-            except:
-                log.debug('Skipping DAGPATH compare as "longName" was not found in the reference pose : "%s"' % key)
+            if self.longName:
+                try:
+                    referenceDag = r9Core.removeNameSpace_fromDag(referenceAttrBlock['longName'])
+                    currentDag = r9Core.removeNameSpace_fromDag(attrBlock['longName'])
+                    if not referenceDag == currentDag:
+                        if 'dagMismatch' not in self.ignoreBlocks:
+                            self.fails.setdefault('dagMismatch', []).append(key)
+                            self.fails.setdefault('_dagPaths', {})[key] = (currentDag, referenceDag)
+                        else:
+                            log.debug('dagMismatch in ignoreblock : DagPath compare being skipped "%s"' % key)
+                except:
+                    log.debug('Skipping DAGPATH compare as "longName" was not found in the reference pose : "%s"' % key)
 
             # ---------------------------------------------
-            # "failedAttrs" block - compare attr values
+            # "failedAttrs" block - flatten the attr values
             # ---------------------------------------------
 
             # check that this object actually has attr data in the pose
             if 'attrs' not in attrBlock:
                 log.debug('%s node has no attrs block in the pose' % key)
                 continue
-            else:
-                if 'failedAttrs' in self.ignoreBlocks:
-                    log.debug('failedAttrs in ignoreblock : attr compare being skipped "%s"' % key)
+            if not compareAttrs:
+                log.debug('failedAttrs in ignoreblock : attr compare being skipped "%s"' % key)
+                continue
+            referenceAttrs = referenceAttrBlock['attrs']
+            for attr, value in attrBlock['attrs'].items():
+                if attr in ignoreAttrs:
+                    continue
+                # attr missing completely from the key
+                if attr not in referenceAttrs:
+                    missingAttrs.append((key, attr))
                     continue
-                # main compare block for attr values
-                for attr, value in attrBlock['attrs'].items():
-#                 for attr, value in attrBlock['attrs_kWorld'].items():
-#                     if isinstance(value, list):
-#                         pass
-
-                    if attr in self.ignoreAttrs:
-                        continue
-                    # attr missing completely from the key
-                    if attr not in referenceAttrBlock['attrs']:
-                        if 'failedAttrs' not in self.fails:
-                            self.fails['failedAttrs'] = {}
-                        if key not in self.fails['failedAttrs']:
-                            self.fails['failedAttrs'][key] = {}
-                        if 'missingAttrs' not in self.fails['failedAttrs'][key]:
-                            self.fails['failedAttrs'][key]['missingAttrs'] = []
-                        self.fails['failedAttrs'][key]['missingAttrs'].append(attr)
-                        logprint_missingattr += 'ERROR: Missing attribute in data : "%s.%s"\n' % (key, attr)
-                        continue
 
-                    # test the attrs value matches
-                    value = r9Core.decodeString(value)  # decode as this may be a configObj
-                    refValue = r9Core.decodeString(referenceAttrBlock['attrs'][attr])  # decode as this may be a configObj
+                # decode as these may be from a configObj
+                refValue = referenceAttrs[attr]
+                if isinstance(value, basestring):
+                    value = r9Core.decodeString(value)
+                if isinstance(refValue, basestring):
+                    refValue = r9Core.decodeString(refValue)
 
-                    if type(value) == float:
-                        matched = False
-#                         print('attr being matched ' ,attr)
-                        if attr in self.angularAttrs:
-                            matched = r9Core.floatIsEqual(value, refValue, self.angularTolerance, allowGimbal=True)
-                        else:
-                            matched = r9Core.floatIsEqual(value, refValue, self.linearTolerance, allowGimbal=False)
-                        if not matched:
-                            self.__addFailedAttr(key, attr)
-                            logprint_missingfail += 'ERROR: AttrValue float mismatch : "%s.%s" expectedValue=%s >> currentValue=%s\n' % (key, attr, value, refValue)
-                            continue
-                    elif not value == refValue:
-                        self.__addFailedAttr(key, attr)
-                        logprint_missingfail += 'ERROR: AttrValue mismatch : "%s.%s" expectedValue=%s >> currentValue=%s\n' % (key, attr, value, refValue)
+                processed.append((key, attr))
+                if type(value) == float:
+                    try:
+                        refValue = float(refValue)
+                    except (TypeError, ValueError):
+                        compared.append((key, attr, value, refValue))
                         continue
-
+                    floatKeys.append((key, attr))
+                    values.append(value)
+                    refValues.append(refValue)
+                    if attr in angularAttrs:
+                        tolerances.append(self.angularTolerance)
+                        gimbals.append(True)
+                    else:
+                        tolerances.append(self.linearTolerance)
+                        gimbals.append(False)
+                else:
+                    compared.append((key, attr, value, refValue))
+
+        # ---------------------------------------------
+        # build the fails from the compare masks
+        # ---------------------------------------------
+        for key, attr in missingAttrs:
+            self.__addFailedAttr(key, attr, block='missingAttrs')
+
+        failedValues = {}
+        for (key, attr), matched, value, refValue in zip(floatKeys, self._floatsMatch(values, refValues, tolerances, gimbals),
+                                                         values, refValues):
+            if not matched:
+                failedValues[(key, attr)] = ('float ', value, refValue)
+        for key, attr, value, refValue in compared:
+            if not value == refValue:
+                failedValues[(key, attr)] = ('', value, refValue)
+        # keep the attrMismatch lists in the order the attrs were processed
+        for key, attr in processed:
+            if (key, attr) in failedValues:
+                self.__addFailedAttr(key, attr)
+
+        dagPaths = self.fails.pop('_dagPaths', {})
         if any(['missingKeys' in self.fails, 'failedAttrs' in self.fails, 'dagMismatch' in self.fails]):
-            print('PoseCompare returns : "%s" ========================================\n' % self.compareDict)
-            if logprint_keymismacth:
-                print(logprint_keymismacth)
-            if logprint_dagpath:
-                print(logprint_dagpath)
-            if logprint_missingattr:
-                print(logprint_missingattr)
-            if logprint_missingfail:
-                print(logprint_missingfail)
-            print('PoseCompare returns : ========================================')
+            if self.verbose:
+                print('PoseCompare returns : "%s" ========================================\n' % self.compareDict)
+                if 'missingKeys' in self.fails:
+                    print(''.join('ERROR: Key Mismatch : %s\n' % key for key in self.fails['missingKeys']))
+                if dagPaths:
+                    print(''.join('ERROR: hierarchy Mismatch : \n\t\texpectedValue=\t"%s" >> \n\t\tcurrentValue=\t"%s"\n' % dagPaths[key]
+                                  for key in self.fails['dagMismatch']))
+                if missingAttrs:
+                    print(''.join('ERROR: Missing attribute in data : "%s.%s"\n' % data for data in missingAttrs))
+                if failedValues:
+                    print(''.join('ERROR: AttrValue %smismatch : "%s.%s" expectedValue=%s >> currentValue=%s\n' %
+                                  (failType, key, attr, value, refValue)
+                                  for (key, attr), (failType, value, refValue) in failedValues.items()))
+                print('PoseCompare returns : ========================================')
             return False
         self.status = True
         return True
 
+    @staticmethod
+    def batchCompare(referencePose, posedir, compareDict='skeletonDict', processes=None, **kws):
+        '''
+        Compare a single reference pose against every pose file in a folder, the compares
+        being farmed out over a process pool. The reference is the MASTER, currentPose in the
+        compare, so any of its nodes missing from a pose file will be flagged.
+
+        >>> # validate a folder of skeleton poses against the rigs current pose
+        >>> mRig.poseCacheStore()
+        >>> results = r9Pose.PoseCompare.batchCompare(mRig.poseCache, 'P:/validation/poses')
+        >>> failed = [path for path, (status, fails) in results.items() if not status]
+
+        :param referencePose: PoseData object or pose file to compare everything to
+        :param posedir: folder of .pose files to compare
+        :param compareDict: the internal dict to compare, 'poseDict' or 'skeletonDict'
+        :param processes: number of processes to run, default None uses the cpu count,
+            0 runs everything in this process
+        :param kws: passed to the PoseCompare, ie angularTolerance, ignoreAttrs etc
+        :return: {posefile: (status, fails)}
+        '''
+        if not isinstance(referencePose, PoseData):
+            filepath = referencePose
+            referencePose = PoseData()
+            referencePose._readPose(filepath)
+        referenceData = getattr(referencePose, compareDict)
+        if not referenceData:
+            raise StandardError('missing pose section <<%s>> in the referencePose, compare aborted' % compareDict)
+        kws['verbose'] = False
+        jobs = [(referenceData, os.path.join(posedir, f), compareDict, kws)
+                for f in sorted(os.listdir(posedir)) if f.lower().endswith('.pose')]
+        if processes == 0 or len(jobs) < 2:
+            results = [_batchCompareWorker(job) for job in jobs]
+        else:
+            pool = getProcessPool(processes)
+            try:
+                results = pool.map(_batchCompareWorker, jobs)
+            finally:
+                pool.close()
+                pool.join()
+        return dict((job[1], result) for job, result in zip(jobs, results))
+
+
+def _batchCompareWorker(job):
+    '''
+    PoseCompare.batchCompare worker, module level so it can be pickled to the process pool
+    '''
+    referenceData, filepath, compareDict, kws = job
+    try:
+        pose = PoseData()
+        pose._readPose(filepath)
+        compare = PoseCompare(referenceData, getattr(pose, compareDict), compareDict=None, **kws)
+        return compare.compare(), compare.fails
+    except StandardError, err:
+        return False, {'error': str(err)}
+
+
+def getProcessPool(processes=None, initializeMaya=True):
+    '''
+    return a multiprocessing Pool for the batch pose calls. Inside an interactive Maya
+    session sys.executable is the Maya binary itself so the pool is pointed at mayapy
+
+    :param processes: number of worker processes, default None uses the cpu count
+    :param initializeMaya: make sure maya.standalone is running in each worker, not
+        needed for the pure file based batch calls
+    '''
+    executable = os.path.basename(sys.executable).lower()
+    if executable.startswith('maya') and not executable.startswith('mayapy'):
+        mayapy = os.path.join(os.path.dirname(sys.executable), 'mayapy')
+        if os.name == 'nt':
+            mayapy += '.exe'
+        multiprocessing.set_executable(mayapy)
+    if initializeMaya:
+        return multiprocessing.Pool(processes, initializer=_initializeWorker)
+    return multiprocessing.Pool(processes)
+
+
+def _initializeWorker():
+    '''
+    process pool initializer, make sure Maya is running in the worker. Forked workers
+    inherit the parent session, spawned ones (Windows) come up as a bare mayapy
+    '''
+    try:
+        cmds.about(batch=True)
+    except:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+
 
 def batchPatchPoses(posedir, config, poseroot, load=True, save=True, patchfunc=None,
                     relativePose=False, relativeRots=False, relativeTrans=False):
@@ -2402,6 +3486,10 @@ def batchPatchPoses(posedir, config, poseroot, load=True, save=True, patchfunc=N
             fixing issues on mass with poses. Note we now pass pose file back into this func as an arg
     :param load: should the batch load the pose
     :param save: should the batch resave the pose
+
+    .. note::
+        this runs every pose through a live rig, for pure data patches use batchPatchPoseFiles
+        which works directly on the files, no scene required, over a process pool
     '''
 
     filterObj = r9Core.FilterNode_Settings()
@@ -2430,3 +3518,174 @@ def batchPatchPoses(posedir, config, poseroot, load=True, save=True, patchfunc=N
                                useFilter=True,
                                storeThumbnail=False)
             log.info('Processed Pose File :  %s' % f)
+
+
+class PoseFile(object):
+    '''
+    Plain data view of a pose file, no scene or Maya session needed. This is what gets
+    handed to the patch function in batchPatchPoseFiles. All the blocks are plain dicts,
+    note that config (legacy) pose values are left as the strings stored in the file.
+
+    >>> pose = PoseFile('P:/poses/jump.pose')
+    >>> pose.renameKey('L_Wrist_Ctrl', 'L_Hand_Ctrl')
+    >>> pose.info['rigType'] = 'biped'
+    >>> pose.save()
+    '''
+    def __init__(self, filepath, dataformat=None):
+        self.filepath = filepath
+        data, self.dataformat = readDataMapFile(filepath, dataformat)
+        data = self.__toDict(data)
+        self.poseDict = data.get('poseData', {})
+        self.info = data.get('info', {})
+        self.filterNode_settings = data.get('filterNode_settings', {})
+        self.skeletonDict = data.get('skeletonDict', {})
+        self.hikDict = data.get('hikDict', {})
+
+    @staticmethod
+    def __toDict(data):
+        if isinstance(data, configobj.Section):
+            return data.dict()
+        return data
+
+    def renameKey(self, key, newKey):
+        '''
+        rename a node key in the poseDict and skeletonDict
+        '''
+        for block in [self.poseDict, self.skeletonDict]:
+            if key in block:
+                block[newKey] = block.pop(key)
+
+    def removeAttrs(self, attrs, keys=None):
+        '''
+        drop the given attrs from the [attrs] block of all, or the given, node keys
+        '''
+        for key, data in self.poseDict.items():
+            if keys and key not in keys:
+                continue
+            for attr in attrs:
+                data.get('attrs', {}).pop(attr, None)
+
+    def remapMetaData(self, mapping):
+        '''
+        remap the metaData connection data stored against each node key
+
+        :param mapping: {(metaNodeID, metaAttr): (newMetaNodeID, newMetaAttr)}, either
+            side of the tuples can also be a plain metaNodeID string to remap whole mNodes
+        '''
+        for data in self.poseDict.values():
+            metaData = data.get('metaData')
+            if not metaData:
+                continue
+            remap = mapping.get((metaData['metaNodeID'], metaData['metaAttr']))
+            if remap:
+                metaData['metaNodeID'], metaData['metaAttr'] = remap
+            elif metaData['metaNodeID'] in mapping:
+                metaData['metaNodeID'] = mapping[metaData['metaNodeID']]
+
+    def save(self, filepath=None, dataformat=None):
+        '''
+        write the pose back, atomically, to a temp file which then replaces the original
+
+        :param filepath: default, overwrite the file we read
+        :param dataformat: default, the format we read
+        '''
+        filepath = filepath or self.filepath
+        blocks = [('info', self.info),
+                  ('filterNode_settings', self.filterNode_settings),
+                  ('poseData', self.poseDict)]
+        if self.skeletonDict:
+            blocks.append(('skeletonDict', self.skeletonDict))
+        if self.hikDict:
+            blocks.append(('hikDict', self.hikDict))
+        tmpPath = '%s.tmp%i' % (filepath, os.getpid())
+        try:
+            writeDataMapFile(tmpPath, blocks, dataformat or self.dataformat)
+            if os.name == 'nt' and os.path.exists(filepath):
+                os.remove(filepath)  # os.rename won't replace an existing file on Windows
+            os.rename(tmpPath, filepath)
+            DATAMAP_READ_CACHE.invalidate(filepath)
+        finally:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+
+def batchPatchPoseFiles(posedir, patchfunc, processes=None, recursive=False, dataformat=None, progressfunc=None):
+    '''
+    Offline version of batchPatchPoses, patching the pose files directly rather than
+    loading them onto a rig. Each pose is read into a PoseFile object and passed to the
+    patchfunc, then written back atomically. The files are farmed out over a process pool.
+
+    >>> def patch(pose):
+    >>>     pose.removeAttrs(['ikfk_blend'])
+    >>>     pose.info['patched'] = True
+    >>>
+    >>> results = batchPatchPoseFiles('P:/poses', patch)
+
+    :param posedir: directory of poses to process
+    :param patchfunc: function called with each PoseFile, return False to skip writing the file
+        back (nothing changed). This must be a module level function to be sent to the process
+        pool. If the patch needs a live rig / Maya scene then set patchfunc.requiresRig = True
+        and the batch runs in this Maya session rather than the pool
+    :param processes: number of processes to run, default None uses the cpu count, 0 runs
+        everything in this process
+    :param recursive: also process poses in sub-folders
+    :param dataformat: write the patched poses out in this format, default keeps the format read
+    :param progressfunc: optional function called as each file completes (done, total, filepath, status)
+    :return: {filepath: status} where status is 'patched', 'unchanged' or the error traceback
+    '''
+    files = []
+    for root, _, filenames in os.walk(posedir):
+        files.extend(os.path.join(root, f) for f in sorted(filenames) if f.lower().endswith('.pose'))
+        if not recursive:
+            break
+    jobs = [(filepath, patchfunc, dataformat) for filepath in files]
+
+    if getattr(patchfunc, 'requiresRig', False):
+        processes = 0
+    if processes != 0 and len(jobs) > 1:
+        try:
+            pickle.dumps(patchfunc)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            log.warning('patchfunc can not be sent to the process pool, running in process : %s' % patchfunc)
+            processes = 0
+
+    results = {}
+
+    def _progress(result):
+        filepath, status = result
+        results[filepath] = status
+        if status in ['patched', 'unchanged']:
+            log.info('Processed Pose File %i/%i : %s : %s' % (len(results), len(jobs), status, filepath))
+        else:
+            log.error('Failed Pose File %i/%i : %s\n%s' % (len(results), len(jobs), filepath, status))
+        if progressfunc:
+            progressfunc(len(results), len(jobs), filepath, status)
+
+    if processes == 0 or len(jobs) < 2:
+        for job in jobs:
+            _progress(_batchPatchWorker(job))
+    else:
+        pool = getProcessPool(processes, initializeMaya=False)
+        try:
+            for result in pool.imap_unordered(_batchPatchWorker, jobs):
+                _progress(result)
+        finally:
+            pool.close()
+            pool.join()
+    return results
+
+
+def _batchPatchWorker(job):
+    '''
+    batchPatchPoseFiles worker, module level so it can be pickled to the process pool
+    '''
+    filepath, patchfunc, dataformat = job
+    try:
+        pose = PoseFile(filepath)
+        if patchfunc(pose) is False:
+            return filepath, 'unchanged'
+        pose.save(dataformat=dataformat)
+        return filepath, 'patched'
+    except:
+        return filepath, traceback.format_exc()
+
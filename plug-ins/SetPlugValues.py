@@ -0,0 +1,197 @@
+'''
+------------------------------------------
+Red9 Studio Pack : Maya Pipeline Solutions
+email: rednineinfo@gmail.com
+------------------------------------------
+
+This has been wrapped in a MPxCommand so that a bulk set of attribute values,
+run through a single MDGModifier, is registered to the undoStack as one entry.
+Used by the PoseSaver to apply poses without a setAttr call per channel.
+
+Command= SetPlugValues(plug=['node.attr', ...], value=[1.0, ...], clamp=True)
+
+flags:  -p / -plug    (multi-use) plug to set
+        -v / -value   (multi-use) value for the matching plug, in ui units as per setAttr
+        -c / -clamp   clamp values to the attributes hard min/max, as per setAttr -clamp
+
+returns the list of plugs that couldn't be set, locked, connected or unsupported types, so
+the caller can decide how to deal with them
+'''
+
+import maya.OpenMayaMPx as OpenMayaMPx
+import maya.OpenMaya as OpenMaya
+import sys
+
+
+class SetPlugValues(OpenMayaMPx.MPxCommand):
+
+    kPluginCmdName = "SetPlugValues"
+    kPlugFlag = "-p"
+    kPlugLongFlag = "-plug"
+    kValueFlag = "-v"
+    kValueLongFlag = "-value"
+    kClampFlag = "-c"
+    kClampLongFlag = "-clamp"
+
+    def __init__(self):
+        OpenMayaMPx.MPxCommand.__init__(self)
+        self.modifier = OpenMaya.MDGModifier()
+        self.clamp = False
+
+    def isUndoable(self):
+        '''
+        Required otherwise the undo block won't get registered
+        '''
+        return True
+
+    @staticmethod
+    def __clampValue(fnAttr, value):
+        '''
+        clamp a value, in internal units, to the attr's hard min / max
+        '''
+        util = OpenMaya.MScriptUtil()
+        ptr = util.asDoublePtr()
+        if fnAttr.hasMin():
+            fnAttr.getMin(ptr)
+            value = max(value, util.getDouble(ptr))
+        if fnAttr.hasMax():
+            fnAttr.getMax(ptr)
+            value = min(value, util.getDouble(ptr))
+        return value
+
+    @staticmethod
+    def __isSettable(plug):
+        '''
+        locked plugs, or plugs driven by anything other than an animCurve, can't be set
+        '''
+        if plug.isLocked():
+            return False
+        if plug.isDestination():
+            sources = OpenMaya.MPlugArray()
+            plug.connectedTo(sources, True, False)
+            if sources.length() and not sources[0].node().hasFn(OpenMaya.MFn.kAnimCurve):
+                return False
+        return True
+
+    def __addPlugValue(self, plug, value):
+        '''
+        push the value for the plug into the modifier, converting from ui units
+        '''
+        attr = plug.attribute()
+        if attr.hasFn(OpenMaya.MFn.kNumericAttribute):
+            fnAttr = OpenMaya.MFnNumericAttribute(attr)
+            if self.clamp:
+                value = self.__clampValue(fnAttr, value)
+            unitType = fnAttr.unitType()
+            if unitType == OpenMaya.MFnNumericData.kBoolean:
+                self.modifier.newPlugValueBool(plug, bool(value))
+            elif unitType in (OpenMaya.MFnNumericData.kFloat, OpenMaya.MFnNumericData.kDouble):
+                self.modifier.newPlugValueDouble(plug, value)
+            elif unitType in (OpenMaya.MFnNumericData.kByte, OpenMaya.MFnNumericData.kChar,
+                              OpenMaya.MFnNumericData.kShort, OpenMaya.MFnNumericData.kInt):
+                self.modifier.newPlugValueInt(plug, int(value))
+            else:
+                return False
+        elif attr.hasFn(OpenMaya.MFn.kUnitAttribute):
+            fnAttr = OpenMaya.MFnUnitAttribute(attr)
+            unitType = fnAttr.unitType()
+            if unitType == OpenMaya.MFnUnitAttribute.kAngle:
+                value = OpenMaya.MAngle(value, OpenMaya.MAngle.uiUnit()).asRadians()
+                if self.clamp:
+                    value = self.__clampValue(fnAttr, value)
+                self.modifier.newPlugValueMAngle(plug, OpenMaya.MAngle(value, OpenMaya.MAngle.kRadians))
+            elif unitType == OpenMaya.MFnUnitAttribute.kDistance:
+                value = OpenMaya.MDistance(value, OpenMaya.MDistance.uiUnit()).asCentimeters()
+                if self.clamp:
+                    value = self.__clampValue(fnAttr, value)
+                self.modifier.newPlugValueMDistance(plug, OpenMaya.MDistance(value, OpenMaya.MDistance.kCentimeters))
+            elif unitType == OpenMaya.MFnUnitAttribute.kTime:
+                self.modifier.newPlugValueMTime(plug, OpenMaya.MTime(value, OpenMaya.MTime.uiUnit()))
+            else:
+                return False
+        elif attr.hasFn(OpenMaya.MFn.kEnumAttribute):
+            self.modifier.newPlugValueShort(plug, int(value))
+        else:
+            return False
+        return True
+
+    def doIt(self, args):
+        '''
+        Main call: build the modifier up from the plug / value pairs passed in
+        '''
+        argData = OpenMaya.MArgDatabase(self.syntax(), args)
+        if argData.isFlagSet(self.kClampFlag):
+            self.clamp = argData.flagArgumentBool(self.kClampFlag, 0)
+
+        plugs = []
+        values = []
+        argList = OpenMaya.MArgList()
+        for i in range(argData.numberOfFlagUses(self.kPlugFlag)):
+            argData.getFlagArgumentList(self.kPlugFlag, i, argList)
+            plugs.append(argList.asString(0))
+        for i in range(argData.numberOfFlagUses(self.kValueFlag)):
+            argData.getFlagArgumentList(self.kValueFlag, i, argList)
+            values.append(argList.asDouble(0))
+        if not len(plugs) == len(values):
+            raise ValueError('SetPlugValues : the number of plugs and values must match')
+
+        failed = []
+        selList = OpenMaya.MSelectionList()
+        plug = OpenMaya.MPlug()
+        for name, value in zip(plugs, values):
+            try:
+                selList.clear()
+                selList.add(name)
+                selList.getPlug(0, plug)
+                if not self.__isSettable(plug) or not self.__addPlugValue(plug, value):
+                    failed.append(name)
+            except RuntimeError:
+                failed.append(name)
+
+        self.redoIt()
+
+        # set the returns
+        OpenMayaMPx.MPxCommand.clearResult()
+        for name in failed:
+            OpenMayaMPx.MPxCommand.appendToResult(name)
+
+    def redoIt(self):
+        self.modifier.doIt()
+
+    def undoIt(self):
+        self.modifier.undoIt()
+
+    @classmethod
+    def cmdCreator(cls):
+        # Create the command
+        return OpenMayaMPx.asMPxPtr(SetPlugValues())
+
+    # Syntax creator : Builds the argument strings up for the command
+    @classmethod
+    def syntaxCreator(cls):
+        syntax = OpenMaya.MSyntax()
+        syntax.addFlag(cls.kPlugFlag, cls.kPlugLongFlag, OpenMaya.MSyntax.kString)
+        syntax.addFlag(cls.kValueFlag, cls.kValueLongFlag, OpenMaya.MSyntax.kDouble)
+        syntax.addFlag(cls.kClampFlag, cls.kClampLongFlag, OpenMaya.MSyntax.kBoolean)
+        syntax.makeFlagMultiUse(cls.kPlugFlag)
+        syntax.makeFlagMultiUse(cls.kValueFlag)
+        return syntax
+
+
+# Initialize the plug-in
+def initializePlugin(mobject):
+    mplugin = OpenMayaMPx.MFnPlugin(mobject, "Red9", "1.0", "Any")
+    try:
+        mplugin.registerCommand(SetPlugValues.kPluginCmdName, SetPlugValues.cmdCreator, SetPlugValues.syntaxCreator)
+    except:
+        sys.stderr.write("Failed to register command: %s\n" % SetPlugValues.kPluginCmdName)
+        raise
+
+# Uninitialize the plug-in
+def uninitializePlugin(mobject):
+    mplugin = OpenMayaMPx.MFnPlugin(mobject)
+    try:
+        mplugin.deregisterCommand(SetPlugValues.kPluginCmdName)
+    except:
+        sys.stderr.write("Failed to unregister command: %s\n" % SetPlugValues.kPluginCmdName)
+        raise
@@ -10,12 +10,18 @@ open the plugin up for use with any mel commands.
 
 Command= SnapTransforms(flags)
 
-flags:  -s / -source
-        -d / -destination
+flags:  -s / -source       (multi-use)
+        -d / -destination  (multi-use)
         -te/ -timeEnabled
         -st / -snapTranslates
         -sr / -snapRotates
         -ss / -snapScales  ( local space only )
+        -rm / -returnMatrices  return the destinations world matrices, 16 doubles per pair
+
+The source / destination flags are multi-use so a whole list of pairs can be snapped
+in a single call, in the order given, with one undo entry:
+
+    cmds.SnapTransforms(source=['srcA', 'srcB'], destination=['destA', 'destB'])
 
 TODO: add flags for just rotate or translate processing
 '''
@@ -26,6 +32,11 @@ import maya.OpenMaya as OpenMaya
 import sys
 
 
+# MDagPaths resolved from the node names passed in, re-validated on each use
+# so repeated calls over a timerange only hit the selectionList once per node
+_DAGPATH_CACHE = {}
+
+
 class SnapTransforms(OpenMayaMPx.MPxCommand):
          
     kPluginCmdName="SnapTransforms"
@@ -43,20 +54,19 @@ class SnapTransforms(OpenMayaMPx.MPxCommand):
     kRotsLongFlag = "-snapRotates" 
     kScalesFlag = "-ss"
     kScalesLongFlag = "-snapScales" 
+    kMatricesFlag = "-rm"
+    kMatricesLongFlag = "-returnMatrices"
 
     def __init__(self):
         OpenMayaMPx.MPxCommand.__init__(self)  
         self.origTime=None
-        self.origTrans=None # store the original Trans for the UndoQueue
-        self.origRots=None  # store the original Rots for the UndoQueue
-        self.origScales=None  # store the original Scales for the UndoQueue
+        self.origTransforms=[]  # store the original (MFnTransform, MTransformationMatrix) for the UndoQueue
         self.TimeEnabled=False  # enable time, uses the current frame
         self.atFrame=None  # specific frame to snap
-        self.MFntSource=None
-        self.MFntDestin=None
         self.snapTranslation=True
         self.snapRotation=True
         self.snapScales=False
+        self.returnMatrices=False
 
     def isUndoable(self):
         '''
@@ -70,14 +80,63 @@ class SnapTransforms(OpenMayaMPx.MPxCommand):
         from a given transform node (passed as string) return the
         actual MFnTransform from the API
         '''
+        if node in _DAGPATH_CACHE:
+            handle, dagpath = _DAGPATH_CACHE[node]
+            # the handle catches deleted nodes, the name check renames
+            if handle.isValid() and dagpath.isValid() and \
+                    OpenMaya.MFnDependencyNode(handle.object()).name() == node.split('|')[-1]:
+                return OpenMaya.MFnTransform(dagpath)
         dagpath=OpenMaya.MDagPath()
         # Add to the sectectionList
         selList=OpenMaya.MSelectionList()
         selList.add(node)
         selList.getDagPath(0,dagpath)
+        _DAGPATH_CACHE[node] = (OpenMaya.MObjectHandle(dagpath.node()), dagpath)
         # Make the Main Transform Nodes
         return OpenMaya.MFnTransform(dagpath)
 
+    def __snapPair(self, MFntSource, MFntDestin):
+        '''
+        snap a single destination to its source, caching the destination's
+        original transform for the undo
+        '''
+        self.origTransforms.append((MFntDestin, OpenMaya.MTransformationMatrix(MFntDestin.transformation())))
+
+        if self.snapTranslation:
+            # --------------------------
+            # DEAL WITH THE TRANSLATES :
+            # --------------------------
+            rotPivA=OpenMaya.MVector(MFntSource.rotatePivot(OpenMaya.MSpace.kWorld))
+            rotPivB=OpenMaya.MVector(MFntDestin.rotatePivot(OpenMaya.MSpace.kWorld))
+            origTrans = MFntDestin.getTranslation(OpenMaya.MSpace.kWorld)
+            # We subtract the destinations translation from it's rotPivot, before adding it
+            # to the source rotPiv. This compensates for offsets in the 2 nodes pivots
+            targetTrans = (rotPivA + (origTrans - rotPivB))
+            MFntDestin.setTranslation(targetTrans, OpenMaya.MSpace.kWorld)
+
+        if self.snapRotation:
+            # -----------------------
+            # DEAL WITH THE ROTATES :
+            # -----------------------
+            # Read the source Quaternions and copy to destination
+            Quat = OpenMaya.MQuaternion()
+            MFntSource.getRotation(Quat, OpenMaya.MSpace.kWorld)
+            MFntDestin.setRotation(Quat, OpenMaya.MSpace.kWorld)
+
+        if self.snapScales:
+            # -----------------------
+            # DEAL WITH THE SCALES : (local only) Testing
+            # -----------------------
+            util = OpenMaya.MScriptUtil()
+            util.createFromList( [1.0, 1.0, 1.0], 3 )
+            scalepntr = util.asDoublePtr()
+            # Read the source scales and copy to destination
+            MFntSource.getScale(scalepntr)
+            MFntDestin.setScale(scalepntr)    
+
+#             mmatrix = OpenMaya.MTransformationMatrix()
+#             mmatrix.setScale(scalePtr, OpenMaya.MSpace.kWorld)
+
 
     #===============================================================================
     # RUNTIME : Snap Align 2 transform Nodes 
@@ -87,17 +146,21 @@ class SnapTransforms(OpenMayaMPx.MPxCommand):
         Main call: arguements passed back from the MSyntax/MArgDatabase
         are object names as strings.
         '''
-        Source=None
-        Destin=None
-        result=[]
+        Sources=[]
+        Destins=[]
 
         # Build the Arg List from the MSyntax/MArgDatabase, we need to 
         # do this as when called this object is in the API world not Python
         argData = OpenMaya.MArgDatabase(self.syntax(), args)
-        if argData.isFlagSet(self.kSourceFlag):
-            Source=argData.flagArgumentString(self.kSourceFlag, 0)
-        if argData.isFlagSet(self.kDestinationFlag):
-            Destin=argData.flagArgumentString(self.kDestinationFlag, 0)
+        argList = OpenMaya.MArgList()
+        for i in range(argData.numberOfFlagUses(self.kSourceFlag)):
+            argData.getFlagArgumentList(self.kSourceFlag, i, argList)
+            Sources.append(argList.asString(0))
+        for i in range(argData.numberOfFlagUses(self.kDestinationFlag)):
+            argData.getFlagArgumentList(self.kDestinationFlag, i, argList)
+            Destins.append(argList.asString(0))
+        if not len(Sources) == len(Destins):
+            raise ValueError('SnapTransforms : the number of sources and destinations must match')
         if argData.isFlagSet(self.kTimeEnabledFlag):
             self.TimeEnabled=argData.flagArgumentBool(self.kTimeEnabledFlag, 0)
         if argData.isFlagSet(self.kTransFlag):
@@ -108,12 +171,13 @@ class SnapTransforms(OpenMayaMPx.MPxCommand):
             self.snapScales=argData.flagArgumentBool(self.kScalesFlag, 0)
         if argData.isFlagSet(self.kTimeFlag):
             self.atFrame=argData.flagArgumentDouble(self.kTimeFlag, 0)
+        if argData.isFlagSet(self.kMatricesFlag):
+            self.returnMatrices=argData.flagArgumentBool(self.kMatricesFlag, 0)
 
-        # Make the api.MFnTransorm Nodes
-        self.MFntSource=self.__MFnTransformNode(Source)
-        self.MFntDestin=self.__MFnTransformNode(Destin)
+        # Make the api.MFnTransorm Nodes, once per pair
+        pairs = [(self.__MFnTransformNode(src), self.__MFnTransformNode(dest)) for src, dest in zip(Sources, Destins)]
 
-        # set the internal Time
+        # set the internal Time, once for all the pairs
         if self.TimeEnabled:
             # If we're not shifting timelines in the wrapper proc then
             # we don't want to set the AnimControl time as the scene is 
@@ -125,55 +189,24 @@ class SnapTransforms(OpenMayaMPx.MPxCommand):
             self.origTime = OpenMaya.MTime(self.atFrame, OpenMaya.MTime.uiUnit())
             apiAnim.MAnimControl.setCurrentTime(OpenMaya.MTime(self.atFrame, OpenMaya.MTime.uiUnit()))
 
-        if self.snapTranslation:
-            # --------------------------
-            # DEAL WITH THE TRANSLATES :
-            # --------------------------
-            rotPivA=OpenMaya.MVector(self.MFntSource.rotatePivot(OpenMaya.MSpace.kWorld))
-            rotPivB=OpenMaya.MVector(self.MFntDestin.rotatePivot(OpenMaya.MSpace.kWorld))
-            self.origTrans = self.MFntDestin.getTranslation(OpenMaya.MSpace.kWorld)
-            # We subtract the destinations translation from it's rotPivot, before adding it
-            # to the source rotPiv. This compensates for offsets in the 2 nodes pivots
-            targetTrans = (rotPivA + (self.origTrans - rotPivB))
-            self.MFntDestin.setTranslation(targetTrans, OpenMaya.MSpace.kWorld)
-
-        if self.snapRotation:
-            # -----------------------
-            # DEAL WITH THE ROTATES :
-            # -----------------------
-            # Fill the Undo 
-            self.origRots=OpenMaya.MQuaternion()
-            self.MFntDestin.getRotation(self.origRots, OpenMaya.MSpace.kWorld)
-
-            # Read the source Quaternions and copy to destination
-            Quat = OpenMaya.MQuaternion()
-            self.MFntSource.getRotation(Quat, OpenMaya.MSpace.kWorld)
-            self.MFntDestin.setRotation(Quat, OpenMaya.MSpace.kWorld)
-
-        if self.snapScales:
-            # -----------------------
-            # DEAL WITH THE SCALES : (local only) Testing
-            # -----------------------
-            # Fill the Undo 
-            util = OpenMaya.MScriptUtil()
-            util.createFromList( [1.0, 1.0, 1.0], 3 )
-            scalepntr = util.asDoublePtr()
-            self.MFntDestin.getScale(scalepntr)
-            sx = OpenMaya.MScriptUtil().getDoubleArrayItem(scalepntr, 0)
-            sy = OpenMaya.MScriptUtil().getDoubleArrayItem(scalepntr, 1)
-            sz = OpenMaya.MScriptUtil().getDoubleArrayItem(scalepntr, 2)
-            self.origScales=[sx, sy, sz]
-
-            # Read the source scales and copy to destination
-            self.MFntSource.getScale(scalepntr)
-            self.MFntDestin.setScale(scalepntr)    
-
-#             mmatrix = OpenMaya.MTransformationMatrix()
-#             mmatrix.setScale(scalePtr, OpenMaya.MSpace.kWorld)
+        # snap in the order given, so pass the pairs in in priority order
+        for MFntSource, MFntDestin in pairs:
+            self.__snapPair(MFntSource, MFntDestin)
 
         # set the returns
         OpenMayaMPx.MPxCommand.clearResult()
-        OpenMayaMPx.MPxCommand.setResult(True)
+        if self.returnMatrices:
+            matrices = OpenMaya.MDoubleArray()
+            dagpath = OpenMaya.MDagPath()
+            for _, MFntDestin in pairs:
+                MFntDestin.getPath(dagpath)
+                matrix = dagpath.inclusiveMatrix()
+                for row in range(4):
+                    for column in range(4):
+                        matrices.append(matrix(row, column))
+            OpenMayaMPx.MPxCommand.setResult(matrices)
+        else:
+            OpenMayaMPx.MPxCommand.setResult(True)
 
     def redoIt(self):
         pass
@@ -184,15 +217,9 @@ class SnapTransforms(OpenMayaMPx.MPxCommand):
         '''
         if self.TimeEnabled:
             apiAnim.MAnimControl.setCurrentTime(self.origTime)
-        if self.origTrans:
-            self.MFntDestin.setTranslation(self.origTrans,OpenMaya.MSpace.kWorld)
-        if self.origRots:
-            self.MFntDestin.setRotation(self.origRots,OpenMaya.MSpace.kWorld)
-        if self.origScales:
-            util = OpenMaya.MScriptUtil()
-            util.createFromList( self.origScales, 3 )
-            scalepntr = util.asDoublePtr()
-            self.MFntDestin.setScale(scalepntr)
+        # restore in reverse so a destination snapped more than once ends up at its original
+        for MFntDestin, transformation in reversed(self.origTransforms):
+            MFntDestin.set(transformation)
 
     @classmethod
     def cmdCreator(cls):
@@ -210,11 +237,14 @@ class SnapTransforms(OpenMayaMPx.MPxCommand):
         syntax.addFlag(cls.kRotsFlag, cls.kRotsLongFlag, OpenMaya.MSyntax.kBoolean)
         syntax.addFlag(cls.kScalesFlag, cls.kScalesLongFlag, OpenMaya.MSyntax.kBoolean)
         syntax.addFlag(cls.kTimeFlag, cls.kTimeLongFlag, OpenMaya.MSyntax.kDouble)
+        syntax.addFlag(cls.kMatricesFlag, cls.kMatricesLongFlag, OpenMaya.MSyntax.kBoolean)
+        syntax.makeFlagMultiUse(cls.kSourceFlag)
+        syntax.makeFlagMultiUse(cls.kDestinationFlag)
         return syntax
 
 # Initialize the plug-in 
 def initializePlugin(mobject):
-    mplugin = OpenMayaMPx.MFnPlugin(mobject, "Red9", "1.5", "Any")
+    mplugin = OpenMayaMPx.MFnPlugin(mobject, "Red9", "1.6", "Any")
     try:
         mplugin.registerCommand( SnapTransforms.kPluginCmdName, SnapTransforms.cmdCreator, SnapTransforms.syntaxCreator )
     except:
@@ -0,0 +1,275 @@
+'''
+------------------------------------------
+Red9 Studio Pack : Maya Pipeline Solutions
+email: rednineinfo@gmail.com
+------------------------------------------
+
+This has been wrapped in a MPxCommand so that a bulk transfer of animCurve data,
+run through a single MAnimCurveChange / MDGModifier, is registered to the undoStack
+as one entry. Used by AnimFunctions.copyKeys to transfer keys without going through
+Maya's global key clipboard, one copyKey / pasteKey per node.
+
+Command= TransferAnimCurves(source=['curve', ...], destination=['node.attr', ...], option='replace')
+
+flags:  -s / -source       (multi-use) source animCurve
+        -d / -destination  (multi-use) destination plug for the matching source curve
+        -o / -option       paste option, 'replace' (default), 'replaceCompletely', 'merge' or 'insert'
+        -t / -time         (start, end) only transfer the source keys in this range, ui time units
+        -to / -timeOffset  offset applied to the transferred keys, ui time units
+
+The key times, values, tangent types, angles and weights, tangent / weight locks and
+breakdowns are transferred, plus the weighted state and infinity when the destination
+curve is created or completely replaced.
+
+returns the list of destination plugs that couldn't be processed, locked, driven by
+anything other than an animCurve, animLayers, or a mismatched curve type, so the
+caller can fall back to the clipboard for those
+'''
+
+import maya.OpenMayaAnim as OpenMayaAnim
+import maya.OpenMayaMPx as OpenMayaMPx
+import maya.OpenMaya as OpenMaya
+import sys
+
+
+class TransferAnimCurves(OpenMayaMPx.MPxCommand):
+
+    kPluginCmdName = "TransferAnimCurves"
+    kSourceFlag = "-s"
+    kSourceLongFlag = "-source"
+    kDestinationFlag = "-d"
+    kDestinationLongFlag = "-destination"
+    kOptionFlag = "-o"
+    kOptionLongFlag = "-option"
+    kTimeFlag = "-t"
+    kTimeLongFlag = "-time"
+    kOffsetFlag = "-to"
+    kOffsetLongFlag = "-timeOffset"
+
+    kOptions = ('replace', 'replaceCompletely', 'merge', 'insert')
+
+    def __init__(self):
+        OpenMayaMPx.MPxCommand.__init__(self)
+        self.modifier = OpenMaya.MDGModifier()
+        self.change = OpenMayaAnim.MAnimCurveChange()
+        self.option = 'replace'
+        self.time = None
+        self.timeOffset = 0.0
+        self.uiUnit = OpenMaya.MTime.uiUnit()
+
+    def isUndoable(self):
+        '''
+        Required otherwise the undo block won't get registered
+        '''
+        return True
+
+    def __readKeys(self, fnCurve):
+        '''
+        read the source curve's keys, within the time range if given. The tangent angles
+        and weights are only read for fixed tangents, every other tangent type is
+        recomputed by Maya from the neighbouring keys exactly as pasteKey does
+        '''
+        util = OpenMaya.MScriptUtil()
+        weightPtr = util.asDoublePtr()
+        fixed = OpenMayaAnim.MFnAnimCurve.kTangentFixed
+        keys = []
+        for i in range(fnCurve.numKeys()):
+            t = fnCurve.time(i).asUnits(self.uiUnit)
+            if self.time and not self.time[0] <= t <= self.time[1]:
+                continue
+            inType = fnCurve.inTangentType(i)
+            outType = fnCurve.outTangentType(i)
+            tangents = None
+            if inType == fixed or outType == fixed:
+                tangents = []
+                for isIn in (True, False):
+                    angle = OpenMaya.MAngle()
+                    fnCurve.getTangent(i, angle, weightPtr, isIn)
+                    tangents.append((angle.asRadians(), OpenMaya.MScriptUtil.getDouble(weightPtr)))
+            keys.append((t, fnCurve.value(i), inType, outType, tangents,
+                         fnCurve.tangentsLocked(i), fnCurve.weightsLocked(i), fnCurve.isBreakdown(i)))
+        return keys
+
+    def __pasteKeys(self, fnCurve, keys, start, end):
+        '''
+        clear the destination keys as per the paste option then add the new keys,
+        only the key data that differs from a default key is set after the insert
+        '''
+        times = [fnCurve.time(i).asUnits(self.uiUnit) for i in range(fnCurve.numKeys())]
+        if self.option == 'replaceCompletely':
+            remove = range(len(times))
+        elif self.option == 'replace':
+            remove = [i for i, t in enumerate(times) if start - 0.000001 <= t <= end + 0.000001]
+        else:
+            if self.option == 'insert':
+                # shift the keys after the paste time by the pasted range, last first so we never collide
+                for i in reversed(range(len(times))):
+                    if times[i] >= start - 0.000001:
+                        times[i] += end - start
+                        fnCurve.setTime(i, OpenMaya.MTime(times[i], self.uiUnit), self.change)
+            pasted = set([round(key[0], 6) for key in keys])
+            remove = [i for i, t in enumerate(times) if round(t, 6) in pasted]
+        for i in reversed(remove):
+            fnCurve.remove(i, self.change)
+
+        for t, value, inType, outType, tangents, tangentsLocked, weightsLocked, breakdown in keys:
+            # addKey sets the tangent types and hands back the index of the new key
+            index = fnCurve.addKey(OpenMaya.MTime(t, self.uiUnit), value, inType, outType, self.change)
+            if tangents:
+                fnCurve.setTangentsLocked(index, False, self.change)
+                fnCurve.setWeightsLocked(index, False, self.change)
+                fnCurve.setTangent(index, OpenMaya.MAngle(tangents[0][0]), tangents[0][1], True, self.change)
+                fnCurve.setTangent(index, OpenMaya.MAngle(tangents[1][0]), tangents[1][1], False, self.change)
+                fnCurve.setTangentsLocked(index, tangentsLocked, self.change)
+                fnCurve.setWeightsLocked(index, weightsLocked, self.change)
+            else:
+                if not fnCurve.tangentsLocked(index) == tangentsLocked:
+                    fnCurve.setTangentsLocked(index, tangentsLocked, self.change)
+                if not fnCurve.weightsLocked(index) == weightsLocked:
+                    fnCurve.setWeightsLocked(index, weightsLocked, self.change)
+            if breakdown:
+                fnCurve.setIsBreakdown(index, True, self.change)
+
+    def __transfer(self, source, destination, selList):
+        '''
+        transfer a single source curve to the destination plug
+
+        :return: False if the pair can't be processed
+        '''
+        srcObj = OpenMaya.MObject()
+        plug = OpenMaya.MPlug()
+        selList.clear()
+        selList.add(source)
+        selList.getDependNode(0, srcObj)
+        selList.clear()
+        selList.add(destination)
+        selList.getPlug(0, plug)
+        if not srcObj.hasFn(OpenMaya.MFn.kAnimCurve) or plug.isLocked():
+            return False
+        fnSource = OpenMayaAnim.MFnAnimCurve(srcObj)
+        if fnSource.isUnitlessInput():
+            return False
+
+        keys = self.__readKeys(fnSource)
+        if not keys:
+            # nothing in the range, same as a copyKey that returns 0
+            return True
+        if self.time:
+            start, end = self.time
+        else:
+            start, end = keys[0][0], keys[-1][0]
+        start += self.timeOffset
+        end += self.timeOffset
+        if self.timeOffset:
+            keys = [(key[0] + self.timeOffset,) + key[1:] for key in keys]
+
+        fnCurve = OpenMayaAnim.MFnAnimCurve()
+        if plug.isDestination():
+            sources = OpenMaya.MPlugArray()
+            plug.connectedTo(sources, True, False)
+            if not sources.length() or not sources[0].node().hasFn(OpenMaya.MFn.kAnimCurve):
+                return False
+            fnCurve.setObject(sources[0].node())
+            if not fnCurve.animCurveType() == fnSource.animCurveType() or fnCurve.isUnitlessInput():
+                return False
+            created = False
+        else:
+            if not fnCurve.timedAnimCurveTypeForPlug(plug) == fnSource.animCurveType():
+                return False
+            fnCurve.create(plug, self.modifier)
+            self.modifier.doIt()
+            created = True
+
+        if created or self.option == 'replaceCompletely':
+            fnCurve.setIsWeighted(fnSource.isWeighted(), self.change)
+            fnCurve.setPreInfinityType(fnSource.preInfinityType(), self.change)
+            fnCurve.setPostInfinityType(fnSource.postInfinityType(), self.change)
+        elif fnSource.isWeighted() and not fnCurve.isWeighted():
+            fnCurve.setIsWeighted(True, self.change)
+        self.__pasteKeys(fnCurve, keys, start, end)
+        return True
+
+    def doIt(self, args):
+        '''
+        Main call: transfer each source curve to the matching destination plug
+        '''
+        argData = OpenMaya.MArgDatabase(self.syntax(), args)
+        if argData.isFlagSet(self.kOptionFlag):
+            self.option = argData.flagArgumentString(self.kOptionFlag, 0)
+            if self.option not in self.kOptions:
+                raise ValueError('TransferAnimCurves : unsupported option "%s", valid options : %s' % (self.option, self.kOptions))
+        if argData.isFlagSet(self.kTimeFlag):
+            self.time = (argData.flagArgumentDouble(self.kTimeFlag, 0), argData.flagArgumentDouble(self.kTimeFlag, 1))
+        if argData.isFlagSet(self.kOffsetFlag):
+            self.timeOffset = argData.flagArgumentDouble(self.kOffsetFlag, 0)
+
+        sources = []
+        destinations = []
+        argList = OpenMaya.MArgList()
+        for i in range(argData.numberOfFlagUses(self.kSourceFlag)):
+            argData.getFlagArgumentList(self.kSourceFlag, i, argList)
+            sources.append(argList.asString(0))
+        for i in range(argData.numberOfFlagUses(self.kDestinationFlag)):
+            argData.getFlagArgumentList(self.kDestinationFlag, i, argList)
+            destinations.append(argList.asString(0))
+        if not len(sources) == len(destinations):
+            raise ValueError('TransferAnimCurves : the number of sources and destinations must match')
+
+        failed = []
+        selList = OpenMaya.MSelectionList()
+        for source, destination in zip(sources, destinations):
+            try:
+                if not self.__transfer(source, destination, selList):
+                    failed.append(destination)
+            except RuntimeError:
+                failed.append(destination)
+
+        # set the returns
+        OpenMayaMPx.MPxCommand.clearResult()
+        for name in failed:
+            OpenMayaMPx.MPxCommand.appendToResult(name)
+
+    def redoIt(self):
+        self.modifier.doIt()
+        self.change.redoIt()
+
+    def undoIt(self):
+        self.change.undoIt()
+        self.modifier.undoIt()
+
+    @classmethod
+    def cmdCreator(cls):
+        # Create the command
+        return OpenMayaMPx.asMPxPtr(TransferAnimCurves())
+
+    # Syntax creator : Builds the argument strings up for the command
+    @classmethod
+    def syntaxCreator(cls):
+        syntax = OpenMaya.MSyntax()
+        syntax.addFlag(cls.kSourceFlag, cls.kSourceLongFlag, OpenMaya.MSyntax.kString)
+        syntax.addFlag(cls.kDestinationFlag, cls.kDestinationLongFlag, OpenMaya.MSyntax.kString)
+        syntax.addFlag(cls.kOptionFlag, cls.kOptionLongFlag, OpenMaya.MSyntax.kString)
+        syntax.addFlag(cls.kTimeFlag, cls.kTimeLongFlag, OpenMaya.MSyntax.kDouble, OpenMaya.MSyntax.kDouble)
+        syntax.addFlag(cls.kOffsetFlag, cls.kOffsetLongFlag, OpenMaya.MSyntax.kDouble)
+        syntax.makeFlagMultiUse(cls.kSourceFlag)
+        syntax.makeFlagMultiUse(cls.kDestinationFlag)
+        return syntax
+
+
+# Initialize the plug-in
+def initializePlugin(mobject):
+    mplugin = OpenMayaMPx.MFnPlugin(mobject, "Red9", "1.0", "Any")
+    try:
+        mplugin.registerCommand(TransferAnimCurves.kPluginCmdName, TransferAnimCurves.cmdCreator, TransferAnimCurves.syntaxCreator)
+    except:
+        sys.stderr.write("Failed to register command: %s\n" % TransferAnimCurves.kPluginCmdName)
+        raise
+
+# Uninitialize the plug-in
+def uninitializePlugin(mobject):
+    mplugin = OpenMayaMPx.MFnPlugin(mobject)
+    try:
+        mplugin.deregisterCommand(TransferAnimCurves.kPluginCmdName)
+    except:
+        sys.stderr.write("Failed to unregister command: %s\n" % TransferAnimCurves.kPluginCmdName)
+        raise
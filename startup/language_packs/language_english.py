@@ -482,6 +482,10 @@ checkBoxes will process all children of the roots'''
     pose_rmb_update_thumb = 'Update : Thumb Only'
     pose_rmb_add_subfolder = 'Add Subfolder'
     pose_rmb_refresh = 'Refresh List'
+    pose_rmb_filter = 'Filter Poses'
+    pose_rmb_filter_nodes = 'Filter : Poses containing the selected nodes'
+    pose_rmb_filter_metarig = 'Filter : Poses stored from the selected mRig'
+    pose_rmb_filter_author = 'Filter : My poses only'
     pose_rmb_openfile = 'Open Pose File'
     pose_rmb_opendir = 'Open Pose Directory'
     pose_rmb_compare = 'Pro : PoseCompare'
@@ -20,14 +20,41 @@ import maya.standalone
 maya.standalone.initialize(name='python')
 
 import Red9.core.Red9_AnimationUtils as r9Anim
+import Red9.core.Red9_CoreUtils as r9Core
 import Red9.startup.setup as r9Setup
 import maya.cmds as cmds
 import os
+import time
+import math
 # r9Setup.start(Menu=False)
 
 # force the upAxis, just in case
 r9Setup.mayaUpAxis('y')
 
+
+def _animCurve_get_bounds_reference(curve):
+    '''
+    the original per curve keyframe query and floatIsEqual scan, used to benchmark and
+    validate the vectorised animCurve_range_analysis
+    '''
+    keyList = cmds.keyframe(curve, q=True, vc=True, tc=True)
+    keydata = zip(keyList[0::2], keyList[1::2])
+    minV = keydata[0]
+    maxV = keydata[-1]
+    bounds = [minV[0], maxV[0]]
+    for t, v in keydata:
+        if not r9Core.floatIsEqual(minV[1], v, 0.001):
+            break
+        bounds[0] = t
+    for t, v in reversed(keydata):
+        if not r9Core.floatIsEqual(maxV[1], v, 0.001):
+            break
+        bounds[1] = t
+    if bounds[0] == maxV[0]:
+        return []
+    return bounds
+
+
 class Test_MirrorSetups(object):
     def setup(self):
 
@@ -120,4 +147,364 @@ class Test_base_functions(object):
     def test_timeLineRangeProcess(self):
         assert r9Anim.timeLineRangeProcess(1.0, 10.0, 1) == [1, 2, 3, 4, 5, 6, 7, 8, 9, 10.0]
         assert r9Anim.timeLineRangeProcess(1.0, 10.15, 1) == [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 10.15]
+
+    def test_keyTimeIndex(self):
+        cubeA = cmds.polyCube(n='cubeA')[0]
+        cubeB = cmds.polyCube(n='cubeB')[0]
+        cubeC = cmds.polyCube(n='cubeC')[0]
+        for frm in (1, 5, 12, 20):
+            cmds.setKeyframe(cubeA, at='tx', t=frm, v=frm)
+        for frm in (3, 5, 30):
+            cmds.setKeyframe(cubeB, at='ry', t=frm, v=frm)
+
+        index = r9Anim.KeyTimeIndex([cubeA, cubeB, cubeC], time=(1, 25))
+        assert index.keyTimes() == [1, 3, 5, 12, 20]
+        assert index.keyTimes(cubeA) == [1, 5, 12, 20]
+        assert index.keyTimes(cubeB, step=-1) == [5, 3]
+        assert index.keyTimes([cubeA, cubeB], start=4, end=15) == [5, 12]
+        assert index.hasKey(cubeA, 12)
+        assert not index.hasKey(cubeA, 3)
+        assert cubeB in index
+        assert cubeC not in index
+
+        # timeLineRangeProcess with and without a pre-built index should match
+        assert r9Anim.timeLineRangeProcess(1, 25, 1, nodes=[cubeA, cubeB]) == [1, 3, 5, 12, 20]
+        assert r9Anim.timeLineRangeProcess(1, 25, 1, nodes=[cubeA], keyIndex=index) == [1, 5, 12, 20]
+        assert r9Anim.timeLineRangeProcess(1, 25, -1, keyIndex=index) == [20, 12, 5, 3, 1]
+        # no keys found reverts to the base range
+        assert r9Anim.timeLineRangeProcess(1, 5, 1, nodes=[cubeC]) == [1, 2, 3, 4, 5]
     
+
+
+class Test_SnapBake(object):
+
+    def setup(self):
+        cmds.file(new=True, f=True)
+        # animated source hierarchy
+        self.srcRoot = cmds.group(em=True, name='srcRoot')
+        self.srcChild = cmds.group(em=True, name='srcChild', parent=self.srcRoot)
+        cmds.setAttr('%s.translate' % self.srcChild, 0, 5, 2)
+        for frm, value in ((1, 0), (10, 45), (20, -30), (30, 120)):
+            cmds.setKeyframe(self.srcRoot, at='translateX', t=frm, v=value * 0.1)
+            cmds.setKeyframe(self.srcRoot, at='rotateY', t=frm, v=value)
+            cmds.setKeyframe(self.srcChild, at='rotateX', t=frm, v=-value)
+            cmds.setKeyframe(self.srcChild, at='rotateZ', t=frm, v=value * 0.5)
+
+        # matching destination hierarchies with offset pivots and rotateOrders
+        self.dests = {}
+        for name in ('bulk', 'legacy'):
+            root = cmds.group(em=True, name='%sRoot' % name)
+            child = cmds.group(em=True, name='%sChild' % name, parent=root)
+            cmds.setAttr('%s.rotateOrder' % root, 2)
+            cmds.setAttr('%s.rotateOrder' % child, 4)
+            cmds.setAttr('%s.rotatePivot' % child, 1, 2, 0)
+            cmds.setAttr('%s.scalePivot' % child, 1, 2, 0)
+            self.dests[name] = (root, child)
+
+    def teardown(self):
+        cmds.file(new=True, f=True)
+
+    def snap(self, name, bulkBake):
+        root, child = self.dests[name]
+        r9Anim.AnimFunctions().snapTransform(nodes=[self.srcRoot, root, self.srcChild, child],
+                                             time=(1, 30), iterations=2, preCopyKeys=False,
+                                             preCopyAttrs=False, bulkBake=bulkBake)
+
+    def test_bulkBake(self):
+        start = time.clock()
+        self.snap('legacy', False)
+        legacy = time.clock() - start
+        start = time.clock()
+        self.snap('bulk', True)
+        bulk = time.clock() - start
+        print 'snapTransform : legacy %fs : bulkBake %fs' % (legacy, bulk)
+
+        assert cmds.keyframe('bulkChild', at='rotateX', q=True, kc=True) == 30
+        assert cmds.keyframe('bulkRoot', at='translateX', q=True, kc=True) == 30
+        for frm in (1, 7, 15, 22, 30):
+            cmds.currentTime(frm)
+            srcPivot = cmds.xform(self.srcChild, q=True, ws=True, rp=True)
+            for a, b in zip(cmds.xform('bulkChild', q=True, ws=True, rp=True), srcPivot):
+                assert abs(a - b) < 0.001
+            for node in ('Root', 'Child'):
+                for a, b in zip(cmds.xform('bulk%s' % node, q=True, ws=True, m=True),
+                                cmds.xform('legacy%s' % node, q=True, ws=True, m=True)):
+                    assert abs(a - b) < 0.001
+
+    def test_bulkBake_fallback(self):
+        # sources parented under the destinations can't be solved in memory
+        engine = r9Anim.SnapBakeEngine([('bulkRoot', 'legacyRoot'), ('srcChild', 'srcRoot')])
+        assert not engine.isSupported()
+        engine = r9Anim.SnapBakeEngine([(self.srcRoot, 'bulkRoot'), (self.srcChild, 'bulkChild')])
+        assert engine.isSupported()
+        # sources driven by a destination outside of the dag, via a constraint on a source parent
+        driver = cmds.group(em=True, name='driver')
+        cmds.parent(self.srcRoot, driver)
+        cmds.pointConstraint('legacyChild', driver)
+        engine = r9Anim.SnapBakeEngine([(self.srcRoot, 'bulkRoot'), (self.srcChild, 'legacyChild')])
+        assert not engine.isSupported()
+        engine = r9Anim.SnapBakeEngine([(self.srcRoot, 'bulkRoot'), (self.srcChild, 'bulkChild')])
+        assert engine.isSupported()
+
+    def test_bulkBake_fallback_spaceSwitch(self):
+        # a destination's parent space constrained to another destination outside of the dag chain
+        space = cmds.group(em=True, name='spaceGrp')
+        cmds.parent('bulkChild', space)
+        engine = r9Anim.SnapBakeEngine([(self.srcRoot, 'bulkRoot'), (self.srcChild, 'bulkChild')])
+        assert engine.isSupported()
+        cmds.parentConstraint('bulkRoot', space, mo=True)
+        engine = r9Anim.SnapBakeEngine([(self.srcRoot, 'bulkRoot'), (self.srcChild, 'bulkChild')])
+        assert not engine.isSupported()
+        # constrained to a node that isn't being baked is fine
+        engine = r9Anim.SnapBakeEngine([(self.srcChild, 'bulkChild')])
+        assert engine.isSupported()
+        # the frame by frame fallback still matches the sources
+        self.snap('bulk', True)
+        for frm in (1, 15, 30):
+            cmds.currentTime(frm)
+            for a, b in zip(cmds.xform('bulkChild', q=True, ws=True, rp=True),
+                            cmds.xform(self.srcChild, q=True, ws=True, rp=True)):
+                assert abs(a - b) < 0.001
+
+    def test_bulkBake_joints(self):
+        # joint chains, jointOrients and segmentScaleCompensate through the bulk solve
+        cmds.select(cl=True)
+        srcJoints = [cmds.joint(n='srcJnt%i' % i, p=(0, i * 2, i)) for i in range(3)]
+        for jnt in srcJoints:
+            for frm, value in ((1, 0), (10, 40), (20, -25), (30, 90)):
+                cmds.setKeyframe(jnt, at='rotateZ', t=frm, v=value)
+                cmds.setKeyframe(jnt, at='rotateX', t=frm, v=value * 0.5)
+        cmds.setKeyframe(srcJoints[0], at='scaleY', t=1, v=1)
+        cmds.setKeyframe(srcJoints[0], at='scaleY', t=30, v=1.5)
+        chains = {}
+        for name in ('bulk', 'legacy'):
+            cmds.select(cl=True)
+            chains[name] = [cmds.joint(n='%sJnt%i' % (name, i), p=(i, i * 2, 0)) for i in range(3)]
+            cmds.joint(chains[name][0], e=True, oj='xyz', sao='zup', ch=True, zso=True)
+            cmds.setAttr('%s.rotateOrder' % chains[name][1], 3)
+        for name, bulkBake in (('legacy', False), ('bulk', True)):
+            nodes = []
+            for src, dest in zip(srcJoints, chains[name]):
+                nodes.extend([src, dest])
+            r9Anim.AnimFunctions().snapTransform(nodes=nodes, time=(1, 30), iterations=2, preCopyKeys=False,
+                                                 preCopyAttrs=False, bulkBake=bulkBake)
+        for frm in (1, 8, 15, 23, 30):
+            cmds.currentTime(frm)
+            for bulk, legacy in zip(chains['bulk'], chains['legacy']):
+                for a, b in zip(cmds.xform(bulk, q=True, ws=True, m=True),
+                                cmds.xform(legacy, q=True, ws=True, m=True)):
+                    assert abs(a - b) < 0.001
+
+    def test_snapTransforms_multiPair(self):
+        r9Anim.checkRunTimeCmds()
+        cmds.undoInfo(state=True)
+        cmds.currentTime(10)
+        matrices = cmds.SnapTransforms(source=[self.srcRoot, self.srcChild],
+                                       destination=['bulkRoot', 'bulkChild'],
+                                       returnMatrices=True)
+        assert len(matrices) == 32
+        for a, b in zip(matrices[16:], cmds.xform('bulkChild', q=True, ws=True, m=True)):
+            assert abs(a - b) < 0.0001
+        for a, b in zip(cmds.xform('bulkRoot', q=True, ws=True, rp=True),
+                        cmds.xform(self.srcRoot, q=True, ws=True, rp=True)):
+            assert abs(a - b) < 0.0001
+        # single undo entry restores all the destinations
+        cmds.undo()
+        assert cmds.getAttr('bulkRoot.translate')[0] == (0.0, 0.0, 0.0)
+        assert cmds.getAttr('bulkChild.rotate')[0] == (0.0, 0.0, 0.0)
+
+
+class Test_animCurveRange(object):
+
+    def setup(self):
+        cmds.file(new=True, f=True)
+        self.cube = cmds.polyCube(n='cube')[0]
+        # static run, animated 5-15, then static again
+        for frm, value in ((1, 0), (5, 0), (10, 3), (15, 6), (20, 6)):
+            cmds.setKeyframe(self.cube, at='tx', t=frm, v=value)
+        # fully static curve
+        for frm in (1, 30):
+            cmds.setKeyframe(self.cube, at='ty', t=frm, v=2)
+        # baked curve, a key per frame
+        for frm in range(1, 11):
+            cmds.setKeyframe(self.cube, at='rz', t=frm, v=frm * 2)
+        self.curves = dict([(attr, cmds.listConnections('%s.%s' % (self.cube, attr), type='animCurve')[0])
+                            for attr in ('tx', 'ty', 'rz')])
+
+    def teardown(self):
+        cmds.file(new=True, f=True)
+
+    def test_animCurve_get_data(self):
+        data = r9Anim.animCurve_get_data(self.curves.values())
+        assert len(data) == 3
+        times, values = data[self.curves['tx']]
+        assert list(times) == [1, 5, 10, 15, 20]
+        assert list(values) == [0, 0, 3, 6, 6]
+        times, values = data[self.curves['rz']]
+        assert len(times) == 10
+        assert list(values) == [frm * 2 for frm in range(1, 11)]
+
+    def test_animCurve_get_bounds(self):
+        assert r9Anim.animCurve_get_bounds(self.curves['tx']) == [5, 15]
+        assert r9Anim.animCurve_get_bounds(self.curves['tx'], bounds_only=True) == [1, 20]
+        assert r9Anim.animCurve_get_bounds(self.curves['ty']) == []
+        assert r9Anim.animCurve_get_bounds(self.curves['ty'], skip_static=False) == [1, 30]
+        assert r9Anim.animRangeFromNodes(self.cube, setTimeline=False) == (1, 30)
+        assert r9Anim.animRangeFromNodes(self.cube, setTimeline=False, bounds_only=False) == (1, 15)
+
+    def test_animCurve_get_bounds_tolerance(self):
+        # every key is within tolerance of the last key but not all of the first
+        for frm, value in ((1, 0), (2, 0.0016), (3, 0.0008)):
+            cmds.setKeyframe(self.cube, at='tz', t=frm, v=value)
+        curve = cmds.listConnections('%s.tz' % self.cube, type='animCurve')[0]
+        assert r9Anim.animCurve_get_bounds(curve) == [1, 1]
+        times, values = r9Anim.animCurve_get_data(curve)[curve]
+        numpyMod = r9Anim.numpy
+        try:
+            # legacy, non numpy walk has to match
+            r9Anim.numpy = None
+            assert r9Anim._animCurve_bounds(list(times), list(values)) == [1, 1]
+        finally:
+            r9Anim.numpy = numpyMod
+
+    def test_animCurve_range_benchmark(self):
+        '''
+        baked data, 60 curves x 5000 keys, against the original per curve bounds scan
+        '''
+        times = range(1, 5001)
+        curves = []
+        for i in range(10):
+            node = cmds.group(em=True, name='baked%i' % i)
+            for attr in ('tx', 'ty', 'tz', 'rx', 'ry', 'rz'):
+                # static head and tail either side of the animated range
+                values = [0.0] * 500 + [math.sin(t * 0.01 + i) * 10 for t in times[500:4500]] + [5.0] * 500
+                curves.append(r9Anim.setAnimCurveData(node, attr, times, values))
+
+        start = time.clock()
+        results = r9Anim.animCurve_range_analysis(curves=curves)
+        analysisTime = time.clock() - start
+        start = time.clock()
+        golden = dict([(curve, _animCurve_get_bounds_reference(curve)) for curve in curves])
+        referenceTime = time.clock() - start
+        print 'animCurve range 60 x 5000 keys : analysis %f secs, reference %f secs' % (analysisTime, referenceTime)
+        assert results['keys'] == 60 * 5000
+        for curve in curves:
+            assert results['curves'][curve]['animated'] == golden[curve]
+
+    def test_animCurve_range_analysis(self):
+        results = r9Anim.animCurve_range_analysis(nodes=[self.cube])
+        assert results['bounds'] == (1, 30)
+        assert results['animated'] == (1, 15)
+        assert results['static'] == [self.curves['ty']]
+        assert results['keys'] == 17
+        assert results['curves'][self.curves['tx']]['animated'] == [5, 15]
+        assert results['curves'][self.curves['ty']]['static']
+        assert results['curves'][self.curves['rz']]['density'] == 1.0
+
+
+class Test_copyKeys(object):
+
+    def setup(self):
+        cmds.file(new=True, f=True)
+        self.src = cmds.polyCube(n='src')[0]
+        self.api = cmds.polyCube(n='api')[0]
+        self.clipboard = cmds.polyCube(n='clipboard')[0]
+        for frm, value in ((1, 0), (5, 2), (8, 2.5), (12, -1), (20, 4)):
+            cmds.setKeyframe(self.src, at='tx', t=frm, v=value)
+            cmds.setKeyframe(self.src, at='ry', t=frm, v=value * 30)
+        cmds.keyTangent(self.src, at='tx', t=(5, 5), itt='linear', ott='step')
+        cmds.keyTangent(self.src, at='tx', t=(8, 8), ia=30, oa=-15, lock=False)
+        cmds.keyTangent(self.src, at='ry', weightedTangents=True)
+        cmds.keyTangent(self.src, at='ry', t=(12, 12), iw=3, ow=5, weightLock=False)
+        cmds.keyframe(self.src, at='ry', t=(8, 8), breakdown=True)
+        cmds.setInfinity(self.src, at='tx', pri='cycle', poi='oscillate')
+        # existing destination keys to test the paste options against
+        for node in (self.api, self.clipboard):
+            for frm in (0, 6, 10, 30):
+                cmds.setKeyframe(node, at='tx', t=frm, v=-frm)
+
+    def teardown(self):
+        cmds.file(new=True, f=True)
+
+    def curveData(self, node, attr):
+        data = [cmds.keyframe(node, at=attr, q=True, tc=True, vc=True)]
+        for flag in ('itt', 'ott', 'ia', 'oa', 'iw', 'ow', 'lock', 'weightLock'):
+            data.append(cmds.keyTangent(node, at=attr, q=True, **{flag: True}))
+        data.append(cmds.keyTangent(node, at=attr, q=True, weightedTangents=True))
+        data.append(cmds.keyframe(node, at=attr, q=True, breakdown=True))
+        data.append(cmds.setInfinity(node, at=attr, q=True, pri=True, poi=True))
+        return data
+
+    def compareCurves(self, **kws):
+        r9Anim.AnimFunctions().copyKeys(nodes=[self.src, self.api], apiTransfer=True, **kws)
+        r9Anim.AnimFunctions().copyKeys(nodes=[self.src, self.clipboard], apiTransfer=False, **kws)
+        for attr in ('tx', 'ry'):
+            for a, b in zip(self.curveData(self.api, attr), self.curveData(self.clipboard, attr)):
+                if a and isinstance(a[0], float):
+                    assert len(a) == len(b)
+                    for x, y in zip(a, b):
+                        assert abs(x - y) < 0.0001
+                else:
+                    assert a == b
+
+    def test_copyKeys_replace(self):
+        self.compareCurves()
+
+    def test_copyKeys_time_offset(self):
+        self.compareCurves(time=(4, 13), timeOffset=10)
+
+    def test_copyKeys_merge(self):
+        self.compareCurves(pasteKey='merge', timeOffset=2)
+
+    def test_copyKeys_insert(self):
+        self.compareCurves(pasteKey='insert', time=(5, 12))
+
+    def test_copyKeys_baked_benchmark(self):
+        '''
+        dense baked curves, 6 channels x 5000 keys, API transfer against the clipboard
+        '''
+        times = range(1, 5001)
+        for i, attr in enumerate(('tx', 'ty', 'tz', 'rx', 'ry', 'rz')):
+            r9Anim.setAnimCurveData(self.src, attr, times, [math.sin(t * 0.01 + i) * 10 for t in times])
+        start = time.clock()
+        r9Anim.AnimFunctions().copyKeys(nodes=[self.src, self.api], apiTransfer=True)
+        apiTime = time.clock() - start
+        start = time.clock()
+        r9Anim.AnimFunctions().copyKeys(nodes=[self.src, self.clipboard], apiTransfer=False)
+        clipboardTime = time.clock() - start
+        print 'copyKeys 6 x 5000 baked keys : apiTransfer %f secs, clipboard %f secs' % (apiTime, clipboardTime)
+        for attr in ('tx', 'ty', 'tz', 'rx', 'ry', 'rz'):
+            assert cmds.keyframe(self.api, at=attr, q=True, kc=True) == 5000
+            for a, b in zip(cmds.keyframe(self.api, at=attr, q=True, tc=True, vc=True),
+                            cmds.keyframe(self.clipboard, at=attr, q=True, tc=True, vc=True)):
+                assert abs(a - b) < 0.0001
+            assert cmds.keyTangent(self.api, at=attr, q=True, itt=True) == cmds.keyTangent(self.clipboard, at=attr, q=True, itt=True)
+
+    def test_copyKeys_animLayer_perPair(self):
+        # only the pair on the animLayer drops back to the clipboard
+        other = cmds.polyCube(n='other')[0]
+        otherDest = cmds.polyCube(n='otherDest')[0]
+        cmds.setKeyframe(other, at='tx', t=1, v=1)
+        cmds.setKeyframe(other, at='tx', t=10, v=5)
+        layer = cmds.animLayer('testLayer')
+        cmds.select(self.src)
+        cmds.animLayer(layer, e=True, addSelectedObjects=True)
+        pairs = r9Anim.AnimFunctions._copyKeys_transfer([(self.src, self.api), (other, otherDest)])
+        assert pairs == [(self.src, self.api, None)]
+        assert cmds.keyframe(otherDest, at='tx', q=True, vc=True) == [1.0, 5.0]
+
+    def test_copyKeys_pairBlend(self):
+        # constraining keyed channels drives them via a pairBlend, not the animCurves directly
+        loc = cmds.spaceLocator(n='driver')[0]
+        cmds.parentConstraint(loc, self.src)
+        assert cmds.listConnections(self.src, s=True, d=False, type='pairBlend')
+        self.compareCurves()
+        assert cmds.keyframe(self.api, at='ry', q=True, kc=True) == 5
+
+    def test_copyKeys_undo(self):
+        cmds.undoInfo(state=True)
+        r9Anim.AnimFunctions().copyKeys(nodes=[self.src, self.api], apiTransfer=True)
+        assert cmds.keyframe(self.api, at='ry', q=True, kc=True) == 5
+        cmds.undo()
+        assert not cmds.keyframe(self.api, at='ry', q=True, kc=True)
+        assert cmds.keyframe(self.api, at='tx', q=True, tc=True) == [0, 6, 10, 30]
@@ -31,6 +31,12 @@ r9Setup.mayaUpAxis('y')
 
 import maya.cmds as cmds
 import os
+import wave
+import shutil
+import tempfile
+import contextlib
+
+from Red9.packages.pydub.pydub import audio_segment
 
 
 class Test_AudioNode(object):
@@ -151,6 +157,45 @@ class Test_BwavHandler(object):
         assert self.audioNode.isCompiled
 
 
+class Test_AudioMixer(object):
+    '''
+    the streaming mixer behind AudioHandler.combineAudio, against the original pydub overlay
+    '''
+    def setup(self):
+        self.path = os.path.join(r9Setup.red9ModulePath(), 'tests', 'testFiles', 'bwav_test.wav')
+        self.tempDir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tempDir, 'combined.wav')
+
+    def teardown(self):
+        shutil.rmtree(self.tempDir)
+
+    def _pydubMix(self, clips, duration):
+        baseTrack = audio_segment.AudioSegment.silent(duration)
+        for path, start, sourceStart, sourceEnd in clips:
+            baseTrack = baseTrack.overlay(audio_segment.AudioSegment.from_wav(path)[sourceStart:sourceEnd], position=start)
+        return baseTrack
+
+    def test_mixAudioClips(self):
+        # no overlaps, so no clipping differences between the numpy and audioop sums
+        clips = [(self.path, 0, 1000, 3000), (self.path, 4000, 0, 8294), (self.path, 13000, 500, 2500)]
+        assert not r9Audio.mixAudioClips(clips, self.output, 14000, blockSize=10000)
+        reference = self._pydubMix(clips, 14000)
+        with contextlib.closing(wave.open(self.output, 'rb')) as wav:
+            assert wav.getframerate() == reference.frame_rate
+            assert wav.getnchannels() == reference.channels
+            assert wav.getsampwidth() == reference.sample_width
+            assert wav.readframes(wav.getnframes()) == reference._data
+
+    def test_mixAudioClips_overlapped(self):
+        clips = [(self.path, 0, 0, 8294), (self.path, 2000, 0, 8294), (os.path.join(self.tempDir, 'missing.wav'), 0, 0, 1000)]
+        assert r9Audio.mixAudioClips(clips, self.output, 9000, blockSize=4096) == [clips[2][0]]
+        reference = self._pydubMix(clips[:2], 9000)
+        with contextlib.closing(wave.open(self.output, 'rb')) as wav:
+            assert wav.getnframes() == reference.frame_count()
+            if not r9Audio.numpy:
+                assert wav.readframes(wav.getnframes()) == reference._data
+
+
 class Test_timecode_converts(object):
     def setup(self):
         cmds.file(new=True, f=True)
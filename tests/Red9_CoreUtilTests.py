@@ -20,6 +20,9 @@ maya.standalone.initialize(name='python')
 
 import maya.cmds as cmds
 import os
+import re
+import random
+import time
 
 import Red9.core.Red9_CoreUtils as r9Core
 import Red9.startup.setup as r9Setup
@@ -451,6 +454,22 @@ class Test_baseFunctions():
         assert isinstance(r9Core.decodeString('ehhehhehe'), str)
         assert isinstance(r9Core.decodeString('5.0'), float)
         assert isinstance(r9Core.decodeString('5'), int)
+        assert r9Core.decodeString('[1, -2.5, u"a"]') == [1, -2.5, u'a']
+        assert r9Core.decodeString(r9Core.configobj.ConfigObj({'block': {'a': '1'}})['block']) == {'a': '1'}
+        assert r9Core.decodeString(2.5) == 2.5  # typed JSON values pass straight through
+        assert r9Core.decodeString('') is None
+
+        # no eval, names and calls are never executed
+        assert r9Core.decodeString('[__import__("os").getcwd()]') is None
+        assert r9Core.decodeString('open("x")') == 'open("x")'
+
+    def test_decodeString_benchmark(self):
+        tokens = [str(round(random.uniform(-180, 180), 3)) for _ in range(500)] + ['0.0', '1.0', 'True'] * 200
+        values = [random.choice(tokens) for _ in range(20000)]  # roughly a 1000 control pose
+        start = time.clock()
+        decoded = [r9Core.decodeString(val) for val in values]
+        print 'decodeString : %i values : %f secs' % (len(values), time.clock() - start)
+        assert all(type(val) in [float, bool] for val in decoded)
 
     def test_filterListByString(self):
         testlist = ['big', 'fat', 'round', 'fluffy', 'redbigfat', 'flufgrub']
@@ -522,6 +541,64 @@ class Test_LockNodes(object):
                                                             'rotateX', 'rotateY', 'rotateZ',
                                                             'scaleX', 'scaleY', 'scaleZ']
 
+
+def _matchNodeLists_reference(nodeListA, nodeListB, matchMethod='stripPrefix', prefix='', suffix=''):
+    '''
+    the original nested-scan matchNodeLists logic for the name based methods, kept
+    as the golden reference for the indexed implementation
+    '''
+    matchedData = []
+    hierarchyB = list(nodeListB)
+    _A_suffix = _B_suffix = suffix
+    _A_prefix = _B_prefix = prefix
+    if matchMethod == 'commonSuffix':
+        _A_suffix = r9Core.common_suffix(nodeListA, suggested=False)
+        _B_suffix = r9Core.common_suffix(nodeListB, suggested=False)
+    if matchMethod == 'commonPrefix':
+        _A_prefix = r9Core.common_prefix(nodeListA, suggested=False)
+        _B_prefix = r9Core.common_prefix(nodeListB, suggested=False)
+    _A_suffix = '%s$' % _A_suffix.upper() if _A_suffix else _A_suffix
+    _B_suffix = '%s$' % _B_suffix.upper() if _B_suffix else _B_suffix
+    _A_prefix = '^%s' % _A_prefix.upper() if _A_prefix else _A_prefix
+    _B_prefix = '^%s' % _B_prefix.upper() if _B_prefix else _B_prefix
+
+    for nodeA in nodeListA:
+        matched = False
+        strippedA = r9Core.nodeNameStrip(nodeA).upper()
+        for nodeB in hierarchyB:
+            if strippedA == r9Core.nodeNameStrip(nodeB).upper():
+                matchedData.append((nodeA, nodeB))
+                hierarchyB.remove(nodeB)
+                matched = True
+                break
+        if matched or matchMethod == 'base':
+            continue
+        for nodeB in hierarchyB:
+            strippedB = r9Core.nodeNameStrip(nodeB).upper()
+            if (_A_prefix or _B_prefix) and \
+                    ((_A_prefix and re.sub(_A_prefix, '', strippedA) == strippedB) or
+                     (_B_prefix and re.sub(_B_prefix, '', strippedB) == strippedA)):
+                matched = True
+            elif (_A_suffix or _B_suffix) and \
+                    ((_A_suffix and re.sub(_A_suffix, '', strippedA) == strippedB) or
+                     (_B_suffix and re.sub(_B_suffix, '', strippedB) == strippedA)):
+                matched = True
+            elif matchMethod == 'stripPrefix' and not _A_prefix and not _B_prefix:
+                matched = strippedA.endswith(strippedB) or strippedB.endswith(strippedA)
+            elif matchMethod == 'stripSuffix' and not _A_suffix and not _B_suffix:
+                matched = strippedA.startswith(strippedB) or strippedB.startswith(strippedA)
+            if matched:
+                matchedData.append((nodeA, nodeB))
+                hierarchyB.remove(nodeB)
+                break
+    return matchedData
+
+def _mocapHierarchy(prefix, count):
+    bones = ['Hips', 'Spine', 'Spine1', 'Spine2', 'Neck', 'Head',
+             'LeftArm', 'LeftForeArm', 'LeftHand', 'RightArm', 'RightForeArm', 'RightHand',
+             'LeftUpLeg', 'LeftLeg', 'LeftFoot', 'RightUpLeg', 'RightLeg', 'RightFoot']
+    return ['|%sHips|%s%s_%i' % (prefix, prefix, bones[i % len(bones)], i) for i in range(count)]
+
 class Test_Matching_CoreFuncs(object):
 
 #    def setup(self):
@@ -571,6 +648,46 @@ class Test_Matching_CoreFuncs(object):
         assert r9Core.matchNodeLists(list1, list2, matchMethod='stripPrefix', prefix='pre_') == [('pre_spine_03', 'spine_03'), ('pre_leg_04', 'leg_04')]
         assert r9Core.matchNodeLists(list1, list2, matchMethod='commonPrefix') ==   [('pre_spine_03', 'spine_03'), ('pre_leg_04', 'leg_04')] 
 
+    def test_matchNodeLists_golden(self):
+        '''
+        the indexed matcher must return exactly what the original nested scan did
+        '''
+        random.seed(9)
+        parts = ['L', 'R', 'Arm', 'Leg', 'Spine', 'Hand', '_', '1', '2', 'Ctrl', 'x', 'X']
+
+        def _name(prefixes, suffixes):
+            return random.choice(['', '|grp|', '|a:grp|b:', 'ref:']) + random.choice(prefixes) + \
+                ''.join(random.choice(parts) for _ in range(random.randint(1, 4))) + random.choice(suffixes)
+
+        for trial in range(500):
+            listA = [_name(['', 'Rig_', 'DRV_'], ['', '_drv', '_DRV']) for _ in range(random.randint(0, 15))]
+            listB = [_name(['', 'Rig_', 'rig_'], ['', '_drv']) for _ in range(random.randint(0, 15))]
+            kws = [{}, {'prefix': 'Rig_'}, {'suffix': '_drv'}][trial % 3]
+            for matchMethod in ['base', 'stripPrefix', 'stripSuffix', 'commonPrefix', 'commonSuffix']:
+                assert r9Core.matchNodeLists(listA, listB, matchMethod=matchMethod, **kws) == \
+                        _matchNodeLists_reference(listA, listB, matchMethod=matchMethod, **kws)
+
+    def test_matchNodeLists_benchmark(self):
+        '''
+        10k node mocap hierarchies, prefixed on one side so every match goes through the stripPrefix rules
+        '''
+        listA = _mocapHierarchy('Take1:', 10000)
+        listB = _mocapHierarchy('Rig_', 10000)
+        random.shuffle(listB)
+
+        start = time.clock()
+        matched = r9Core.matchNodeLists(listA, listB, matchMethod='stripPrefix')
+        indexedTime = time.clock() - start
+        assert len(matched) == 10000
+        assert all(a.split('_')[-1] == b.split('_')[-1] for a, b in matched)
+
+        # the reference on a 1k slice, the full 10k nested scan runs into minutes
+        start = time.clock()
+        golden = _matchNodeLists_reference(listA[:1000], listB, matchMethod='stripPrefix')
+        referenceTime = time.clock() - start
+        print 'matchNodeLists stripPrefix : indexed 10k : %f secs, reference 1k : %f secs' % (indexedTime, referenceTime)
+        assert r9Core.matchNodeLists(listA[:1000], listB, matchMethod='stripPrefix') == golden
+
     def test_MatchedNodeInputs(self):
         # TODO: Fill Test
         pass  #
@@ -24,6 +24,7 @@ import pymel.core as pm
 import os
 import time
 import Red9.core.Red9_Meta as r9Meta
+import Red9.core.Red9_General as r9General
 from Red9.core.Red9_CoreUtils import floatIsEqual
 
 import Red9.startup.setup as r9Setup
@@ -139,6 +140,34 @@ class Test_MetaCache():
             assert r9Meta.RED9_META_NODECACHE['|cube1'] == n2
 
 
+    def test_cache_callbacks(self):
+        '''
+        the cache is invalidated by the nodeRemoved and nameChanged callbacks
+        rather than by sweeping the entire cache
+        '''
+        a = r9Meta.MetaRig(name='rig')
+        b = r9Meta.MetaClass(name='other')
+        UUID = a._lastUUID
+        assert UUID in r9Meta.RED9_META_NODECACHE
+        r9Meta.RED9_META_CACHE.resetStats()
+
+        # rename is still an O(1) hit via the MObjectHandle index
+        a.rename('renamedRig')
+        assert r9Meta.MetaClass('renamedRig') is a
+        assert r9Meta.getMetaFromCache_byUUID(UUID) is a
+        assert r9Meta.getMetaCacheStats()['hits'] == 2
+
+        # delete via cmds, not the mNode.delete call, the callback should evict the node
+        cmds.lockNode('renamedRig', lock=False)
+        cmds.delete('renamedRig')
+        assert UUID not in r9Meta.RED9_META_NODECACHE
+        assert r9Meta.getMetaCacheStats()['evictions'] == 1
+        assert r9Meta.getMetaFromCache(b.mNode) is b
+        assert len(r9Meta.RED9_META_CACHE) == 1
+
+        cmds.file(new=True, f=True)
+        assert not r9Meta.RED9_META_NODECACHE
+
     def test_joshs_bastard_error(self):
         '''
         make mnode
@@ -534,6 +563,122 @@ class Test_MetaClass():
         self.MClass.newTest = 4
         assert self.MClass.newTest == 4
 
+    def test_getAttrs_setAttrs(self):
+        self.MClass.addAttr('floatTest', 1.0)
+        self.MClass.addAttr('stringTest', 'hello')
+        self.MClass.addAttr('jsonTest', {'a': 1, 'b': [1, 2]})
+        self.MClass.addAttr('enumTest', enumName='A:B:C', attrType='enum')
+        self.MClass.addAttr('vecTest', (1.0, 2.0, 3.0), attrType='double3')
+        cmds.polyCube(n='cube1')
+        self.MClass.connectChild('cube1', 'msgTest')
+        self.MClass.pyAttr = 'python'
+
+        attrs = ['floatTest', 'stringTest', 'jsonTest', 'enumTest', 'vecTest', 'msgTest', 'pyAttr', 'mNodeID']
+        data = self.MClass.getAttrs(attrs)
+        assert sorted(data.keys()) == sorted(attrs)
+        # bulk return must match the standard getattr
+        for attr in attrs:
+            assert data[attr] == getattr(self.MClass, attr)
+        assert data['jsonTest'] == {'a': 1, 'b': [1, 2]}
+        assert data['vecTest'] == (1.0, 2.0, 3.0)
+        assert data['pyAttr'] == 'python'
+        try:
+            self.MClass.getAttrs(['missingAttr'])
+            assert False
+        except AttributeError:
+            pass
+
+        # set, including a locked attr which should be relocked after
+        self.MClass.attrSetLocked('floatTest', True)
+        assert self.MClass.setAttrs({'floatTest': 5.5,
+                                     'stringTest': 'world',
+                                     'jsonTest': {'c': 3},
+                                     'enumTest': 'C',
+                                     'vecTest': (4.0, 5.0, 6.0),
+                                     'pyAttr': 'changed'}) == {}
+        assert self.MClass.floatTest == 5.5
+        assert self.MClass.attrIsLocked('floatTest')
+        assert self.MClass.stringTest == 'world'
+        assert self.MClass.jsonTest == {'c': 3}
+        assert self.MClass.enumTest == 2
+        assert self.MClass.vecTest == (4.0, 5.0, 6.0)
+        assert self.MClass.pyAttr == 'changed'
+
+        # failures returned in safe mode
+        cmds.connectAttr('cube1.tx', '%s.floatTest' % self.MClass.mNode, f=True)
+        failed = self.MClass.setAttrs({'floatTest': 1.0, 'stringTest': 'safe'}, safe=True)
+        assert failed.keys() == ['floatTest']
+        assert failed['floatTest'].startswith('Traceback')
+        assert self.MClass.stringTest == 'safe'
+
+    def test_decodedComplexCache(self):
+        '''
+        complex JSON string attrs are decoded once and cached until the raw string changes
+        '''
+        data = {'ctrl_%i' % i: {'ID': i, 'attrs': {'tx': i * 0.5, 'rz': [1, 2, 3]}} for i in range(100)}
+        self.MClass.addAttr('poseData', data)
+        assert self.MClass.poseData == data
+        assert 'poseData' in self.MClass._decodedCache
+        cached = self.MClass._decodedCache['poseData']
+
+        # the return is a copy, mutating it mustn't touch the cache
+        pose = self.MClass.poseData
+        pose['ctrl_1']['attrs']['tx'] = 100
+        assert self.MClass.poseData == data
+        assert self.MClass._decodedCache['poseData'] is cached
+
+        # setattr invalidates
+        data['ctrl_1']['ID'] = 'changed'
+        self.MClass.poseData = data
+        assert 'poseData' not in self.MClass._decodedCache
+        assert self.MClass.poseData['ctrl_1']['ID'] == 'changed'
+
+        # direct Maya side edits are caught by the hash
+        cmds.setAttr('%s.poseData' % self.MClass.mNode, '{"a": 1}', type='string')
+        assert self.MClass.poseData == {'a': 1}
+
+        # any JSON decodable string is returned decoded, lists as copies
+        self.MClass.poseData = '[1, 2]'
+        assert self.MClass.poseData == [1, 2]
+        assert self.MClass.getAttrs(['poseData'])['poseData'] == [1, 2]
+        self.MClass.poseData.append(3)
+        assert self.MClass.poseData == [1, 2]
+
+        # non JSON strings are returned raw
+        self.MClass.poseData = 'not json'
+        assert self.MClass.poseData == 'not json'
+
+    def test_attrSchemaCache(self):
+        '''
+        the attr schema is cached per mNode and kept in sync via the attributeChanged callback
+        '''
+        self.MClass.addAttr('schemaTest', 1.0)
+        self.MClass.schemaTest
+        r9Meta.resetAttrSchemaStats()
+        for _ in range(10):
+            assert self.MClass.schemaTest == 1.0
+        stats = r9Meta.getAttrSchemaStats()
+        assert stats['misses'] == 0
+        assert stats['callsSaved'] == 20  # objExists and the getAttr type per read
+
+        # python only attrs are cached as not on the mNode
+        self.MClass.CTRL_Prefix = 'CTRL'
+        assert self.MClass.__attrSchema__('CTRL_Prefix') is False
+
+        # Maya side changes invalidate the schema
+        cmds.setAttr('%s.schemaTest' % self.MClass.mNode, l=True)
+        assert self.MClass.attrIsLocked('schemaTest')
+        self.MClass.schemaTest = 2.0
+        assert self.MClass.schemaTest == 2.0
+        assert self.MClass.attrIsLocked('schemaTest')
+        cmds.setAttr('%s.schemaTest' % self.MClass.mNode, l=False)
+        cmds.deleteAttr('%s.schemaTest' % self.MClass.mNode)
+        assert self.MClass.__attrSchema__('schemaTest') is False
+        cmds.addAttr(self.MClass.mNode, ln='schemaTest', dt='string')
+        self.MClass.schemaTest = 'newType'
+        assert self.MClass.attrType('schemaTest') == 'string'
+        assert self.MClass.schemaTest == 'newType'
+
     def test_lockState(self):
         assert not self.MClass.lockState
         assert not cmds.lockNode(self.MClass.mNode, query=True)[0]
@@ -888,6 +1033,29 @@ class Test_Generic_SearchCalls():
     def teardown(self):
         self.setup()
 
+    def test_CmdsProfiler(self):
+        '''
+        call-count profiler used to track the Maya command hot paths in the meta calls
+        '''
+        getAttr = cmds.getAttr
+        with r9General.CmdsProfiler('getMetaNodes') as profile:
+            r9Meta.getMetaNodes(dataType='node')
+            cmds.getAttr('%s.mClass' % self.metaA.mNode)
+        # everything is restored on exit
+        assert cmds.getAttr is getAttr
+
+        assert profile.callCount('ls', caller='Red9_Meta.getMetaNodes') == 1
+        # the tests are inside the Red9 package so this call is logged against the test itself
+        assert profile.callCount('getAttr', caller='Red9_MetaTests.Test_Generic_SearchCalls.test_CmdsProfiler') == 1
+        assert profile.callCount('MSelectionList.add') >= 5  # bulk classify of the mNodes
+        assert profile.report().startswith('getMetaNodes : ')
+
+        # diff 2 runs
+        data = profile.toDict()
+        with r9General.CmdsProfiler('getMetaNodes') as profileB:
+            r9Meta.getMetaNodes(dataType='node')
+        assert r9General.CmdsProfiler.compare(data, profileB) == {'Red9_MetaTests.Test_Generic_SearchCalls.test_CmdsProfiler': {'getAttr': -1}}
+
     def test_isMetaNode(self):
         assert r9Meta.isMetaNode('MetaRig_Test')
         assert r9Meta.isMetaNode(self.metaA)
@@ -964,6 +1132,27 @@ class Test_Generic_SearchCalls():
         # TODO: Fill Test
         pass
 
+    def test_getMClassDataFromNodes(self):
+        cube1 = cmds.ls(cmds.polyCube()[0], l=True)[0]
+        data = r9Meta.getMClassDataFromNodes(['MetaRig_Test', 'MetaFacialRig_Test', cube1])
+        assert data['MetaRig_Test'] == ('MetaRig', 'MetaRig', True)
+        assert data['MetaFacialRig_Test'][0] == 'MetaFacialRig'
+        assert data[cube1] == (None, None, False)
+        for node in ['MetaRig_Test', 'MetaFacialRig_Test', cube1]:
+            assert data[node][0] == r9Meta.getMClassDataFromNode(node)
+
+    def test_filterMetaNodes(self):
+        nodes = cmds.ls(type='network')
+        assert sorted(r9Meta.filterMetaNodes(nodes, mInstances='MetaRig')) == ['MetaFacialRig_Test', 'MetaRig_Test']
+        assert r9Meta.filterMetaNodes(nodes, mTypes='MetaRig') == ['MetaRig_Test']
+        assert r9Meta.filterMetaNodes(nodes, mInstances='MetaRig', skipTypes='MetaFacialRig') == ['MetaRig_Test']
+        assert r9Meta.filterMetaNodes(nodes, mTypes='MonkeyBollox') == []
+        assert r9Meta.filterMetaNodes(nodes, mInstances='MetaRig', mClassGrps='MetaRig') == ['MetaRig_Test']
+        assert r9Meta.filterMetaNodes(nodes, mSystemRoot=True) == r9Meta.filterMetaNodes(nodes, mInstances='MetaRig')
+        # bulk filter must match the per-node tests
+        assert sorted(r9Meta.filterMetaNodes(nodes, mInstances='MetaClass')) == \
+            sorted([n for n in nodes if r9Meta.isMetaNodeInherited(n, 'MetaClass')])
+
 class Test_MetaRig():
 
     def setup(self):
@@ -1151,6 +1340,20 @@ class Test_MetaRig():
     def test_getNodeConnectionMetaDataMap(self):
         assert self.mRig.getNodeConnectionMetaDataMap('|World_Ctrl|L_Foot_grp|L_Foot_Ctrl') == {'metaAttr': u'CTRL_L_Foot', 'metaNodeID': u'L_LegSystem'}
 
+    def test_getNodeConnectionMetaDataMaps(self):
+        nodes = ['|World_Ctrl|L_Foot_grp|L_Foot_Ctrl', '|World_Ctrl|COG__Ctrl|Chest_Ctrl', '|World_Ctrl|L_Foot_grp']
+        data = self.mRig.getNodeConnectionMetaDataMaps(nodes)
+        assert sorted(data.keys()) == sorted(nodes)
+        # batched return must match the single node call
+        for node in nodes[:2]:
+            assert data[node] == self.mRig.getNodeConnectionMetaDataMap(node)
+        assert data['|World_Ctrl|L_Foot_grp|L_Foot_Ctrl'] == {'metaAttr': u'CTRL_L_Foot', 'metaNodeID': u'L_LegSystem'}
+        assert data['|World_Ctrl|L_Foot_grp'] == {}
+
+        # clamp to given mNodes / mTypes
+        assert r9Meta.getNodeConnectionMetaDataMaps(nodes, mNodes=['R_LegSystem'])[nodes[0]] == {}
+        assert r9Meta.getNodeConnectionMetaDataMaps(nodes, mTypes=['MetaRigSupport'])[nodes[0]] == {}
+
     def test_getNodeConnectionMetaDataMap_mTypes(self):
         # TODO: Fill Test
         # assert self.mRig.getNodeConnectionMetaDataMap(mTypes=??)
@@ -1325,6 +1528,33 @@ class Test_SpeedTesting():
 
 
 
+    def test_MetaCache_scaling(self):
+        '''
+        instantiate 5k mNodes, then pull them all back from the cache. The cache
+        lookups are O(1) so the second pass should scale linearly with the node count
+        '''
+        nodes = []
+        for i in range(5000):
+            nodes.append(r9Meta.MetaClass(name='a%s' % i, autofill=False).mNode)
+        r9Meta.resetCache()
+        r9Meta.RED9_META_CACHE.resetStats()
+
+        now = time.clock()
+        c = [r9Meta.MetaClass(p, autofill=False) for p in nodes]
+        print 'SPEED: Meta Nodes : 5k fresh instances : %s' % str(time.clock() - now)
+        assert r9Meta.getMetaCacheStats()['size'] == 5000
+
+        now = time.clock()
+        c = [r9Meta.MetaClass(p, autofill=False) for p in nodes]
+        print 'SPEED: Meta Nodes : 5k from Cache : %s' % str(time.clock() - now)
+        print 'CACHE STATS : %s' % r9Meta.getMetaCacheStats()
+        assert r9Meta.getMetaCacheStats()['hits'] == 5000
+
+        cmds.delete(nodes[:1000])
+        assert r9Meta.getMetaCacheStats()['size'] == 4000
+        assert r9Meta.getMetaCacheStats()['evictions'] == 1000
+
+
 class Test_MetaNetworks():
     '''
     Test the network walking and get commands on a larger network
@@ -1360,37 +1590,46 @@ class Test_MetaNetworks():
     def test_getChildMetaNodes(self):
         '''
         note that the order of this is important as the return is
-        managed by the depth of the connections
+        managed by the depth of the connections, within a given depth
+        the order is that of the connections so we test per depth
         '''
-        nodes = self.mRig.getChildMetaNodes(walk=True)
-        assert [node.mNodeID for node in nodes] == ['R_Leg_System',
-                                                 'L_Leg_System',
-                                                 'C_Spine_System',
-                                                 'L_Toes_System',
-                                                 'L_Arm_System',
-                                                 'R_Toes_System',
-                                                 'R_Arm_System',
-                                                 'L_other_System',
-                                                 'R_other_System',
-                                                 'L_Arm_Support',
-                                                 'R_Arm_Support',
-                                                 'R_Fingers_System',
-                                                 'L_Fingers_System']
-
-        nodes = self.mRig.C_Spine_System.getChildMetaNodes(walk=True)
-        assert [node.mNodeID for node in nodes] == ['R_Arm_System',
-                                                 'L_Arm_System',
-                                                 'R_other_System',
-                                                 'L_other_System',
-                                                 'R_Arm_Support',
-                                                 'L_Arm_Support',
-                                                 'L_Fingers_System',
-                                                 'R_Fingers_System']
+        nodes = [node.mNodeID for node in self.mRig.getChildMetaNodes(walk=True)]
+        assert len(nodes) == 13
+        assert sorted(nodes[:3]) == ['C_Spine_System', 'L_Leg_System', 'R_Leg_System']
+        assert sorted(nodes[3:7]) == ['L_Arm_System', 'L_Toes_System', 'R_Arm_System', 'R_Toes_System']
+        assert sorted(nodes[7:11]) == ['L_Arm_Support', 'L_other_System', 'R_Arm_Support', 'R_other_System']
+        assert sorted(nodes[11:]) == ['L_Fingers_System', 'R_Fingers_System']
+
+        nodes = [node.mNodeID for node in self.mRig.C_Spine_System.getChildMetaNodes(walk=True)]
+        assert len(nodes) == 8
+        assert sorted(nodes[:2]) == ['L_Arm_System', 'R_Arm_System']
+        assert sorted(nodes[2:6]) == ['L_Arm_Support', 'L_other_System', 'R_Arm_Support', 'R_other_System']
+        assert sorted(nodes[6:]) == ['L_Fingers_System', 'R_Fingers_System']
 
         nodes = self.mRig.C_Spine_System.getChildMetaNodes(walk=False)
         assert [node.mNodeID for node in nodes] == ['R_Arm_System', 'L_Arm_System']
 
 
+    def test_MetaNetwork(self):
+        network = r9Meta.MetaNetwork()
+        assert 'MetaRig' in network
+        assert len(network) == 14
+        assert sorted(network.children['C_Spine_System']) == ['L_Arm_System', 'R_Arm_System']
+        assert 'L_Fingers_System' not in network.children
+
+        # the snapshot is reusable across walks and matches a fresh walk
+        assert self.mRig.getChildMetaNodes(walk=True, network=network) == self.mRig.getChildMetaNodes(walk=True)
+        assert [n.mNodeID for n in self.mRig.C_Spine_System.L_Arm_System.getChildMetaNodes(walk=True, network=network,
+                                                                                            mAttrs=['systemType=Fingers'],
+                                                                                            stepover=True)] == ['L_Fingers_System']
+
+        # currentSystem clamps the walk at any child mSystemRoot and all its children
+        self.mRig.C_Spine_System.addAttr('mSystemRoot', True)
+        network.snapshot()
+        nodes = [n.mNodeID for n in self.mRig.getChildMetaNodes(walk=True, currentSystem=True, network=network)]
+        assert sorted(nodes) == ['L_Leg_System', 'L_Toes_System', 'R_Leg_System', 'R_Toes_System']
+        assert [n.mNodeID for n in self.mRig.getChildSystemRoots(network=network)] == ['C_Spine_System']
+
     def test_getParentSystems(self):
         assert r9Meta.getConnectedMetaSystemRoot('L_Fingers_System').mNode == 'MetaRig'
         assert r9Meta.getConnectedMetaSystemRoot('L_Toes_System').mNode == 'MetaRig'
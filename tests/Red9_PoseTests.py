@@ -17,11 +17,17 @@ maya.standalone.initialize(name='python')
 
 import maya.cmds as cmds
 import os
+import time
+import json
+import random
+import shutil
+import tempfile
 
 # import Red9_Meta as r9Meta
 import Red9.core.Red9_Meta as r9Meta
 import Red9.core.Red9_CoreUtils as r9Core
 import Red9.core.Red9_PoseSaver as r9Pose
+import Red9.core.Red9_AnimationUtils as r9Anim
 
 import Red9.startup.setup as r9Setup
 # r9Setup.start(Menu=False, loadclients=['Testing'])  # this gets called by the Maya boot sequence anyway!!!!
@@ -339,3 +345,550 @@ class Test_PoseData_loaders():
         assert r9Pose.PoseCompare(self.poseData, os.path.join(self.poseFolder, 'jump_f9_absolute29.pose'), compareDict='poseDict').compare()
 
 
+class Test_PoseDataFormats():
+    '''
+    round trip the DataMap through the 3 supported dataformats, 'config', 'json' and 'binary'
+    '''
+    def setup(self):
+        cmds.file(os.path.join(r9Setup.red9ModulePath(), 'tests', 'testFiles', 'MetaRig_anim_jump.mb'), open=True, f=True)
+        self.mRig = r9Meta.getMetaNodes(mTypes=r9Meta.MetaRig)[0]
+        self.poseFolder = getPoseFolder()
+        self.filepath = os.path.join(self.poseFolder, 'jump_formatUnitTest.pose')
+        self.filterNode = r9Core.FilterNode_Settings()
+        self.filterNode.read(red9MetaRigConfig)
+        cmds.currentUnit(time='ntscf')
+
+    def teardown(self):
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
+
+    def test_dataformatRoundTrip(self):
+        cmds.currentTime(218)
+        for dataformat in ['config', 'json', 'binary']:
+            poseData = r9Pose.PoseData(self.filterNode)
+            poseData.dataformat = dataformat
+            poseData.saveData(self.mRig.mNode, filepath=self.filepath, storeThumbnail=False)
+            assert poseData._dataformat_resolved == dataformat
+            assert r9Pose.isBinaryDataMap(self.filepath) == (dataformat == 'binary')
+
+            reloaded = r9Pose.PoseData()
+            reloaded.dataformat = dataformat
+            reloaded._readPose(self.filepath)
+            assert reloaded._dataformat_resolved == dataformat
+            assert sorted(reloaded.poseDict.keys()) == sorted(poseData.poseDict.keys())
+            assert reloaded.infoDict['author'] == poseData.infoDict['author']
+            assert r9Pose.PoseCompare(reloaded, os.path.join(self.poseFolder, 'jump_f218.pose'), compareDict='poseDict').compare()
+            if not dataformat == 'config':
+                # json and binary are typed so must round trip exactly
+                assert reloaded.poseDict == poseData.poseDict
+                assert reloaded.skeletonDict == poseData.skeletonDict
+
+        # binary files are detected from the header, whatever the dataformat is set to
+        reloaded = r9Pose.PoseData()
+        reloaded._readPose(self.filepath)
+        assert reloaded._dataformat_resolved == 'binary'
+        assert reloaded.settings_internal.metaRig == self.filterNode.metaRig
+
+    def test_binaryBlocks(self):
+        cmds.currentTime(218)
+        poseData = r9Pose.PoseData(self.filterNode)
+        poseData.dataformat = 'binary'
+        poseData.saveData(self.mRig.mNode, filepath=self.filepath, storeThumbnail=False)
+
+        # the info, filterNode_settings and skeletonDict blocks are separately addressable
+        data = r9Pose.readBinaryDataMap(self.filepath, blocks=['info'])
+        assert data.keys() == ['info']
+        assert data['info'] == poseData.infoDict
+        data = r9Pose.readBinaryDataMap(self.filepath, blocks=['filterNode_settings', 'skeletonDict'])
+        assert sorted(data.keys()) == ['filterNode_settings', 'skeletonDict']
+        assert data['skeletonDict'] == poseData.skeletonDict
+
+        # not a binary DataMap
+        assert not r9Pose.isBinaryDataMap(os.path.join(self.poseFolder, 'jump_f218.pose'))
+
+    def test_readCache(self):
+        cache = r9Pose.DATAMAP_READ_CACHE
+        cache.invalidate()
+        hits, misses = cache.hits, cache.misses
+        filepath = self.filepath
+        shutil.copy2(os.path.join(self.poseFolder, 'jump_f218.pose'), filepath)
+
+        poseA = r9Pose.PoseData()
+        poseA._readPose(filepath)
+        poseB = r9Pose.PoseData()
+        poseB._readPose(filepath)
+        assert cache.misses == misses + 1
+        assert cache.hits == hits + 1
+        assert poseA.poseDict == poseB.poseDict
+        poseA.poseDict['L_Wrist_Ctrl']['attrs']['translateX'] = 1000  # each read gets its own copy
+        assert poseB.poseDict['L_Wrist_Ctrl']['attrs']['translateX'] != 1000
+
+        # writing the path invalidates the entry
+        poseA.dataformat = 'json'
+        poseA._writePose(filepath)
+        poseB._readPose(filepath)
+        assert cache.misses == misses + 2
+        assert poseB.poseDict['L_Wrist_Ctrl']['attrs']['translateX'] == 1000
+
+        # memory budget
+        _maxBytes = cache.maxBytes
+        try:
+            cache.maxBytes = 1
+            cache.invalidate(filepath)
+            poseB._readPose(filepath)
+            assert cache.stats()['entries'] == 0
+        finally:
+            cache.maxBytes = _maxBytes
+
+    def test_binaryBenchmark(self):
+        '''
+        1000 control pose, the binary format must be smaller than the JSON and no slower to load
+        '''
+        poseDict = {}
+        for i in range(1000):
+            poseDict['Ctrl_%i' % i] = {'ID': i,
+                                       'longName': '|World_Ctrl|Ctrl_%i' % i,
+                                       'attrs': dict((attr, random.uniform(-180, 180)) for attr in
+                                                     ['translateX', 'translateY', 'translateZ',
+                                                      'rotateX', 'rotateY', 'rotateZ']),
+                                       'attrs_kWorld': {'translation': [random.random() for _ in range(3)],
+                                                        'quaternion': [random.random() for _ in range(4)]}}
+        poseDict['Ctrl_0']['attrs']['visibility'] = True
+        poseDict['Ctrl_0']['attrs']['space'] = 'world'
+
+        jsonPath = os.path.join(self.poseFolder, 'benchmarkUnitTest.json')
+        r9Pose.writeBinaryDataMap(self.filepath, [('info', {}), ('poseData', poseDict)])
+        with open(jsonPath, 'w') as f:
+            f.write(json.dumps({'info': {}, 'poseData': poseDict}))
+        try:
+            start = time.clock()
+            for _ in range(5):
+                data = r9Pose.readBinaryDataMap(self.filepath)
+            binaryTime = time.clock() - start
+            start = time.clock()
+            for _ in range(5):
+                with open(jsonPath, 'r') as f:
+                    json.load(f)
+            jsonTime = time.clock() - start
+            binarySize = os.path.getsize(self.filepath)
+            jsonSize = os.path.getsize(jsonPath)
+            print 'binary : %i bytes, %f secs' % (binarySize, binaryTime)
+            print 'json   : %i bytes, %f secs' % (jsonSize, jsonTime)
+
+            assert data['poseData'] == poseDict
+            assert data['poseData']['Ctrl_0']['attrs']['visibility'] is True
+            assert binarySize < jsonSize
+        finally:
+            os.remove(jsonPath)
+
+
+class Test_PoseLibraryIndex():
+
+    def setup(self):
+        cmds.file(os.path.join(r9Setup.red9ModulePath(), 'tests', 'testFiles', 'MetaRig_anim_jump.mb'), open=True, f=True)
+        self.mRig = r9Meta.getMetaNodes(mTypes=r9Meta.MetaRig)[0]
+        self.poseFolder = tempfile.mkdtemp()
+        for pose in ['jump_f218', 'jump_f9', 'T_Pose']:
+            for ext in ['pose', 'bmp']:
+                shutil.copy2(os.path.join(getPoseFolder(), '%s.%s' % (pose, ext)), self.poseFolder)
+
+    def teardown(self):
+        shutil.rmtree(self.poseFolder)
+
+    def test_indexBuildAndFilter(self):
+        assert not r9Pose.PoseLibraryIndex.hasIndex(self.poseFolder)
+        index = r9Pose.PoseLibraryIndex(self.poseFolder)
+        index.update()
+        assert r9Pose.PoseLibraryIndex.hasIndex(self.poseFolder)
+        assert index.sortedPoses() == ['T_Pose', 'jump_f9', 'jump_f218']
+        entry = index.poses['jump_f218']
+        assert entry['info']['metaRigNodeID'] == 'RED_Rig'
+        assert entry['info']['author'] == 'Red9'
+        assert 'L_Wrist_Ctrl' in entry['nodes']
+        assert 'Right_4' in entry['mirrorIDs']
+        assert entry['thumbnail'] == os.path.join(self.poseFolder, 'jump_f218.bmp')
+
+        # filter purely from the index
+        assert index.filter(searchFilter='jump') == ['jump_f9', 'jump_f218']
+        assert index.filter(searchFilter='jump', nodes=['L_Wrist_Ctrl'], metaRig='RED_Rig') == ['jump_f9', 'jump_f218']
+        assert not index.filter(nodes=['not_a_node'])
+        assert not index.filter(author='not_an_author')
+
+        # reloaded index persists and unchanged poses aren't re-read
+        reloaded = r9Pose.PoseLibraryIndex(self.poseFolder)
+        assert reloaded.poses == json.loads(json.dumps(index.poses))
+        reloaded.update()
+        assert not reloaded._dirty
+
+    def test_indexMaintained(self):
+        index = r9Pose.PoseLibraryIndex(self.poseFolder)
+        index.update()
+
+        # saving into an indexed folder updates the index
+        filepath = os.path.join(self.poseFolder, 'newPose.pose')
+        filterNode = r9Core.FilterNode_Settings()
+        filterNode.read(red9MetaRigConfig)
+        poseData = r9Pose.PoseData(filterNode)
+        poseData.saveData(self.mRig.mNode, filepath=filepath, storeThumbnail=False)
+        index.load()
+        assert 'newPose' in index.poses
+        assert sorted(index.poses['newPose']['nodes']) == sorted(poseData.poseDict.keys())
+
+        # rename and delete
+        os.rename(filepath, os.path.join(self.poseFolder, 'renamedPose.pose'))
+        index.renamePose('newPose', 'renamedPose')
+        assert 'renamedPose' in r9Pose.PoseLibraryIndex(self.poseFolder).poses
+        os.remove(os.path.join(self.poseFolder, 'jump_f9.pose'))
+        index.removePose('jump_f9')
+        assert index.sortedPoses() == ['T_Pose', 'jump_f218', 'renamedPose']
+
+        # a modified pose gets re-indexed on update
+        poseData.saveData(self.mRig.mNode, filepath=os.path.join(self.poseFolder, 'T_Pose.pose'), storeThumbnail=False)
+        index.update()
+        assert index.poses['T_Pose']['size'] == os.path.getsize(os.path.join(self.poseFolder, 'T_Pose.pose'))
+
+    def test_indexReadOnlyFolder(self):
+        cacheDir = r9Pose.PoseLibraryIndex.CACHE_DIR
+        r9Pose.PoseLibraryIndex.CACHE_DIR = tempfile.mkdtemp()
+        os.chmod(self.poseFolder, 0555)
+        try:
+            index = r9Pose.PoseLibraryIndex(self.poseFolder)
+            index.update()
+            assert not index._dirty
+            assert not os.path.exists(index.indexPath)
+            assert os.listdir(r9Pose.PoseLibraryIndex.CACHE_DIR) == [os.path.basename(index._cachePath(self.poseFolder))]
+            assert r9Pose.PoseLibraryIndex.hasIndex(self.poseFolder)
+            assert sorted(r9Pose.PoseLibraryIndex(self.poseFolder).poses.keys()) == ['T_Pose', 'jump_f218', 'jump_f9']
+        finally:
+            os.chmod(self.poseFolder, 0755)
+            shutil.rmtree(r9Pose.PoseLibraryIndex.CACHE_DIR)
+            r9Pose.PoseLibraryIndex.CACHE_DIR = cacheDir
+
+
+class Test_PoseMatching():
+    '''
+    the hash-indexed _matchNodesToPoseData against a synthetic pose
+    '''
+    def setup(self):
+        cmds.file(new=True, f=True)
+        mirror = r9Anim.MirrorHierarchy()
+        self.nodes = []
+        self.poseData = r9Pose.PoseData()
+        for i in range(2000):
+            node = cmds.createNode('transform', name='ctrl_%i' % i)
+            mirror.setMirrorIDs(node, side=['Centre', 'Left', 'Right'][i % 3], slot=i + 1)
+            self.nodes.append('|%s' % node)
+            # the pose keys are stored in reverse order so no match can resolve on position alone
+            self.poseData.poseDict['pose_%i' % i] = {'ID': 1999 - i,
+                                                     'mirrorID': '%s_%i' % (['Centre', 'Left', 'Right'][i % 3], i + 1)}
+
+    def _nestedMatch(self, matchMethod):
+        # the original O(n*m) mirror / index matching, used as the golden reference
+        mirror = r9Anim.MirrorHierarchy()
+        matched = []
+        for i, node in enumerate(self.nodes):
+            mirrorID = mirror.getMirrorCompiledID(node)
+            for key, data in self.poseData.poseDict.items():
+                if matchMethod == 'index' and int(data['ID']) == i:
+                    matched.append((key, node))
+                    break
+                if matchMethod == 'mirrorIndex' and data['mirrorID'] == mirrorID:
+                    matched.append((key, node))
+                    break
+        return matched
+
+    def test_matchMethods(self):
+        for matchMethod in ['index', 'mirrorIndex', 'mirrorIndex_ID']:
+            matched, unmatched = self.poseData._matchNodesToPoseData(self.nodes, matchMethod=matchMethod, returnfails=True)
+            assert len(matched) == 2000
+            assert not unmatched
+            if matchMethod == 'index':
+                assert dict(matched)['pose_10'] == '|ctrl_1989'
+            else:
+                assert dict(matched)['pose_10'] == '|ctrl_10'
+            assert self.poseData.matchReport == {'matchMethod': matchMethod, 'matched': 2000,
+                                                 'unmatchedNodes': [], 'unmatchedKeys': [], 'skippedNodes': []}
+        assert sorted(self.poseData._matchNodesToPoseData(self.nodes[:100], matchMethod='index')) == \
+                sorted(self._nestedMatch('index')[:100])
+
+    def test_unmatchedReport(self):
+        extra = cmds.createNode('transform', name='noMirror')
+        del self.poseData.poseDict['pose_5']
+        matched, unmatched = self.poseData._matchNodesToPoseData(self.nodes + ['|%s' % extra],
+                                                                 matchMethod='mirrorIndex_ID', returnfails=True)
+        assert len(matched) == 1999
+        assert unmatched == ['|ctrl_5']
+        assert self.poseData.matchReport['unmatchedNodes'] == ['|ctrl_5']
+        assert self.poseData.matchReport['skippedNodes'] == ['|noMirror']
+
+        matched = self.poseData._matchNodesToPoseData(self.nodes[:10], matchMethod='mirrorIndex')
+        assert len(matched) == 9
+        assert len(self.poseData.matchReport['unmatchedKeys']) == 1999 - 9
+
+    def test_matchBenchmark(self):
+        '''
+        2000 nodes against 2000 pose keys, indexed vs the original nested loop
+        '''
+        start = time.clock()
+        matched = self.poseData._matchNodesToPoseData(self.nodes, matchMethod='mirrorIndex')
+        indexedTime = time.clock() - start
+
+        start = time.clock()
+        golden = self._nestedMatch('mirrorIndex')
+        nestedTime = time.clock() - start
+        print 'mirrorIndex match 2000x2000 : indexed %f secs, nested %f secs' % (indexedTime, nestedTime)
+        assert sorted(matched) == sorted(golden)
+
+
+class Test_PoseCapture():
+    '''
+    the bulk API attr capture and apply against the plain cmds.getAttr / setAttr per channel route
+    '''
+    def setup(self):
+        cmds.file(new=True, f=True)
+        self.nodes = []
+        for i in range(1000):
+            node = cmds.createNode('transform', name='ctrl_%i' % i)
+            cmds.addAttr(node, ln='space', at='enum', en='world:local:parent', k=True)
+            cmds.addAttr(node, ln='ikfk', at='bool', k=True)
+            cmds.addAttr(node, ln='count', at='long', k=True)
+            cmds.addAttr(node, ln='blend', at='float', k=True)
+            cmds.addAttr(node, ln='offset', at='doubleLinear', k=True)
+            cmds.addAttr(node, ln='twist', at='doubleAngle', k=True)
+            cmds.setAttr('%s.space' % node, i % 3)
+            cmds.setAttr('%s.ikfk' % node, i % 2)
+            cmds.setAttr('%s.count' % node, i)
+            cmds.setAttr('%s.offset' % node, i * 0.5)
+            cmds.setAttr('%s.twist' % node, i * 0.1)
+            cmds.setAttr('%s.translate' % node, i, -i, i * 0.25)
+            cmds.setAttr('%s.rotate' % node, i % 360, 10, -45)
+            if i % 5:
+                cmds.setAttr('%s.scaleX' % node, lock=True)
+            self.nodes.append('|%s' % node)
+        cmds.currentUnit(linear='m')  # api values must come back in the ui units
+
+    def teardown(self):
+        cmds.currentUnit(linear='cm')
+
+    def test_bulkCapture(self):
+        poseData = r9Pose.PoseData()
+        poseData.skipAttrs = ['count']
+        start = time.clock()
+        poseData._buildBlock_poseDict(self.nodes)
+        print 'bulk capture : 1000 nodes : %f secs' % (time.clock() - start)
+        assert len(poseData._captureChannels) == 2  # locked / unlocked scaleX signatures
+
+        for node in self.nodes[:50]:
+            key = r9Core.nodeNameStrip(node)
+            attrs = poseData.poseDict[key]['attrs']
+            channels = [attr for attr in r9Anim.getSettableChannels(node, incStatics=True, skipcompound=True)
+                        if attr not in poseData.skipAttrs]
+            assert sorted(attrs.keys()) == sorted(channels)
+            for attr in channels:
+                value = cmds.getAttr('%s.%s' % (node, attr))
+                assert type(attrs[attr]) == type(value)
+                assert r9Core.floatIsEqual(attrs[attr], value, tolerance=0.000001)
+            assert poseData.poseDict[key]['rotateOrder'] == 0
+            assert poseData.poseDict[key]['attrs_kWorld']['translation'] == poseData._getTranforms(node)['translation']
+
+    def test_bulkApply(self):
+        poseData = r9Pose.PoseData()
+        poseData._buildBlock_poseDict(self.nodes)
+        poseData.infoDict = {'sceneUnits': cmds.currentUnit(q=True, fullName=True, linear=True)}
+        poseData.matchedPairs = [(r9Core.nodeNameStrip(node), node) for node in self.nodes]
+
+        for node in self.nodes[::10]:
+            cmds.setAttr('%s.translateX' % node, -1000)
+            cmds.setAttr('%s.space' % node, 0)
+            cmds.setAttr('%s.twist' % node, 90)
+        cmds.setAttr('|ctrl_11.blend', poseData.applyTolerance / 2.0)  # within tolerance, left alone
+
+        cmds.undoInfo(state=True)
+        start = time.clock()
+        poseData._applyData_attrs()
+        print 'bulk apply : 1000 nodes : %f secs' % (time.clock() - start)
+        for i, node in enumerate(self.nodes[::10]):
+            i *= 10
+            assert r9Core.floatIsEqual(cmds.getAttr('%s.translateX' % node), i * 0.01, tolerance=0.000001)  # stored in 'm'
+            assert cmds.getAttr('%s.space' % node) == i % 3
+            assert r9Core.floatIsEqual(cmds.getAttr('%s.twist' % node), i * 0.1, tolerance=0.000001)
+        assert cmds.getAttr('|ctrl_11.blend') > 0
+
+        # the whole apply is a single undo when run through the plug-in
+        if cmds.pluginInfo('SetPlugValues.py', q=True, loaded=True):
+            cmds.undo()
+            assert cmds.getAttr('|ctrl_10.translateX') == -1000
+            assert cmds.getAttr('|ctrl_990.twist') == 90
+
+
+class Test_PoseCompare():
+
+    def setup(self):
+        self.poseFolder = getPoseFolder()
+        self.current = {'Hips': {'longName': '|root|Hips',
+                                 'attrs': {'translateX': 1.0, 'rotateX': 10.0, 'rotateY': 45.0, 'visibility': True}},
+                        'Spine': {'longName': '|root|Hips|Spine',
+                                  'attrs': {'translateY': 2.0, 'rotateZ': 0.0, 'space': 'world'}},
+                        'Head': {'longName': '|root|Hips|Spine|Head', 'attrs': {'rotateX': 5.0}}}
+        self.reference = {'Hips': {'longName': '|root|Hips',
+                                   'attrs': {'translateX': '1.0005', 'rotateX': 190.0, 'rotateY': 45.5, 'visibility': False}},
+                          'Spine': {'longName': '|root|Chest|Spine',
+                                    'attrs': {'translateY': 2.1, 'rotateZ': 90.05}}}
+
+    def test_compareFails(self):
+        for numpyModule in [r9Pose.numpy, None]:
+            _numpy = r9Pose.numpy
+            r9Pose.numpy = numpyModule  # run both the numpy and pure python compares
+            try:
+                compare = r9Pose.PoseCompare(self.current, self.reference, compareDict=None, longName=True)
+                assert not compare.compare()
+            finally:
+                r9Pose.numpy = _numpy
+            # rotateX passes on the 180 gimbal, rotateZ on the 90, translateX within the linear tolerance
+            assert compare.fails['missingKeys'] == ['Head']
+            assert compare.fails['dagMismatch'] == ['Spine']
+            assert sorted(compare.fails['failedAttrs']['Hips']['attrMismatch']) == ['rotateY', 'visibility']
+            assert compare.fails['failedAttrs']['Spine']['attrMismatch'] == ['translateY']
+            assert compare.fails['failedAttrs']['Spine']['missingAttrs'] == ['space']
+
+        compare = r9Pose.PoseCompare(self.current, self.reference, compareDict=None,
+                                     ignoreBlocks=['missingKeys'], ignoreAttrs=['rotateY', 'visibility', 'translateY', 'space'])
+        assert compare.compare()
+
+    def test_batchCompare(self):
+        reference = os.path.join(self.poseFolder, 'jump_f218.pose')
+        results = r9Pose.PoseCompare.batchCompare(reference, self.poseFolder, processes=0,
+                                                  ignoreAttrs=['jointOrientX', 'jointOrientY', 'jointOrientZ'])
+        assert sorted(os.path.basename(f) for f in results.keys()) == ['T_Pose.pose', 'jump_f218.pose', 'jump_f218_projected.pose',
+                                                                       'jump_f9.pose', 'jump_f9_absolute29.pose']
+        assert results[reference][0]
+        assert not results[os.path.join(self.poseFolder, 'jump_f9.pose')][0]
+        assert results[os.path.join(self.poseFolder, 'jump_f9.pose')][1]['failedAttrs']
+
+        # same results through the process pool
+        pooled = r9Pose.PoseCompare.batchCompare(reference, self.poseFolder, processes=2,
+                                                 ignoreAttrs=['jointOrientX', 'jointOrientY', 'jointOrientZ'])
+        assert pooled == results
+
+
+def _patchPoseFile(pose):
+    # module level so it can be pickled to the batchPatchPoseFiles process pool
+    if pose.info.get('author') == 'skipMe':
+        return False
+    pose.renameKey('L_Wrist_Ctrl', 'L_Hand_Ctrl')
+    pose.removeAttrs(['translateX'])
+    pose.info['patched'] = 'True'
+
+def _patchPoseFileFail(pose):
+    raise ValueError('patch failed')
+
+
+class Test_PoseFilePatching():
+    '''
+    the offline, file level pose patching, no scene required
+    '''
+    def setup(self):
+        self.poseFolder = tempfile.mkdtemp()
+        for pose in ['jump_f218', 'jump_f9', 'T_Pose']:
+            shutil.copy2(os.path.join(getPoseFolder(), '%s.pose' % pose), self.poseFolder)
+
+    def teardown(self):
+        shutil.rmtree(self.poseFolder)
+
+    def test_poseFile(self):
+        filepath = os.path.join(self.poseFolder, 'jump_f218.pose')
+        pose = r9Pose.PoseFile(filepath)
+        assert pose.dataformat == 'config'
+        assert type(pose.poseDict) == dict
+        assert 'L_Wrist_Ctrl' in pose.poseDict
+        _patchPoseFile(pose)
+
+        # write back out as json and binary and check the data survived
+        for dataformat in ['json', 'binary']:
+            pose.save(filepath, dataformat=dataformat)
+            reloaded = r9Pose.PoseFile(filepath)
+            assert reloaded.dataformat == dataformat
+            assert reloaded.poseDict == pose.poseDict
+            assert reloaded.info['patched'] == 'True'
+            assert 'L_Hand_Ctrl' in reloaded.poseDict
+            assert 'translateX' not in reloaded.poseDict['L_Hand_Ctrl']['attrs']
+        assert not [f for f in os.listdir(self.poseFolder) if '.tmp' in f]
+
+    def test_batchPatchPoseFiles(self):
+        progress = []
+        results = r9Pose.batchPatchPoseFiles(self.poseFolder, _patchPoseFile, processes=2,
+                                             progressfunc=lambda *args: progress.append(args))
+        assert sorted(os.path.basename(f) for f in results) == ['T_Pose.pose', 'jump_f218.pose', 'jump_f9.pose']
+        assert set(results.values()) == set(['patched'])
+        assert len(progress) == 3
+        for filepath in results:
+            pose = r9Pose.PoseFile(filepath)
+            assert pose.info['patched'] == 'True'
+            assert 'L_Wrist_Ctrl' not in pose.poseDict
+
+        # the patched pose still loads through the standard PoseData reader
+        poseData = r9Pose.PoseData()
+        poseData._readPose(os.path.join(self.poseFolder, 'jump_f218.pose'))
+        assert 'L_Hand_Ctrl' in poseData.poseDict
+
+        # per file error reporting
+        results = r9Pose.batchPatchPoseFiles(self.poseFolder, _patchPoseFileFail, processes=0)
+        assert all('ValueError: patch failed' in status for status in results.values())
+
+
+
+class Test_PoseBlender():
+    '''
+    N-way blending of multiple poses over the cached base state
+    '''
+    def setup(self):
+        cmds.file(new=True, f=True)
+        self.poseFolder = tempfile.mkdtemp()
+        self.nodes = [cmds.polyCube(name='blend_%i' % i)[0] for i in range(5)]
+        self.poses = []
+        for i in range(3):
+            for node in self.nodes:
+                cmds.setAttr('%s.translateX' % node, (i + 1) * 10)
+                cmds.setAttr('%s.rotateY' % node, (i + 1) * -20)
+            filepath = os.path.join(self.poseFolder, 'pose_%i.pose' % i)
+            r9Pose.PoseData().poseSave(self.nodes, filepath, useFilter=False, storeThumbnail=False)
+            self.poses.append(filepath)
+        for node in self.nodes:
+            cmds.setAttr('%s.translateX' % node, 0)
+            cmds.setAttr('%s.rotateY' % node, 0)
+
+    def teardown(self):
+        shutil.rmtree(self.poseFolder)
+
+    def test_applyPercent(self):
+        blender = r9Pose.PoseBlender(self.poses[1:2], nodes=self.nodes, useFilter=False)
+        blender.applyPercent(50)
+        assert r9Core.floatIsEqual(cmds.getAttr('blend_0.translateX'), 10)
+        assert r9Core.floatIsEqual(cmds.getAttr('blend_4.rotateY'), -20)
+        blender.applyPercent(0)
+        assert r9Core.floatIsEqual(cmds.getAttr('blend_0.translateX'), 0)
+
+    def test_applyPercent_resync(self):
+        # manual edits between applyPercent calls are pushed over, the weight hasn't changed
+        blender = r9Pose.PoseBlender(self.poses[1:2], nodes=self.nodes, useFilter=False)
+        blender.applyPercent(50)
+        cmds.setAttr('blend_0.translateX', 3)
+        blender.applyPercent(50)
+        assert r9Core.floatIsEqual(cmds.getAttr('blend_0.translateX'), 10)
+
+    def test_multiBlend(self):
+        for numpyModule in [r9Pose.numpy, None]:
+            _numpy = r9Pose.numpy
+            r9Pose.numpy = numpyModule  # run both the numpy and pure python blends
+            try:
+                blender = r9Pose.PoseBlender(self.poses, nodes=self.nodes, useFilter=False)
+                blender.setWeights({self.poses[0]: 100, self.poses[2]: 50})
+                assert r9Core.floatIsEqual(cmds.getAttr('blend_2.translateX'), 25)
+                assert r9Core.floatIsEqual(cmds.getAttr('blend_2.rotateY'), -50)
+
+                # no weight change, nothing pushed
+                assert blender.setWeights({self.poses[0]: 100}) == 0
+                blender.setWeights({self.poses[0]: 0, self.poses[2]: 0})
+                assert r9Core.floatIsEqual(cmds.getAttr('blend_2.translateX'), 0)
+            finally:
+                r9Pose.numpy = _numpy